@@ -0,0 +1,790 @@
+import argparse
+import compileall
+import fnmatch
+import io
+import json
+import os
+import psutil
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+import server_monitor
+from server_monitor import formats, procfs
+
+# Benchmark and regression suite for the Linux, Raspberry Pi and Windows collectors.
+#
+# Every collector, get_usage() and display_live_graph() runs many times against
+# a fake machine: fixture /proc and /sys trees whose counters advance by a known
+# amount each tick, stub nvidia-smi and wmic commands on the PATH, and for the
+# Windows backend stand-in wmi and pythoncom modules serving OpenHardwareMonitor
+# sensors and fixed drives. The numbers are therefore reproducible on a CI box without a GPU, and the
+# computed values can be checked exactly. Any case over its threshold fails
+# the run. Cold start is timed separately, by starting each launcher script
+# in a fresh interpreter.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PLATFORM_SCRIPTS = {
+    "linux": "Server-Monitor-Linux.py",
+    "pi": "Server-Monitor-Pi.py",
+    "windows": "Server-Monitor-Windows.py",
+}
+
+# Rows the stub nvidia-smi prints every --loop-ms: index, name, utilization, temperature, memory used/total
+FAKE_GPUS = (
+    (0, "NVIDIA GeForce RTX 4090", 37, 61, 2048, 24564),
+    (1, "NVIDIA RTX A6000", 12, 48, 512, 49140),
+)
+FAKE_MEM_TOTAL_KB = 16384000
+FAKE_MEM_AVAILABLE_KB = 12288000
+FAKE_CORETEMP_MILLIDEGREES = 52000
+FAKE_THERMAL_ZONE_MILLIDEGREES = 48312
+FAKE_NVME_MILLIDEGREES = 38850
+FAKE_WIFI_MILLIDEGREES = 41000
+FAKE_FAN_RPM = (1200, 0)
+# Sensors the stand-in OpenHardwareMonitor namespace reports: (SensorType, Name, Value)
+FAKE_OHM_SENSORS = (
+    ("Load", "CPU Total", 23.5),
+    ("Temperature", "GPU Core", 61.0),
+    ("Temperature", "CPU Package", 54.0),
+    ("Temperature", "CPU Core #1", 51.0),
+)
+FAKE_OHM_CPU_CELSIUS = 54.0
+# What the stub `wmic cpu get caption` reports
+FAKE_WMIC_CPU_CAPTION = "Intel64 Family 6 Model 183 Stepping 1"
+# Drives the Windows storage collector lists instead of this host's mounts: (mount point, total, used, free, percent)
+FAKE_WINDOWS_DRIVES = (
+    ("C:\\", 512 * 1024 ** 3, 384 * 1024 ** 3, 128 * 1024 ** 3, 75.0),
+    ("D:\\", 2000 * 1000 ** 3, 500 * 1000 ** 3, 1500 * 1000 ** 3, 25.0),
+)
+FAKE_FIRST_PID = 1000
+# Synthetic hosts for the table render cases, and the terminal they are drawn on
+RENDER_CORE_COUNTS = (4, 64, 512)
+RENDER_TERMINAL = (140, 60)
+# Fixture mount table: (device, mount point under the fixture root, fstype). Pseudo
+# filesystems and the bind mount of sda1 must be left out; the NFS mount never answers.
+FAKE_MOUNTS = (
+    ("8:1", "", "ext4"),
+    ("0:5", "proc", "proc"),
+    ("0:25", "run", "tmpfs"),
+    ("8:17", "mnt/data", "xfs"),
+    ("8:1", "srv", "ext4"),
+    ("0:52", "mnt/nfs", "nfs4"),
+    ("8:33", "mnt/with space", "ext4"),
+    ("0:26", "sys/fs/cgroup", "cgroup2"),
+)
+# Per-tick increments in /proc/diskstats: reads, writes, sectors read, sectors written, read ms, write ms, busy ms.
+# sda1 is a partition (not in /sys/block) and loop0 is filtered out by default.
+FAKE_DISKS = {
+    "sda": (40, 10, 320, 160, 20, 30, 25),
+    "sda1": (40, 10, 320, 160, 20, 30, 25),
+    "nvme0n1": (400, 100, 3200, 800, 40, 60, 50),
+    "loop0": (5, 0, 40, 0, 1, 0, 1),
+}
+FAKE_WHOLE_DISKS = ("sda", "nvme0n1")
+FAKE_REAL_MOUNTS = ("", "mnt/data", "mnt/nfs", "mnt/with space")
+FAKE_HUNG_MOUNT = "mnt/nfs"
+# Fixture cgroup v2 tree: per-tick increments of CPU µs, throttled µs, bytes read, bytes written and
+# cpu/memory/io stall µs, then memory.current, cpu.max and memory.max. The monitor runs in monitor.service.
+FAKE_CGROUPS = {
+    "system.slice": ((900000, 50000, 3 * 1048576, 1048576, 40000, 10000, 5000), 3 * 1024 ** 3, "max 100000", "max"),
+    "system.slice/docker-db.scope": ((130000, 0, 2 * 1048576, 524288, 10000, 0, 5000), 2 * 1024 ** 3, "max 100000", "max"),
+    "system.slice/docker-web.scope": ((750000, 50000, 1048576, 524288, 30000, 10000, 0), 1024 ** 3, "200000 100000", str(2 * 1024 ** 3)),
+    "system.slice/monitor.service": ((20000, 0, 0, 0, 0, 0, 0), 64 * 1048576, "max 100000", "max"),
+}
+FAKE_OWN_CGROUP = "system.slice/monitor.service"
+
+NVIDIA_SMI_STUB = """#!{python}
+import sys
+import time
+
+interval = 1000
+for argument in sys.argv[1:]:
+    if argument.startswith("--loop-ms="):
+        interval = int(argument.split("=", 1)[1])
+rows = {rows!r}
+while True:
+    print("\\n".join(rows), flush=True)
+    if not interval:
+        break
+    time.sleep(interval / 1000)
+"""
+
+# Patterns are matched against case names with fnmatch; every matching entry
+# applies, later ones overriding earlier ones. Times are per tick. The limits
+# leave plenty of room for a slow CI runner; the subprocess limit is exact,
+# since no collector may fork on the hot path. With the scheduler stopped,
+# get_usage() and display_live_graph() run every collector inline, so their
+# limits include the process table scan.
+DEFAULT_THRESHOLDS = {
+    "*": {"p99_ms": 5.0, "cpu_ms": 2.0, "subprocesses": 0, "alloc_kib": 256},
+    "*.get_usage*": {"p99_ms": 10.0, "cpu_ms": 5.0, "alloc_kib": 512},
+    "*.display_live_graph*": {"p99_ms": 200.0, "cpu_ms": 100.0, "alloc_kib": 2048},
+    "*.processes": {"p99_ms": 200.0, "cpu_ms": 100.0, "alloc_kib": 4096},
+    # The heatmap has to stay flat as cores are added; one row per core is only there for comparison
+    "*.render*heatmap*": {"p99_ms": 60.0, "cpu_ms": 40.0, "alloc_kib": 2048},
+    "*.render*rows*": {"p99_ms": 1000.0, "cpu_ms": 1000.0, "alloc_kib": 32768},
+    # A fresh interpreter per tick; mostly there to catch an eager import of rich, asyncio or wmi
+    "*.cold_start*": {"p99_ms": 500.0, "subprocesses": 1},
+}
+# Cases too slow to run --ticks times
+TICK_LIMITS = {"*.cold_start*": 10}
+
+class FakeHardware:
+    """Fixture /proc and /sys trees plus stub nvidia-smi and wmic commands under one directory.
+
+    advance() moves the counters on by one tick: CPU i is busy for a fixed
+    share of every 100 jiffies, and the network counters grow by a fixed
+    number of bytes, so every collector has a known expected value.
+    """
+
+    def __init__(self, root, cpus=16, processes=2000):
+        self.root = root
+        self.cpus = cpus
+        self.processes = processes
+        self.proc_root = os.path.join(root, "proc")
+        self.sys_root = os.path.join(root, "sys")
+        self.bin_dir = os.path.join(root, "bin")
+        self.ticks = 0
+        self.busy = [(17 * i + 23) % 90 + 5 for i in range(cpus)]
+        # Process table fixtures: pid -> resident pages, all distinct so the top N by RSS are known
+        self.resident_pages = {FAKE_FIRST_PID + i: (7919 * i) % 100003 + 1 for i in range(processes)}
+
+    def create(self):
+        self._write("proc/meminfo", "".join(f"{name + ':':<16}{value:>8} kB\n" for name, value in (
+            ("MemTotal", FAKE_MEM_TOTAL_KB), ("MemFree", 8192000), ("MemAvailable", FAKE_MEM_AVAILABLE_KB),
+            ("Buffers", 512000), ("Cached", 3584000), ("SwapCached", 0), ("Active", 4096000),
+            ("Inactive", 2048000), ("SwapTotal", 2097148), ("SwapFree", 2097148), ("Shmem", 256000),
+            ("Slab", 409600), ("SReclaimable", 307200), ("SUnreclaim", 102400),
+        )))
+        # mountinfo escapes spaces in paths as \\040
+        self._write("proc/self/cgroup", f"0::/{FAKE_OWN_CGROUP}\n")
+        self._write("proc/self/mountinfo", "".join(
+            "{} 1 {} / {} rw,relatime - {} none rw\n".format(21 + i, device, self.mount_path(mountpoint).replace(" ", "\\040"), fstype)
+            for i, (device, mountpoint, fstype) in enumerate(FAKE_MOUNTS)))
+        for device, mountpoint, fstype in FAKE_MOUNTS:
+            os.makedirs(self.mount_path(mountpoint), exist_ok=True)
+        # Two sockets, one NUMA node each
+        for cpu in range(self.cpus):
+            self._write(f"sys/devices/system/cpu/cpu{cpu}/topology/physical_package_id", f"{cpu * 2 // self.cpus}\n")
+        for node in range(2):
+            self._write(f"sys/devices/system/node/node{node}/cpulist", f"{node * self.cpus // 2}-{(node + 1) * self.cpus // 2 - 1}\n")
+        for disk in FAKE_DISKS:
+            if disk != "sda1":
+                os.makedirs(os.path.join(self.sys_root, "block", disk), exist_ok=True)
+        # hwmon0 is a decoy; the Linux script has to pick the coretemp chip
+        self._write("sys/class/hwmon/hwmon0/name", "acpitz\n")
+        self._write("sys/class/hwmon/hwmon0/temp1_input", "27800\n")
+        self._write("sys/class/hwmon/hwmon1/name", "coretemp\n")
+        self._write("sys/class/hwmon/hwmon1/temp1_input", f"{FAKE_CORETEMP_MILLIDEGREES}\n")
+        self._write("sys/class/hwmon/hwmon1/temp1_label", "Package id 0\n")
+        for core in range(self.cpus // 2):
+            self._write(f"sys/class/hwmon/hwmon1/temp{core + 2}_input", f"{self.core_millidegrees(core)}\n")
+            self._write(f"sys/class/hwmon/hwmon1/temp{core + 2}_label", f"Core {core}\n")
+        # An NVMe drive, named after its controller, and a fan chip with one fan plugged in
+        os.makedirs(os.path.join(self.sys_root, "devices/pci0000:00/0000:00:1d.0/nvme/nvme0"), exist_ok=True)
+        self._write("sys/class/hwmon/hwmon2/name", "nvme\n")
+        self._write("sys/class/hwmon/hwmon2/temp1_input", f"{FAKE_NVME_MILLIDEGREES}\n")
+        self._write("sys/class/hwmon/hwmon2/temp1_label", "Composite\n")
+        os.symlink(os.path.join(self.sys_root, "devices/pci0000:00/0000:00:1d.0/nvme/nvme0"),
+                   os.path.join(self.sys_root, "class/hwmon/hwmon2/device"))
+        self._write("sys/class/hwmon/hwmon3/name", "nct6775\n")
+        for fan, rpm in enumerate(FAKE_FAN_RPM, 1):
+            self._write(f"sys/class/hwmon/hwmon3/fan{fan}_input", f"{rpm}\n")
+        # thermal_zone0 repeats coretemp under another name; thermal_zone1 has no hwmon chip
+        self._write("sys/class/thermal/thermal_zone0/type", "x86_pkg_temp\n")
+        self._write("sys/class/thermal/thermal_zone0/temp", f"{FAKE_THERMAL_ZONE_MILLIDEGREES}\n")
+        self._write("sys/class/thermal/thermal_zone1/type", "iwlwifi_1\n")
+        self._write("sys/class/thermal/thermal_zone1/temp", f"{FAKE_WIFI_MILLIDEGREES}\n")
+        for pid, pages in self.resident_pages.items():
+            self._write(f"proc/{pid}/stat", f"{pid} (worker-{pid % 97}) S 1 {pid} {pid} 0 -1 4194304 112 0 0 0 "
+                                            f"{pid % 50} {pid % 7} 0 0 20 0 1 0 {pid} {pages * 4096 * 2} {pages} "
+                                            + " ".join(["0"] * 35) + "\n")
+            self._write(f"proc/{pid}/statm", f"{pages * 2} {pages} 0 24 0 131 0\n")
+            self._write(f"proc/{pid}/io", f"rchar: 0\nwchar: 0\nsyscr: 0\nsyscw: 0\nread_bytes: {pid * 4096}\n"
+                                          f"write_bytes: 0\ncancelled_write_bytes: 0\n")
+        rows = [", ".join(str(field) for field in gpu) for gpu in FAKE_GPUS]
+        self._write("bin/nvidia-smi", NVIDIA_SMI_STUB.format(python=sys.executable, rows=rows))
+        os.chmod(os.path.join(self.bin_dir, "nvidia-smi"), 0o755)
+        self._write("bin/wmic", f"#!/bin/sh\necho Caption\necho '{FAKE_WMIC_CPU_CAPTION}'\n")
+        os.chmod(os.path.join(self.bin_dir, "wmic"), 0o755)
+        self.advance()
+
+    def advance(self):
+        self.ticks += 1
+        lines = []
+        totals = [0] * 10
+        for cpu, busy in enumerate(self.busy):
+            # user nice system idle iowait irq softirq steal guest guest_nice
+            fields = [busy * self.ticks * 3 // 4, 0, busy * self.ticks - busy * self.ticks * 3 // 4,
+                      (100 - busy) * self.ticks + 1000, 0, 0, 0, 0, 0, 0]
+            totals = [total + field for total, field in zip(totals, fields)]
+            lines.append(f"cpu{cpu} " + " ".join(map(str, fields)))
+        lines.insert(0, "cpu  " + " ".join(map(str, totals)))
+        lines += ["intr 0", f"ctxt {1000 * self.ticks}", "btime 1700000000", "processes 4242",
+                  "procs_running 2", "procs_blocked 0", "softirq 0 0 0 0 0 0 0 0 0 0 0"]
+        self._write("proc/stat", "\n".join(lines) + "\n")
+        diskstats = []
+        for minor, (disk, (reads, writes, read_sectors, write_sectors, read_ms, write_ms, busy_ms)) in enumerate(FAKE_DISKS.items()):
+            # major minor name reads merged sectors ms writes merged sectors ms in_flight busy_ms weighted_ms
+            fields = [reads, 0, read_sectors, read_ms, writes, 0, write_sectors, write_ms, 0, busy_ms, read_ms + write_ms]
+            diskstats.append(f"   8 {minor} {disk} " + " ".join(str(field * self.ticks) for field in fields))
+        self._write("proc/diskstats", "\n".join(diskstats) + "\n")
+        for cgroup, ((cpu_usec, throttled_usec, read_bytes, write_bytes, *stalls), memory, cpu_max, memory_max) in FAKE_CGROUPS.items():
+            # The I/O is split over two disks
+            self._write(f"sys/fs/cgroup/{cgroup}/cpu.stat", f"usage_usec {cpu_usec * self.ticks}\nuser_usec 0\nsystem_usec 0\n"
+                                                          f"nr_periods 0\nnr_throttled {self.ticks}\nthrottled_usec {throttled_usec * self.ticks}\n")
+            self._write(f"sys/fs/cgroup/{cgroup}/io.stat", "".join(
+                f"{device} rbytes={read_bytes * self.ticks // 2} wbytes={write_bytes * self.ticks // 2} rios={self.ticks} wios={self.ticks} dbytes=0 dios=0\n"
+                for device in ("8:0", "259:0")))
+            for resource, stall in zip(("cpu", "memory", "io"), stalls):
+                self._write(f"sys/fs/cgroup/{cgroup}/{resource}.pressure", f"some avg10=1.00 avg60=0.50 avg300=0.10 total={stall * self.ticks}\n"
+                                                                           f"full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+            self._write(f"sys/fs/cgroup/{cgroup}/memory.current", f"{memory}\n")
+            self._write(f"sys/fs/cgroup/{cgroup}/cpu.max", f"{cpu_max}\n")
+            self._write(f"sys/fs/cgroup/{cgroup}/memory.max", f"{memory_max}\n")
+        received, sent = self.network_bytes()
+        self._write("proc/net/dev", (
+            "Inter-|   Receive                                                |  Transmit\n"
+            " face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n"
+            f"    lo: {4096 * self.ticks} {32 * self.ticks} 0 0 0 0 0 0 {4096 * self.ticks} {32 * self.ticks} 0 0 0 0 0 0\n"
+            f"  eth0: {received - 4096 * self.ticks} {1100 * self.ticks} 0 0 0 0 0 0 {sent - 4096 * self.ticks} {400 * self.ticks} 0 0 0 0 0 0\n"
+        ))
+
+    def network_bytes(self):
+        # (received, sent) over all interfaces after the current tick
+        return 512 * 1024 ** 2 + 1536 * 1024 * self.ticks, 128 * 1024 ** 2 + 512 * 1024 * self.ticks
+
+    def mount_path(self, mountpoint):
+        return os.path.join(self.root, mountpoint).rstrip("/")
+
+    def cgroup_sample(self, cgroup):
+        # What a cgroup monitor reports for one of FAKE_CGROUPS over one tick of one second
+        (cpu_usec, throttled_usec, read_bytes, write_bytes, *stalls), memory, cpu_max, memory_max = FAKE_CGROUPS[cgroup]
+        quota, period = cpu_max.split()
+        return (f"/{cgroup}", cpu_usec / 1e4, None if quota == "max" else int(quota) / int(period), throttled_usec / 1e4,
+                memory, None if memory_max == "max" else int(memory_max), float(read_bytes), float(write_bytes),
+                *(stall / 1e4 for stall in stalls))
+
+    def core_millidegrees(self, core):
+        return FAKE_CORETEMP_MILLIDEGREES - 1000 * (core % 5)
+
+    def sensors(self):
+        # (kind, chip, label, value) in the order a sensor monitor reads the fixture
+        return ([("other", "acpitz", "temp1", 27.8), ("package", "coretemp", "Package id 0", FAKE_CORETEMP_MILLIDEGREES / 1000)]
+                + [("core", "coretemp", f"Core {core}", self.core_millidegrees(core) / 1000) for core in range(self.cpus // 2)]
+                + [("nvme", "nvme0", "Composite", FAKE_NVME_MILLIDEGREES / 1000)]
+                + [("fan", "nct6775", f"fan{fan}", float(rpm)) for fan, rpm in enumerate(FAKE_FAN_RPM, 1)]
+                + [("other", "iwlwifi_1", "thermal_zone1", FAKE_WIFI_MILLIDEGREES / 1000)])
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Rewrite in place: the procfs backend keeps these files open between ticks
+        with open(path, "r+" if os.path.exists(path) else "w") as file:
+            file.write(content)
+            file.truncate()
+
+class FakeWmiConnection:
+    """One connection to the stand-in OpenHardwareMonitor WMI namespace."""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+    def Sensor(self, **where):
+        # wmi turns keyword arguments into a WQL WHERE clause
+        sensors = [types.SimpleNamespace(SensorType=kind, Name=name, Value=value) for kind, name, value in FAKE_OHM_SENSORS]
+        return [sensor for sensor in sensors if all(getattr(sensor, key) == value for key, value in where.items())]
+
+def install_fake_windows():
+    """Put stand-ins for the Windows-only wmi and pythoncom modules into sys.modules, and list FAKE_WINDOWS_DRIVES."""
+    wmi = types.ModuleType("wmi")
+    wmi.connections = 0
+
+    def connect(namespace=None, **kwargs):
+        wmi.connections += 1
+        return FakeWmiConnection(namespace)
+
+    wmi.WMI = connect
+    pythoncom = types.ModuleType("pythoncom")
+    pythoncom.CoInitialize = lambda: None
+    sys.modules["wmi"], sys.modules["pythoncom"] = wmi, pythoncom
+
+    # Only the Windows collector lists partitions; any other path still gets its real usage
+    drives = {drive[0]: drive[1:] for drive in FAKE_WINDOWS_DRIVES}
+    disk_usage = psutil.disk_usage
+    psutil.disk_partitions = lambda all=False: [
+        types.SimpleNamespace(device=drive, mountpoint=drive, fstype="NTFS", opts="rw,fixed") for drive in drives]
+    psutil.disk_usage = lambda path: (types.SimpleNamespace(**dict(zip(("total", "used", "free", "percent"), drives[path])))
+                                      if path in drives else disk_usage(path))
+    return wmi
+
+def load_platform(platform, hardware):
+    procfs.PROC_ROOT, procfs.SYS_ROOT = hardware.proc_root, hardware.sys_root
+    if platform == "windows":
+        install_fake_windows()
+    return server_monitor.load_backend(platform)
+
+def register_collectors(module, backend="psutil"):
+    # Only the Linux and Pi backends have a choice of collector implementations
+    if hasattr(module, "COLLECTOR_BACKENDS"):
+        module.register_collectors(1.0, backend)
+    else:
+        module.register_collectors(1.0)
+
+def cold_start_cases(platform, module):
+    """Yield (case name, function, before_tick) timing a fresh interpreter up to the first useful work."""
+    # Bytecode is compiled once beforehand, as the first run on a real machine would leave it
+    compileall.compile_dir(os.path.join(SCRIPT_DIR, "server_monitor"), quiet=1)
+
+    def run(*arguments):
+        subprocess.run([sys.executable, *arguments], cwd=SCRIPT_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    yield f"{platform}.cold_start[import]", lambda: run("-c", f"import server_monitor.{platform}"), lambda: None
+    if hasattr(module, "sample_fields"):
+        # The child samples this machine, not the fixture: a subprocess cannot be pointed at PROC_ROOT
+        script = os.path.join(SCRIPT_DIR, PLATFORM_SCRIPTS[platform])
+        yield (f"{platform}.cold_start[first record]",
+               lambda: run(script, "--format", "ndjson", "--count", "1", "--output", os.devnull), lambda: None)
+
+# Counted through an audit hook so forks hidden inside os.popen or a library are caught too
+SPAWN_EVENTS = {"subprocess.Popen", "os.system", "os.posix_spawn", "os.exec", "os.fork"}
+spawned_processes = 0
+
+def _count_spawns(event, args):
+    global spawned_processes
+    if event in SPAWN_EVENTS:
+        spawned_processes += 1
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def format_duration(milliseconds):
+    return f"{milliseconds:.2f} ms" if milliseconds >= 1 else f"{milliseconds * 1e3:.1f} µs"
+
+def measure(func, ticks, before_tick):
+    """Run func once per tick and return its per-tick cost."""
+    before_tick()
+    func()  # warm up: open files, prime the CPU deltas
+    latencies = []
+    cpu_time = 0.0
+    spawned_before = spawned_processes
+    for _ in range(ticks):
+        before_tick()
+        cpu_started, wall_started = time.thread_time(), time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - wall_started)
+        cpu_time += time.thread_time() - cpu_started
+    spawned = spawned_processes - spawned_before
+    # tracemalloc slows everything down, so allocations are measured in a separate pass
+    traced_ticks = min(ticks, 50)
+    peak_total = 0
+    tracemalloc.start()
+    for _ in range(traced_ticks):
+        before_tick()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        peak_total += tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return {
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "cpu_ms": cpu_time / ticks * 1e3,
+        "subprocesses": spawned / ticks,
+        "alloc_kib": peak_total / traced_ticks / 1024,
+    }
+
+def benchmark_cases(platform, module, hardware, output):
+    """Yield (case name, function, before_tick) for every collector and the full display path."""
+    def advance():
+        hardware.advance()
+
+    def advance_and_clear():
+        hardware.advance()
+        output.seek(0)
+        output.truncate()
+
+    console = Console(file=output, width=120, force_terminal=True, color_system="truecolor")
+    backends = getattr(module, "COLLECTOR_BACKENDS", {"psutil": {}})
+    register_collectors(module)
+    for name, func in module.collector_scheduler.collectors().items():
+        yield f"{platform}.{name}", func, advance
+    for name, func in backends.get("procfs", {}).items():
+        yield f"{platform}.{name}[procfs]", func, advance
+    for backend in backends:
+        def register(backend=backend, before_tick=advance):
+            register_collectors(module, backend)
+            before_tick()
+        yield f"{platform}.get_usage[{backend}]", module.get_usage, register
+        yield (f"{platform}.display_live_graph[{backend}]", lambda: module.display_live_graph(console),
+               lambda backend=backend: register(backend, advance_and_clear))
+    register_collectors(module)
+    if hasattr(module, "sample_fields"):
+        # One --format record per tick, from a full sample of the fixture
+        values = module.sample_fields()[0]
+        for record_format in formats.STREAM_FORMATS:
+            writer = formats.StreamWriter(io.StringIO(), record_format)
+            yield f"{platform}.stream[{record_format}]", lambda writer=writer: writer.write(time.time(), values), writer.flush
+    if hasattr(module, "build_heatmap"):
+        # The whole table for a remote host of each size, in one row per core and in the heatmap view
+        width, height = RENDER_TERMINAL
+        render_console = Console(file=output, width=width, height=height, force_terminal=True, color_system="truecolor")
+        for view in ("rows", "heatmap"):
+            for cores in RENDER_CORE_COUNTS:
+                usage = synthetic_usage(cores)
+                metric_history = module.HistoryStore()
+
+                def render(view=view, usage=usage, metric_history=metric_history):
+                    module.core_view = view
+                    try:
+                        render_console.print(module.build_live_table(usage, metric_history))
+                    finally:
+                        module.core_view = "auto"
+                yield f"{platform}.render[{view}, {cores} cores]", render, advance_and_clear
+
+def synthetic_usage(cores):
+    # A get_usage() tuple for a host with `cores` CPUs at assorted loads and no GPU
+    cpu_percent = [float((37 * core) % 101) for core in range(cores)]
+    return (cpu_percent, 25.0, cores // 2, cores, [], 512.0, 55.0, 131.0, [], 1000.0, 250.0, 750.0, 25.0, 1024.0, 4096.0, ["root"], [])
+
+def check_values(platform, module, hardware):
+    """Return a list of problems with the values computed from the fixture."""
+    problems = []
+
+    def expect(what, actual, expected, tolerance=0.05):
+        if actual is None or expected is None:
+            matches = actual is expected
+        elif isinstance(expected, (list, tuple)):
+            matches = len(actual) == len(expected) and all(
+                abs(a - b) <= tolerance for a, b in zip(actual, expected))
+        else:
+            matches = abs(actual - expected) <= tolerance
+        if not matches:
+            problems.append(f"{platform}: {what} is {actual!r}, expected {expected!r}")
+
+    expected_ram = round((FAKE_MEM_TOTAL_KB - FAKE_MEM_AVAILABLE_KB) / FAKE_MEM_TOTAL_KB * 100, 1)
+    received, sent = hardware.network_bytes()
+    for backend in getattr(module, "COLLECTOR_BACKENDS", ("psutil",)):
+        register_collectors(module, backend)
+        module.get_usage()  # cpu_percent is a delta: the next call covers exactly one tick
+        hardware.advance()
+        usage = module.get_usage()
+        received, sent = hardware.network_bytes()
+        label = f"{backend} backend"
+        expect(f"CPU usage ({label})", usage[0], [float(busy) for busy in hardware.busy])
+        expect(f"RAM usage ({label})", usage[1], expected_ram)
+        if platform in ("linux", "pi"):
+            # Discovered the same way on both: thermal_zone0 is only a copy of the coretemp package sensor here
+            expect(f"CPU temperature ({label})", usage[6], FAKE_CORETEMP_MILLIDEGREES / 1000)
+            expect(f"network sent/received ({label})", usage[13:15],
+                   [round(sent / 1024 ** 2, 2), round(received / 1024 ** 2, 2)], 0.005)
+        if platform == "linux":
+            expect(f"GPU usage ({label})", usage[4], [float(gpu[2]) for gpu in FAKE_GPUS])
+            expect(f"GPU temperatures ({label})", usage[8], [float(gpu[3]) for gpu in FAKE_GPUS])
+            if list(usage[16]) != [gpu[1] for gpu in FAKE_GPUS]:
+                problems.append(f"{platform}: GPU models are {usage[16]!r}")
+        elif platform == "windows":
+            expect(f"CPU temperature ({label})", usage[4], FAKE_OHM_CPU_CELSIUS)
+            expect(f"GPU usage ({label})", usage[2], float(FAKE_GPUS[0][2]))
+            expect(f"GPU temperature ({label})", usage[5], float(FAKE_GPUS[0][3]))
+            expect(f"network sent/received ({label})", usage[7:9],
+                   [round(sent / 1024 ** 2, 2), round(received / 1024 ** 2, 2)], 0.005)
+        # The exporter's byte counters are exact, not the rounded MB of the table
+        if hasattr(module, "sample_fields"):
+            metrics = formats.format_prometheus_metrics(usage, module.collector_scheduler, module.get_hardware_inventory().total_ram)
+            for counter, expected in (("network_sent_bytes_total", sent), ("network_received_bytes_total", received)):
+                if f"_{counter} {expected}\n" not in metrics:
+                    problems.append(f"{platform}: {counter} ({label}) is not the fixture's {expected} bytes")
+            # So are the network fields of --record, --agent and --format
+            values = module.sample_fields()[0]
+            if (values["network.sent"], values["network.recv"]) != (sent, received):
+                problems.append(f"{platform}: network fields ({label}) are {values['network.sent']!r} and "
+                                f"{values['network.recv']!r}, not the fixture's {sent} and {received} bytes")
+    register_collectors(module)
+
+    if platform == "windows":
+        if not module.get_hardware_inventory().cpu_model.startswith(FAKE_WMIC_CPU_CAPTION):
+            problems.append(f"{platform}: CPU model is {module.get_hardware_inventory().cpu_model!r}")
+        expected_storage = [(drive, drive.split(":")[0], round(total / 1024 ** 3, 2), round(used / 1024 ** 3, 2),
+                             round(free / 1024 ** 3, 2), percent) for drive, total, used, free, percent in FAKE_WINDOWS_DRIVES]
+        if module.get_storage_info() != expected_storage:
+            problems.append(f"{platform}: storage is {module.get_storage_info()!r}, expected {expected_storage!r}")
+
+        # The OpenHardwareMonitor connection is made once per thread and then reused
+        wmi = sys.modules["wmi"]
+        connections = wmi.connections
+        for _ in range(5):
+            module.get_cpu_temperature()
+        if wmi.connections != connections or connections != 1:
+            problems.append(f"{platform}: {wmi.connections} WMI connections made on one thread, expected 1")
+
+    # One full pass over the fixture processes, then the largest by RSS must come out in order
+    tracker = module.process_tracker
+    tracker.sort = "rss"
+    for _ in range(-(-hardware.processes // tracker.batch) + 1):
+        tracker.sample()
+    expected_pids = sorted(hardware.resident_pages, key=hardware.resident_pages.get, reverse=True)[:tracker.limit]
+    actual_pids = [pid for pid, name, cpu_percent, rss, io_rate in tracker.top()]
+    if actual_pids != expected_pids:
+        problems.append(f"{platform}: top processes by RSS are {actual_pids}, expected {expected_pids}")
+    tracker.sort = "cpu"
+
+    # Rates over exactly one tick of one second: eth0 and the whole disks only
+    if hasattr(module, "CounterRates"):
+        module.network_rates.update(psutil.net_io_counters(pernic=True, nowrap=False), now=0.0)
+        module.disk_rates.update(psutil.disk_io_counters(perdisk=True, nowrap=False), now=0.0)
+        hardware.advance()
+        interfaces = module.network_rates.update(psutil.net_io_counters(pernic=True, nowrap=False), now=1.0)
+        disks = module.disk_rates.update(psutil.disk_io_counters(perdisk=True, nowrap=False), now=1.0)
+        if sorted(interfaces) != ["eth0"]:
+            problems.append(f"{platform}: network rates cover {sorted(interfaces)}, expected ['eth0']")
+        else:
+            expect("eth0 bytes/s sent, received", interfaces["eth0"][:2], [512 * 1024 - 4096, 1536 * 1024 - 4096])
+            expect("eth0 packets/s sent, received", interfaces["eth0"][2:4], [400, 1100])
+        if sorted(disks) != sorted(FAKE_WHOLE_DISKS):
+            problems.append(f"{platform}: disk rates cover {sorted(disks)}, expected {sorted(FAKE_WHOLE_DISKS)}")
+        else:
+            for disk in FAKE_WHOLE_DISKS:
+                reads, writes, read_sectors, write_sectors, read_ms, write_ms, busy_ms = FAKE_DISKS[disk]
+                expect(f"{disk} I/O rates", disks[disk], [reads, writes, read_sectors * 512, write_sectors * 512, read_ms, write_ms, busy_ms])
+        # A 32-bit wrap the device could have made is corrected; a drop it could not is a reset, with no rate until the next call
+        counters = module.CounterRates(("value", "idle"), max_rates=lambda device: (1000.0, 1000.0))
+        rates = [counters.update({name: types.SimpleNamespace(value=value, idle=0) for name, value in (("wrapped", wrapped), ("reset", reset))}, now=now)
+                 for now, wrapped, reset in ((0.0, 2 ** 32 - 100, 3 * 10 ** 9), (1.0, 50, 10), (2.0, 1050, 510))]
+        if rates != [{}, {"wrapped": (150.0, 0.0)}, {"wrapped": (1000.0, 0.0), "reset": (500.0, 0.0)}]:
+            problems.append(f"{platform}: counter rates across a wrap and a reset are {rates!r}")
+
+    # A mount that never answers must come back stale within the deadline, without holding up the others
+    if hasattr(module, "MountMonitor"):
+        hung = threading.Event()
+        hung_path = hardware.mount_path(FAKE_HUNG_MOUNT)
+
+        def probe(mountpoint):
+            if mountpoint == hung_path:
+                hung.wait()
+            return psutil.disk_usage(mountpoint)
+
+        monitor = module.MountMonitor(deadline=0.1, probe=probe)
+        try:
+            started = time.perf_counter()
+            mounts = monitor.sample()
+            elapsed = time.perf_counter() - started
+        finally:
+            hung.set()
+            monitor.close()
+        expected_mounts = [hardware.mount_path(mountpoint) for mountpoint in FAKE_REAL_MOUNTS]
+        if [mount[0] for mount in mounts] != expected_mounts:
+            problems.append(f"{platform}: mounts are {[mount[0] for mount in mounts]}, expected {expected_mounts}")
+        if elapsed > 0.5:
+            problems.append(f"{platform}: a hung mount held the storage collector for {elapsed:.2f}s")
+        for mountpoint, fstype, total_gb, used_gb, free_gb, percent, stale in mounts:
+            if (mountpoint == hung_path) != (stale is not None):
+                problems.append(f"{platform}: mount {mountpoint} has stale={stale!r}")
+
+    # --format records: the same keys every time, a missing field as null, the CSV header once
+    if hasattr(module, "sample_fields"):
+        values = module.sample_fields()[0]
+        output = io.StringIO()
+        writer = formats.StreamWriter(output, "ndjson", ("cpu.*", "ram", "!cpu.1", "gpu.9.usage"), hostname="fixture")
+        writer.write(1.0, values)
+        writer.write(2.0, {name: value for name, value in values.items() if name != "ram"})
+        writer.flush()
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        expected_keys = ["timestamp", "hostname", *(f"cpu.{cpu}" for cpu in range(hardware.cpus) if cpu != 1), "ram", "gpu.9.usage"]
+        if [list(record) for record in records] != [expected_keys, expected_keys]:
+            problems.append(f"{platform}: NDJSON records have keys {[list(record) for record in records]!r}")
+        elif records[0]["ram"] != values["ram"] or records[1]["ram"] is not None or records[0]["gpu.9.usage"] is not None:
+            problems.append(f"{platform}: NDJSON records are {records!r}")
+        output = io.StringIO()
+        writer = formats.StreamWriter(output, "csv", ("ram", "network.*"), hostname="fixture")
+        writer.write(1.0, values)
+        writer.write(2.0, values)
+        writer.flush()
+        expected_lines = ["timestamp,hostname,ram,network.sent,network.recv"] + [
+            f"{timestamp},fixture,{values['ram']!r},{values['network.sent']!r},{values['network.recv']!r}" for timestamp in (1.0, 2.0)]
+        if output.getvalue().splitlines() != expected_lines:
+            problems.append(f"{platform}: CSV output is {output.getvalue()!r}")
+
+    # Every sensor with its label; a chip that appears later is picked up and one that goes away is dropped
+    if hasattr(module, "SensorMonitor"):
+        monitor = module.SensorMonitor(module.get_hardware_inventory, rescan_interval=0.0)
+        try:
+            sensors = monitor.sample()
+            if sensors != hardware.sensors():
+                problems.append(f"{platform}: sensors are {sensors!r}, expected {hardware.sensors()!r}")
+            hardware._write("sys/class/hwmon/hwmon4/name", "drivetemp\n")
+            hardware._write("sys/class/hwmon/hwmon4/temp1_input", "33000\n")
+            if monitor.sample()[-2:] != [("other", "drivetemp", "temp1", 33.0), hardware.sensors()[-1]]:
+                problems.append(f"{platform}: a new hwmon chip was not discovered")
+            shutil.rmtree(os.path.join(hardware.sys_root, "class/hwmon/hwmon4"))
+            if monitor.sample() != hardware.sensors():
+                problems.append(f"{platform}: a removed hwmon chip is still read")
+        finally:
+            monitor.close()
+
+    # cgroup figures over exactly one tick of one second, the monitor's own cgroup by default
+    if hasattr(module, "CgroupMonitor"):
+        monitor = module.CgroupMonitor("/system.slice", depth=1, rescan_interval=0.0)
+        own = module.CgroupMonitor()
+        try:
+            monitor.sample(now=0.0)
+            own.sample(now=0.0)
+            # Known from the first read, so the exported fields do not change after one tick
+            first_rate_fields = own.rate_fields()
+            hardware.advance()
+            cgroups = monitor.sample(now=1.0)
+            own_cgroups = own.sample(now=1.0)
+            rate_fields = [field for field in module.CGROUP_RATE_FIELDS if getattr(own_cgroups[0], field) is not None]
+            if first_rate_fields != rate_fields:
+                problems.append(f"{platform}: rate fields after the first read are {first_rate_fields!r}, expected {rate_fields!r}")
+            expected = [hardware.cgroup_sample(cgroup) for cgroup in FAKE_CGROUPS]
+            if cgroups != expected:
+                problems.append(f"{platform}: cgroups are {cgroups!r}, expected {expected!r}")
+            if own_cgroups != [hardware.cgroup_sample(FAKE_OWN_CGROUP)]:
+                problems.append(f"{platform}: own cgroup is {own_cgroups!r}")
+            shutil.rmtree(os.path.join(hardware.sys_root, "fs/cgroup/system.slice/docker-db.scope"))
+            if [cgroup.path for cgroup in monitor.sample(now=2.0)] != [cgroup[0] for cgroup in expected if "docker-db" not in cgroup[0]]:
+                problems.append(f"{platform}: a removed cgroup is still read")
+        finally:
+            monitor.close()
+            own.close()
+            hardware.advance()
+
+    if hasattr(module, "get_cpu_groups"):
+        half = hardware.cpus // 2
+        expected_groups = (("Node 0", tuple(range(half))), ("Node 1", tuple(range(half, hardware.cpus))))
+        if module.get_cpu_groups() != expected_groups:
+            problems.append(f"{platform}: CPU groups are {module.get_cpu_groups()!r}, expected {expected_groups!r}")
+
+    output = io.StringIO()
+    module.display_live_graph(Console(file=output, width=120, color_system=None))
+    rendered = output.getvalue()
+    expected_rows = [f"Core {hardware.cpus}", "Overall CPU Usage", "Used RAM", "CPU Temperature"]
+    if platform == "linux":
+        expected_rows += [f"GPU {len(FAKE_GPUS)} Usage"]
+    elif platform == "windows":
+        expected_rows += ["GPU Usage", "GPU Temperature"] + [f"{drive} ({drive[0]}) Storage Usage" for drive, *_ in FAKE_WINDOWS_DRIVES]
+    for row in expected_rows:
+        if row not in rendered:
+            problems.append(f"{platform}: display_live_graph did not draw a {row!r} row")
+    if f"Core {hardware.cpus + 1}" in rendered:
+        problems.append(f"{platform}: display_live_graph drew more cores than the machine has")
+    return problems
+
+def load_thresholds(path=None):
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    if path:
+        with open(path, "r") as file:
+            for pattern, limits in json.load(file).items():
+                thresholds[pattern] = {**thresholds.get(pattern, {}), **limits}
+    return thresholds
+
+def limits_for(case, thresholds):
+    limits = {}
+    for pattern, pattern_limits in thresholds.items():
+        if fnmatch.fnmatchcase(case, pattern):
+            limits.update(pattern_limits)
+    return limits
+
+def wait_for_gpus(module, timeout=5.0):
+    module.gpu_monitor.start()
+    deadline = time.monotonic() + timeout
+    while len(module.gpu_monitor.samples()) < len(FAKE_GPUS) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the Linux, Raspberry Pi and Windows collectors against a fake machine")
+    parser.add_argument("--ticks", type=int, default=200,
+                        help="timed calls per case (default: 200)")
+    parser.add_argument("--cpus", type=int, default=16,
+                        help="CPUs in the fixture /proc/stat (default: 16)")
+    parser.add_argument("--processes", type=int, default=2000,
+                        help="processes in the fixture /proc for the process table (default: 2000)")
+    parser.add_argument("--platform", choices=sorted(PLATFORM_SCRIPTS), action="append",
+                        help="only benchmark this script (may be repeated; default: all)")
+    parser.add_argument("--filter", metavar="PATTERN",
+                        help="only run cases whose name matches this shell-style pattern")
+    parser.add_argument("--thresholds", metavar="FILE",
+                        help="JSON file of {pattern: {metric: limit}} merged over the built-in thresholds")
+    parser.add_argument("--json", metavar="FILE",
+                        help="also write the results to FILE as JSON")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    console = Console()
+    if not console.is_terminal:
+        # CI logs: do not squeeze the results into 80 columns
+        console.width = 120
+    thresholds = load_thresholds(args.thresholds)
+    root = tempfile.mkdtemp(prefix="server-monitor-bench-")
+    hardware = FakeHardware(root, args.cpus, args.processes)
+    hardware.create()
+    # The backends read /proc through psutil as well as directly
+    psutil.PROCFS_PATH = hardware.proc_root
+    os.environ["PATH"] = hardware.bin_dir + os.pathsep + os.environ.get("PATH", "")
+    sys.addaudithook(_count_spawns)
+
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Case", justify="left", no_wrap=True)
+    table.add_column("p50", justify="right", no_wrap=True)
+    table.add_column("p99", justify="right", no_wrap=True)
+    table.add_column("CPU / tick", justify="right", no_wrap=True)
+    table.add_column("Spawns / tick", justify="right", no_wrap=True)
+    table.add_column("Alloc / tick", justify="right", no_wrap=True)
+    table.add_column("Result", justify="left")
+    results, failures = {}, []
+    modules = []
+    try:
+        for platform in args.platform or sorted(PLATFORM_SCRIPTS):
+            module = load_platform(platform, hardware)
+            modules.append(module)
+            if hasattr(module, "gpu_monitor"):
+                wait_for_gpus(module)
+            module.get_hardware_inventory()
+            failures += check_values(platform, module, hardware)
+            output = io.StringIO()
+            cases = list(benchmark_cases(platform, module, hardware, output))
+            for case, func, before_tick in cases + list(cold_start_cases(platform, module)):
+                if args.filter and not fnmatch.fnmatchcase(case, args.filter):
+                    continue
+                ticks = min([args.ticks] + [limit for pattern, limit in TICK_LIMITS.items()
+                                            if fnmatch.fnmatchcase(case, pattern)])
+                result = results[case] = measure(func, ticks, before_tick)
+                over = [f"{metric} > {limit}" for metric, limit in limits_for(case, thresholds).items()
+                        if result[metric] > limit]
+                failures += [f"{case}: {problem}" for problem in over]
+                table.add_row(escape(case), format_duration(result["p50_ms"]), format_duration(result["p99_ms"]),
+                              format_duration(result["cpu_ms"]), f"{result['subprocesses']:.2f}",
+                              f"{result['alloc_kib']:.1f} KiB",
+                              "[green]OK[/green]" if not over else f"[red]{', '.join(over)}[/red]")
+    finally:
+        for module in modules:
+            if hasattr(module, "gpu_monitor"):
+                module.gpu_monitor.stop()
+            if hasattr(module, "procfs_reader"):
+                module.procfs_reader.close()
+        shutil.rmtree(root, ignore_errors=True)
+
+    console.print(table)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"ticks": args.ticks, "cpus": args.cpus, "processes": args.processes, "results": results, "failures": failures}, file, indent=2)
+    for failure in failures:
+        console.print(f"[red]FAIL[/red] {escape(failure)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Live system monitor for Linux servers, the Raspberry Pi and Windows.
+
+Every platform is a backend module (linux, pi, windows) with its own
+collectors, table and command line, built on the shared core, procfs,
+export and gpu modules. Only the backend for the machine it runs on is
+imported: detect_platform() picks it at startup, so wmi is never loaded
+on Linux, and rich is not loaded until the live display starts.
+"""
+
+import importlib
+import os
+import sys
+
+BACKENDS = ("linux", "pi", "windows")
+
+def detect_platform():
+    """Return "windows", "pi" or "linux" for the machine this runs on."""
+    if sys.platform == "win32":
+        return "windows"
+    try:
+        with open("/proc/device-tree/model", "rb") as file:
+            if b"Raspberry Pi" in file.read():
+                return "pi"
+    except OSError:
+        pass
+    return "linux"
+
+def load_backend(platform=None):
+    """Import and return the backend module for `platform`, by default $SERVER_MONITOR_PLATFORM or the detected one."""
+    platform = platform or os.environ.get("SERVER_MONITOR_PLATFORM") or detect_platform()
+    if platform not in BACKENDS:
+        raise ValueError(f"unknown platform {platform!r}, expected one of {', '.join(BACKENDS)}")
+    return importlib.import_module(f"{__name__}.{platform}")
+
+def main(platform=None):
+    load_backend(platform).main()
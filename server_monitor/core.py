@@ -0,0 +1,937 @@
+"""Platform-independent parts of the monitor shared by every backend.
+
+The collector scheduler, metric history, process table and profiler, the
+psutil collectors that work the same way on every platform, the hardware
+inventory cache, the live display loop and the command line and main()
+steps the backends have in common. A backend module passes itself to the
+functions that need its collectors. Nothing here imports rich at module
+level, so the headless modes start without it.
+"""
+
+import argparse
+import bisect
+import contextlib
+import heapq
+import json
+import math
+import os
+import psutil
+import signal
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+import time
+
+class CollectorScheduler:
+    """Runs each collector on its own interval in a small thread pool.
+
+    Collectors write their latest result into a shared snapshot that the UI
+    reads without ever waiting on a probe. A collector that has not returned
+    within its timeout keeps its previous value, is reported as stale and is
+    not resubmitted until the hung call finishes.
+    """
+
+    def __init__(self, max_workers=4, initializer=None):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self._collectors = {}
+        # Reentrant: a future that finishes before add_done_callback runs its callback inline
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._executor = None
+        self._thread = None
+
+    def register(self, name, func, interval, timeout=2.0, default=None):
+        self._collectors[name] = {
+            "func": func, "interval": interval, "timeout": timeout,
+            "value": default, "updated_at": None, "error": None,
+            "future": None, "submitted_at": None, "next_run": 0.0,
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="collector",
+                                            initializer=self.initializer)
+        self._thread = threading.Thread(target=self._run, name="collector-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def wait_ready(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        for collector in self._collectors.values():
+            while collector["updated_at"] is None and collector["error"] is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+    def collectors(self):
+        return {name: collector["func"] for name, collector in self._collectors.items()}
+
+    def __contains__(self, name):
+        return name in self._collectors
+
+    def instrument(self, wrapper):
+        """Replace every registered collector with wrapper(name, func)."""
+        with self._lock:
+            for name, collector in self._collectors.items():
+                collector["func"] = wrapper(name, collector["func"])
+
+    def set_interval(self, name, interval):
+        """Change a collector's interval; the next run moves to match."""
+        with self._lock:
+            collector = self._collectors[name]
+            if collector["interval"] == interval:
+                return
+            collector["interval"] = interval
+            if collector["submitted_at"] is None:
+                return
+            next_run = collector["submitted_at"] + interval
+            sooner = next_run < collector["next_run"]
+            collector["next_run"] = next_run
+        if sooner:
+            self._wakeup.set()
+
+    def get(self, name):
+        collector = self._collectors[name]
+        if self._thread is None:
+            # Not running in the background (one-off use): probe inline
+            return collector["func"]()
+        with self._lock:
+            return collector["value"]
+
+    def stale(self):
+        """Return {name: seconds since last good value} for overdue collectors."""
+        now = time.monotonic()
+        stale = {}
+        with self._lock:
+            for name, collector in self._collectors.items():
+                overdue = collector["future"] is not None and now - collector["submitted_at"] > collector["timeout"]
+                if overdue or collector["error"] is not None:
+                    updated_at = collector["updated_at"]
+                    stale[name] = now - updated_at if updated_at is not None else None
+        return stale
+
+    def _run(self):
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            with self._lock:
+                for name, collector in self._collectors.items():
+                    # Collectors due within the slack run together, so they share one wakeup
+                    if collector["future"] is None and now + SCHEDULER_SLACK >= collector["next_run"]:
+                        collector["submitted_at"] = now
+                        collector["next_run"] = now + collector["interval"]
+                        try:
+                            collector["future"] = self._executor.submit(collector["func"])
+                        except RuntimeError:
+                            # The pool is shut down at interpreter exit
+                            return
+                        collector["future"].add_done_callback(lambda future, name=name: self._store(name, future))
+                upcoming = [collector["next_run"] for collector in self._collectors.values()
+                            if collector["future"] is None or collector["next_run"] > now]
+            # Collectors that are still busy past their next run wake the loop from _store when they finish
+            next_run = min(upcoming) if upcoming else now + 1.0
+            self._wakeup.wait(max(0.0, next_run - time.monotonic()))
+            self._wakeup.clear()
+
+    def _store(self, name, future):
+        collector = self._collectors[name]
+        with self._lock:
+            collector["future"] = None
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is None:
+                collector["value"] = future.result()
+                collector["updated_at"] = time.monotonic()
+                collector["error"] = None
+            else:
+                collector["error"] = error
+            overran = time.monotonic() >= collector["next_run"]
+        # A collector that overran its interval is due again right away; otherwise the loop already sleeps until then
+        if overran:
+            self._wakeup.set()
+
+# How early a collector may run to share a wakeup with another one that is due
+SCHEDULER_SLACK = 0.05
+
+# Disk capacity and logged-in users change slowly, so they are probed less often
+SLOW_COLLECTOR_INTERVAL = 30.0
+
+def celsius_to_fahrenheit(celsius):
+    return (celsius * 9/5) + 32
+
+def get_cpu_usage():
+    try:
+        return psutil.cpu_percent(percpu=True)
+    except Exception as e:
+        print(f"Error getting CPU usage: {e}")
+        return []
+
+def get_cpu_cores():
+    try:
+        return psutil.cpu_count(logical=False)
+    except Exception as e:
+        print(f"Error getting CPU cores: {e}")
+        return 0
+
+def get_cpu_threads():
+    try:
+        return psutil.cpu_count(logical=True)
+    except Exception as e:
+        print(f"Error getting CPU threads: {e}")
+        return 0
+
+def get_main_storage_usage():
+    try:
+        main_storage = psutil.disk_usage('/')
+        return main_storage.total, main_storage.used, main_storage.free, main_storage.percent
+    except Exception as e:
+        print(f"Error getting main storage usage: {e}")
+        return 0, 0, 0, 0
+
+def get_network_usage():
+    try:
+        network_info = psutil.net_io_counters()
+        return network_info.bytes_sent, network_info.bytes_recv
+    except Exception as e:
+        print(f"Error getting network usage: {e}")
+        return 0, 0
+
+def get_ram_usage():
+    try:
+        return psutil.virtual_memory().percent
+    except Exception as e:
+        print(f"Error getting RAM usage: {e}")
+        return 0
+
+def get_active_users():
+    try:
+        active_users = [user.name for user in psutil.users()]
+        return active_users
+    except Exception as e:
+        print(f"Error getting active users: {e}")
+        return []
+
+def get_total_ram():
+    try:
+        return psutil.virtual_memory().total
+    except Exception as e:
+        print(f"Error getting total RAM: {e}")
+        return 0
+
+class InventoryCache:
+    """Hardware details that do not change while the machine is running.
+
+    `collect` probes them and returns a tuple with a collected_at field
+    (time.monotonic()). get() probes once and then returns the same details
+    until request_refresh() is called, which the Linux and Pi monitors do on
+    SIGHUP, or until they are `refresh_interval` seconds old
+    (--inventory-interval, 0 for never).
+    """
+
+    def __init__(self, collect, refresh_interval=0):
+        self.collect = collect
+        self.refresh_interval = refresh_interval
+        self._inventory = None
+        self._refresh_requested = threading.Event()
+
+    def get(self):
+        inventory = self._inventory
+        expired = inventory is not None and self.refresh_interval > 0 and (
+            time.monotonic() - inventory.collected_at >= self.refresh_interval)
+        if inventory is None or expired or self._refresh_requested.is_set():
+            self._refresh_requested.clear()
+            inventory = self._inventory = self.collect()
+        return inventory
+
+    def request_refresh(self, signum=None, frame=None):
+        self._refresh_requested.set()
+
+def read_usage(scheduler, inventory):
+    """Return the get_usage() tuple of the Linux and Pi backends from their latest collector values.
+
+    The GPU figures are empty lists where no GPU collectors are registered.
+    """
+    try:
+        gpu_models = list(getattr(inventory, "gpu_models", ()))
+        gpu_percent = scheduler.get("gpu_usage") if "gpu_usage" in scheduler else []
+        gpu_temperatures = scheduler.get("gpu_temperature") if "gpu_temperature" in scheduler else []
+        cpu_temp_celsius = scheduler.get("cpu_temperature")
+        cpu_temp_fahrenheit = celsius_to_fahrenheit(cpu_temp_celsius) if cpu_temp_celsius is not None else None
+        # The collectors keep bytes; the table uses GB and MB. Bytes over 2**20 are exact in a float, so the
+        # network MB are left unrounded and usage_to_fields turns them back into the byte counters
+        total_storage, used_storage, free_storage, used_storage_percent = scheduler.get("storage")
+        bytes_sent, bytes_recv = scheduler.get("network")
+        total_ram = round(inventory.total_ram / (1024.0 ** 3), 2)
+        total_storage_gb, used_storage_gb, free_storage_gb = (round(value / (1024.0 ** 3), 2) for value in (total_storage, used_storage, free_storage))
+        sent_mb, recv_mb = bytes_sent / (1024.0 ** 2), bytes_recv / (1024.0 ** 2)
+        return (
+            scheduler.get("cpu"), scheduler.get("ram"), inventory.cpu_cores, inventory.cpu_threads, gpu_percent, total_ram,
+            cpu_temp_celsius, cpu_temp_fahrenheit, gpu_temperatures, total_storage_gb, used_storage_gb, free_storage_gb,
+            used_storage_percent, sent_mb, recv_mb, scheduler.get("users"), gpu_models
+        )
+    except Exception as e:
+        print(f"Error getting system usage: {e}")
+        return [], 0, 0, 0, [], 0, None, None, [], 0, 0, 0, 0, 0, 0, [], []
+
+# Processes refreshed per tick by the process table; on a host with more,
+# one pass over all of them is spread across several ticks
+PROCESS_SCAN_BATCH = 1000
+PROCESS_SCAN_INTERVAL = 2.0
+PROCESS_SORT_KEYS = {"cpu": "cpu_percent", "rss": "rss", "io": "io_rate"}
+PROCESS_ATTRIBUTES = ("name", "cpu_percent", "rss", "io_rate")
+PROCESS_SORT_LABELS = {"cpu": "CPU", "rss": "memory", "io": "I/O"}
+
+class ProcessEntry:
+    __slots__ = ("pid", "process", "name", "cpu_percent", "rss", "io_rate", "io_total", "io_at", "io_denied", "refreshed_at")
+
+    def __init__(self, process):
+        self.pid = process.pid
+        self.process = process
+        self.name = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.io_rate = 0.0
+        self.io_total = None
+        self.io_at = None
+        self.io_denied = False
+        self.refreshed_at = None
+
+class ProcessTracker:
+    """Top-N processes by CPU, RSS or I/O without a full scan on every tick.
+
+    psutil.Process objects are cached by pid, so cpu_percent() has a
+    baseline and the name is only read once. Each tick refreshes at most
+    `batch` cached processes inside oneshot(), and only the attribute the
+    table is ranked by; on hosts with more processes than that, one pass is
+    spread over several ticks. The top N are picked with a heap instead of
+    sorting every process, and only those have their other columns read.
+    The pid list is re-read and exited processes pruned once per pass.
+    """
+
+    def __init__(self, limit=5, sort="cpu", batch=PROCESS_SCAN_BATCH):
+        self.limit = limit
+        self.sort = sort
+        self.batch = batch
+        self._entries = {}
+        self._order = []
+        self._cursor = 0
+
+    def sample(self):
+        if not self.limit:
+            return []
+        try:
+            if self._cursor >= len(self._order):
+                self._rescan()
+            batch = self._order[self._cursor:self._cursor + self.batch]
+            self._cursor += len(batch)
+            now = time.monotonic()
+            sort_key = PROCESS_SORT_KEYS[self.sort]
+            for pid in batch:
+                entry = self._entries.get(pid)
+                if entry is not None and not self._refresh(entry, now, (sort_key,)):
+                    del self._entries[pid]
+            top = []
+            for entry in self._top_entries():
+                # cpu_percent() is a delta, so never read it twice in one tick
+                attributes = [name for name in PROCESS_ATTRIBUTES if name != sort_key or entry.refreshed_at != now]
+                if self._refresh(entry, now, attributes):
+                    top.append(entry)
+                else:
+                    del self._entries[entry.pid]
+            return [(entry.pid, entry.name, entry.cpu_percent, entry.rss, entry.io_rate) for entry in top]
+        except Exception as e:
+            print(f"Error getting process usage: {e}")
+            return []
+
+    def top(self):
+        """Return [(pid, name, cpu_percent, rss, io_rate)] for the busiest processes seen so far."""
+        return [(entry.pid, entry.name, entry.cpu_percent, entry.rss, entry.io_rate) for entry in self._top_entries()]
+
+    def _top_entries(self):
+        return heapq.nlargest(self.limit, self._entries.values(), key=attrgetter(PROCESS_SORT_KEYS[self.sort]))
+
+    def _rescan(self):
+        pids = psutil.pids()
+        alive = set(pids)
+        for pid in [pid for pid in self._entries if pid not in alive]:
+            del self._entries[pid]
+        for pid in pids:
+            if pid not in self._entries:
+                try:
+                    self._entries[pid] = ProcessEntry(psutil.Process(pid))
+                except psutil.Error:
+                    pass
+        self._order = pids
+        self._cursor = 0
+
+    def _refresh(self, entry, now, attributes):
+        """Re-read some attributes of one process; returns False once it has exited."""
+        process = entry.process
+        try:
+            # oneshot() only pays off when more than one attribute comes from the same files
+            with process.oneshot() if len(attributes) > 1 else contextlib.nullcontext():
+                if "name" in attributes and entry.name is None:
+                    entry.name = process.name()
+                if "cpu_percent" in attributes:
+                    entry.cpu_percent = process.cpu_percent(None)
+                if "rss" in attributes:
+                    entry.rss = process.memory_info().rss
+                if "io_rate" in attributes and not entry.io_denied:
+                    try:
+                        io_counters = process.io_counters()
+                    except psutil.AccessDenied:
+                        # Other users' I/O counters need privileges; do not ask again every pass
+                        entry.io_denied = True
+                    else:
+                        io_total = io_counters.read_bytes + io_counters.write_bytes
+                        if entry.io_total is not None and now > entry.io_at:
+                            entry.io_rate = max(0.0, (io_total - entry.io_total) / (now - entry.io_at))
+                        entry.io_total, entry.io_at = io_total, now
+        except psutil.NoSuchProcess:
+            return False
+        except psutil.AccessDenied:
+            pass
+        entry.refreshed_at = now
+        return True
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# History kept per metric: raw samples for the last few minutes, then
+# 10 second and 1 minute min/avg/max rollups covering 6 and 24 hours.
+HISTORY_RAW_SAMPLES = 300
+HISTORY_ROLLUPS = ((10, 6 * 360), (60, 24 * 60))
+
+class RingBuffer:
+    """Fixed-capacity float32 ring buffer backed by an array."""
+
+    __slots__ = ("values", "head", "count")
+
+    def __init__(self, capacity):
+        self.values = array("f", bytes(4 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.head] = value
+        self.head = (self.head + 1) % len(self.values)
+        if self.count < len(self.values):
+            self.count += 1
+
+    def last(self, n):
+        """Return the newest n values, oldest first, as an array."""
+        n = min(n, self.count)
+        start = (self.head - n) % len(self.values)
+        if start + n <= len(self.values):
+            return self.values[start:start + n]
+        return self.values[start:] + self.values[:self.head]
+
+    @property
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+class Rollup:
+    """min/avg/max of a metric over fixed-length time buckets."""
+
+    __slots__ = ("seconds", "minimum", "average", "maximum", "_bucket", "_min", "_max", "_sum", "_count")
+
+    def __init__(self, seconds, capacity):
+        self.seconds = seconds
+        self.minimum = RingBuffer(capacity)
+        self.average = RingBuffer(capacity)
+        self.maximum = RingBuffer(capacity)
+        self._bucket = None
+        self._count = 0
+
+    def add(self, value, now):
+        bucket = int(now // self.seconds)
+        if bucket != self._bucket:
+            if self._count:
+                self.minimum.append(self._min)
+                self.average.append(self._sum / self._count)
+                self.maximum.append(self._max)
+            self._bucket, self._min, self._max, self._sum, self._count = bucket, value, value, 0.0, 0
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+        self._sum += value
+        self._count += 1
+
+    @property
+    def nbytes(self):
+        return self.minimum.nbytes + self.average.nbytes + self.maximum.nbytes
+
+class MetricHistory:
+    __slots__ = ("raw", "rollups")
+
+    def __init__(self):
+        self.raw = RingBuffer(HISTORY_RAW_SAMPLES)
+        self.rollups = [Rollup(seconds, capacity) for seconds, capacity in HISTORY_ROLLUPS]
+
+    def add(self, value, now):
+        self.raw.append(value)
+        for rollup in self.rollups:
+            rollup.add(value, now)
+
+    def window(self, seconds, interval):
+        """Averages covering the last `seconds`, from the finest resolution that reaches back that far."""
+        samples = int(seconds / interval)
+        if samples <= self.raw.count or not self.rollups[0].average.count:
+            return self.raw.last(samples)
+        for rollup in self.rollups:
+            if seconds <= rollup.seconds * len(rollup.average.values):
+                break
+        return rollup.average.last(int(seconds / rollup.seconds))
+
+    @property
+    def nbytes(self):
+        return self.raw.nbytes + sum(rollup.nbytes for rollup in self.rollups)
+
+def downsample(values, points):
+    """Average consecutive runs of values down to at most `points` values."""
+    if len(values) <= points:
+        return list(values)
+    step = len(values) / points
+    # Slicing and summing the array both run in C, so this stays cheap for long windows
+    return [sum(chunk) / len(chunk) for chunk in (values[int(i * step):int((i + 1) * step)] for i in range(points))]
+
+class HistoryStore:
+    """Bounded per-metric history used to draw the Graph column."""
+
+    def __init__(self, interval=1.0, window=60.0, width=20):
+        self.interval = interval
+        self.window = window
+        self.width = width
+        self.metrics = {}
+        self._counters = {}
+
+    def record(self, name, value, now):
+        if value is None:
+            return
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = MetricHistory()
+        metric.add(float(value), now)
+
+    def record_rate(self, name, total, now):
+        """Record the per-second rate of a cumulative counter and return it."""
+        previous = self._counters.get(name)
+        self._counters[name] = (total, now)
+        if previous is None or now <= previous[1] or total < previous[0]:
+            return None
+        rate = (total - previous[0]) / (now - previous[1])
+        self.record(name, rate, now)
+        return rate
+
+    def sparkline(self, name, maximum=None):
+        metric = self.metrics.get(name)
+        if metric is None:
+            return ""
+        values = downsample(metric.window(self.window, self.interval), self.width)
+        if not values:
+            return ""
+        top = maximum if maximum is not None else max(max(values), 1e-9)
+        last = len(SPARK_CHARS) - 1
+        line = "".join(SPARK_CHARS[min(last, max(0, int(value / top * last)))] for value in values)
+        # Pad on the left so the column width stays put while history fills up
+        return line.rjust(self.width)
+
+    def memory_bytes(self):
+        return sum(metric.nbytes for metric in self.metrics.values())
+
+# Upper bounds (ms) of the --profile latency histogram buckets
+PROFILE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, math.inf)
+# Calls per step that the rolling last/p95 figures are computed over
+PROFILE_WINDOW = 256
+SPAWN_AUDIT_EVENTS = frozenset({"subprocess.Popen", "os.system", "os.posix_spawn", "os.exec", "os.fork"})
+
+class StepProfile:
+    """Latencies of one instrumented step: a rolling window plus a histogram of every call."""
+
+    __slots__ = ("recent", "buckets", "calls", "errors", "spawned", "total_ms", "max_ms", "last_ms")
+
+    def __init__(self):
+        self.recent = RingBuffer(PROFILE_WINDOW)
+        self.buckets = [0] * len(PROFILE_BUCKETS_MS)
+        self.calls = self.errors = self.spawned = 0
+        self.total_ms = self.max_ms = self.last_ms = 0.0
+
+    def add(self, milliseconds, spawned=0, error=False):
+        self.recent.append(milliseconds)
+        self.buckets[bisect.bisect_left(PROFILE_BUCKETS_MS, milliseconds)] += 1
+        self.calls += 1
+        self.errors += error
+        self.spawned += spawned
+        self.total_ms += milliseconds
+        self.max_ms = max(self.max_ms, milliseconds)
+        self.last_ms = milliseconds
+
+    def percentile(self, fraction):
+        values = sorted(self.recent.last(self.recent.count))
+        if not values:
+            return None
+        return values[min(len(values) - 1, int(fraction * len(values)))]
+
+    def to_dict(self):
+        def rounded(milliseconds):
+            return round(milliseconds, 4) if milliseconds is not None else None
+        return {
+            "calls": self.calls, "errors": self.errors, "subprocesses": self.spawned,
+            "last_ms": rounded(self.last_ms), "mean_ms": rounded(self.total_ms / self.calls) if self.calls else None,
+            "p50_ms": rounded(self.percentile(0.50)), "p95_ms": rounded(self.percentile(0.95)),
+            "p99_ms": rounded(self.percentile(0.99)), "max_ms": rounded(self.max_ms), "histogram": self.buckets,
+        }
+
+class Profiler:
+    """Self-profiling behind --profile.
+
+    Each collector is wrapped so every call records its latency and the
+    subprocesses it spawned (counted per thread with an audit hook); the
+    table build and terminal render steps are recorded the same way. The
+    monitor's own CPU% and RSS are sampled once per tick.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.steps = {}
+        self.spawned = 0
+        self.started_at = None
+        self.cpu_percent = self.peak_cpu_percent = 0.0
+        self.rss = self.peak_rss = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._process = None
+
+    def start(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started_at = time.time()
+        self._process = psutil.Process()
+        self._process.cpu_percent(None)
+        # Audit hooks cannot be removed again, so the hook is only installed when profiling
+        sys.addaudithook(self._audit)
+
+    def _audit(self, event, args):
+        if event in SPAWN_AUDIT_EVENTS:
+            with self._lock:
+                self.spawned += 1
+            self._local.spawned = getattr(self._local, "spawned", 0) + 1
+
+    def wrap(self, name, func):
+        def profiled(*args, **kwargs):
+            spawned_before = getattr(self._local, "spawned", 0)
+            started = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                self.record(name, (time.perf_counter() - started) * 1000,
+                            getattr(self._local, "spawned", 0) - spawned_before, error)
+        return profiled
+
+    def record(self, name, milliseconds, spawned=0, error=False):
+        with self._lock:
+            step = self.steps.get(name)
+            if step is None:
+                step = self.steps[name] = StepProfile()
+            step.add(milliseconds, spawned, error)
+
+    def sample_process(self):
+        try:
+            self.cpu_percent = self._process.cpu_percent(None)
+            self.rss = self._process.memory_info().rss
+        except psutil.Error as e:
+            print(f"Error sampling the monitor process: {e}")
+        self.peak_cpu_percent = max(self.peak_cpu_percent, self.cpu_percent)
+        self.peak_rss = max(self.peak_rss, self.rss)
+
+    def build_panel(self):
+        from rich.table import Table
+        table = Table(show_header=True, header_style="bold magenta", title="Monitor Profile")
+        table.add_column("Step", justify="left")
+        table.add_column("Calls", justify="right")
+        table.add_column("Last", justify="right")
+        table.add_column("p95", justify="right")
+        table.add_column("Max", justify="right")
+        table.add_column("Subprocesses", justify="right")
+        with self._lock:
+            for name, step in self.steps.items():
+                table.add_row(name, f"{step.calls}", f"{step.last_ms:.2f} ms", f"{step.percentile(0.95):.2f} ms",
+                              f"{step.max_ms:.2f} ms", f"{step.spawned}", style="red" if step.errors else None)
+            table.add_row("Monitor process", "", f"CPU {self.cpu_percent:.1f}%", f"RSS {self.rss / 1024 ** 2:.1f} MiB",
+                          "", f"{self.spawned} total", style="dim")
+        return table
+
+    def dump(self, path, **metadata):
+        self.sample_process()
+        with self._lock:
+            report = {
+                "started_at": self.started_at,
+                "duration_s": time.time() - self.started_at,
+                **metadata,
+                "process": {
+                    "cpu_percent": self.cpu_percent, "peak_cpu_percent": self.peak_cpu_percent,
+                    "rss_bytes": self.rss, "peak_rss_bytes": self.peak_rss, "subprocesses": self.spawned,
+                },
+                # The last bucket has no upper bound
+                "histogram_upper_bounds_ms": [bound if bound != math.inf else None for bound in PROFILE_BUCKETS_MS],
+                "steps": {name: step.to_dict() for name, step in self.steps.items()},
+            }
+        with open(path, "w") as file:
+            json.dump(report, file, indent=2)
+
+def terminal_visible(console):
+    """True when drawing would be seen: stdout is a terminal and this is its foreground job."""
+    if not console.is_terminal:
+        return False
+    try:
+        return os.tcgetpgrp(console.file.fileno()) == os.getpgrp()
+    except (AttributeError, OSError, ValueError):
+        return True
+
+def render_live_graph(module, console, interval=1.0, max_fps=4.0, frame_stats=False, profile=False, retune=None):
+    """Draw the system information and live table of the backend `module` until interrupted.
+
+    While stdout is not a terminal or the monitor is a background job, the
+    collectors keep sampling but nothing is drawn. `retune(now, visible)`,
+    when given, returns the interval to sample at from then on (the Pi's
+    --adaptive).
+    """
+    from .display import FrameRenderer
+    from rich.console import Group
+    from rich.text import Text
+    renderer = FrameRenderer(console, max_fps=max_fps)
+    profiler, history = module.profiler, module.history
+    visible = False
+    try:
+        next_sample_at = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now >= next_sample_at:
+                was_visible, visible = visible, terminal_visible(console)
+                if visible and not was_visible:
+                    # First frame, or back in the foreground: whatever was on screen is gone
+                    if renderer.is_started:
+                        renderer.invalidate()
+                    else:
+                        renderer.start()
+                if retune is not None:
+                    interval = retune(now, visible)
+                next_sample_at = now + interval
+                if not visible:
+                    # Not a terminal, or a background job: keep sampling, skip the drawing
+                    time.sleep(max(0.0, next_sample_at - time.monotonic()))
+                    continue
+                # System information and the live graph form one persistent frame
+                build_started = time.perf_counter()
+                frame = [module.build_system_info(), module.build_live_table()]
+                if profile:
+                    profiler.record("build_live_table", (time.perf_counter() - build_started) * 1000)
+                    profiler.sample_process()
+                    frame.append(profiler.build_panel())
+                if frame_stats:
+                    frame.append(Text(f"{renderer.stats_line()}, history {history.memory_bytes() / 1024:.0f} KiB "
+                                      f"for {len(history.metrics)} metrics", style="dim"))
+                renderer.update(Group(*frame))
+            frames = renderer.frames
+            next_frame_at = renderer.flush()
+            if profile and renderer.frames != frames:
+                profiler.record("render", renderer.last_render_time * 1000)
+            wake_at = next_sample_at if next_frame_at is None else min(next_sample_at, next_frame_at)
+            time.sleep(max(0.0, wake_at - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.stop()
+        if frame_stats:
+            console.print(renderer.summary())
+
+def build_parser(description, inventory_help):
+    """The options every backend has: sampling, the display, the process table and --profile."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--inventory-interval", type=float, default=0, help=inventory_help)
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="seconds between samples (default: 1)")
+    parser.add_argument("--max-fps", type=float, default=4.0,
+                        help="maximum screen updates per second, independent of --interval (default: 4)")
+    parser.add_argument("--graph-window", type=float, default=60.0,
+                        help="seconds of history drawn in the Graph column (default: 60, up to 24 hours)")
+    parser.add_argument("--frame-stats", action="store_true",
+                        help="show render time and bytes written per frame, and a summary on exit")
+    parser.add_argument("--profile", metavar="FILE", nargs="?", const="server-monitor-profile.json",
+                        help="time every collector and the render step, show them in an extra panel "
+                             "and write them to FILE as JSON on exit (default: server-monitor-profile.json)")
+    parser.add_argument("--top-processes", type=int, metavar="N", default=5,
+                        help="show the N busiest processes next to the per-core rows (default: 5, 0 to hide)")
+    parser.add_argument("--top-sort", choices=sorted(PROCESS_SORT_KEYS), default="cpu",
+                        help="rank the process rows by CPU, resident memory or disk I/O (default: cpu)")
+    return parser
+
+def add_export_arguments(parser, collector_backends):
+    """The Linux and Pi options: the exporter, the fleet agent, --record, --format and the collector backends."""
+    from .formats import FLEET_PORT, RECORD_KEEP_SEGMENTS, RECORD_SEGMENT_SECONDS, STREAM_FORMATS
+    parser.add_argument("--serve", type=int, metavar="PORT", nargs="?", const=9100,
+                        help="run headless and serve the latest sample in Prometheus format on PORT (default: 9100)")
+    parser.add_argument("--bind",
+                        help="listen address for --serve (default: 127.0.0.1)")
+    parser.add_argument("--benchmark-scrapes", type=int, metavar="SCRAPES", nargs="?", const=5000,
+                        help="measure exporter scrapes per second on localhost and exit")
+    parser.add_argument("--agent", metavar="HOST[:PORT]",
+                        help=f"run headless and stream samples to a fleet aggregator (default port: {FLEET_PORT})")
+    parser.add_argument("--record", metavar="FILE",
+                        help="append every sample to a memory-mapped sample log in FILE, next to the normal display")
+    parser.add_argument("--record-segment-hours", type=float, default=RECORD_SEGMENT_SECONDS / 3600,
+                        help=f"hours of samples per --record file before it is rotated (default: {RECORD_SEGMENT_SECONDS // 3600})")
+    parser.add_argument("--record-keep", type=int, default=RECORD_KEEP_SEGMENTS,
+                        help=f"rotated --record files to keep as FILE.1, FILE.2, ... (default: {RECORD_KEEP_SEGMENTS})")
+    parser.add_argument("--format", choices=STREAM_FORMATS,
+                        help="write one NDJSON or CSV record per sample instead of drawing the table")
+    parser.add_argument("--output", metavar="FILE",
+                        help="append the --format records to FILE instead of stdout")
+    parser.add_argument("--fields", type=lambda value: tuple(value.split(",")), default=(), metavar="GLOBS",
+                        help="comma-separated field name patterns for --format, '!' to exclude, e.g. 'cpu.*,ram' (default: all)")
+    parser.add_argument("--count", type=int, metavar="N",
+                        help="stop after N --format records (default: run until interrupted)")
+    parser.add_argument("--backend", choices=sorted(collector_backends), default="psutil",
+                        help="read CPU, RAM, temperature and network through psutil or directly from /proc and /sys")
+    parser.add_argument("--check-backend", action="store_true",
+                        help="compare the procfs backend against psutil and exit")
+    parser.add_argument("--benchmark-backends", type=int, metavar="TICKS", nargs="?", const=1000,
+                        help="measure per-tick CPU time and allocations of each backend and exit")
+
+# Modes that draw tables even when a headless option is also given, since they run first
+DRAWING_MODES = ("check_backend", "benchmark_backends", "benchmark_scrapes", "fleet_simulate", "benchmark_record",
+                 "replay", "aggregate")
+# Modes that cannot share a run with --format, which owns stdout; not every backend has all of them
+FORMAT_EXCLUSIVE_MODES = DRAWING_MODES + ("agent", "serve")
+
+def parse_monitor_args(parser):
+    """Parse the command line of the Linux or Pi monitor, refusing --format next to another mode."""
+    args = parser.parse_args()
+    if args.format:
+        # Unset options are None or False; a port of 0 is still given
+        given = [name for name, value in vars(args).items()
+                 if name in FORMAT_EXCLUSIVE_MODES and value is not None and value is not False]
+        if given:
+            parser.error(f"--format cannot be combined with --{given[0].replace('_', '-')}")
+    return args
+
+def open_console(args):
+    """The rich Console for the modes that draw, or None for --format, --agent and --serve.
+
+    Importing rich takes tens of milliseconds that a headless exporter or
+    agent has no use for, so those modes print plain lines instead.
+    """
+    headless = args.format or getattr(args, "agent", None) or getattr(args, "serve", None) is not None
+    if headless and not any(getattr(args, name, None) for name in DRAWING_MODES):
+        return None
+    from rich.console import Console
+    return Console()
+
+def report(console, message):
+    """Print a closing message through the console, or on stderr when there is none, clear of any records on stdout."""
+    if console is not None:
+        console.print(message)
+    else:
+        print(message, file=sys.stderr)
+
+def _prometheus_metrics(module):
+    from .formats import format_prometheus_metrics
+    return format_prometheus_metrics(module.get_usage(), module.collector_scheduler, module.get_hardware_inventory().total_ram)
+
+def run_tool(module, args, console):
+    """Run --check-backend, --benchmark-backends or --benchmark-scrapes; False when none of them was given."""
+    from .procfs import benchmark_backends, check_backends
+    if args.check_backend:
+        sys.exit(0 if check_backends(console, module.COLLECTOR_BACKENDS) else 1)
+    if args.benchmark_backends:
+        benchmark_backends(console, module.COLLECTOR_BACKENDS, args.benchmark_backends)
+        return True
+    if args.benchmark_scrapes:
+        from .servers import benchmark_scrapes
+        benchmark_scrapes(console, lambda: _prometheus_metrics(module), args.benchmark_scrapes)
+        return True
+    return False
+
+@contextlib.contextmanager
+def running_collectors(module, args, console, close=()):
+    """Run the collectors of the Linux or Pi backend `module`, and --record and --profile, for the body.
+
+    Afterwards the scheduler is stopped, every function in `close` is
+    called and the --profile report is written.
+    """
+    inventory = module.hardware_inventory
+    inventory.refresh_interval = args.inventory_interval
+    signal.signal(signal.SIGHUP, inventory.request_refresh)
+    inventory.get()
+    module.process_tracker.limit, module.process_tracker.sort = args.top_processes, args.top_sort
+    module.register_collectors(args.interval, args.backend)
+    if args.profile:
+        module.profiler.start()
+        module.collector_scheduler.instrument(module.profiler.wrap)
+    module.history.interval, module.history.window = args.interval, args.graph_window
+    module.collector_scheduler.start()
+    module.collector_scheduler.wait_ready()
+    recorder = None
+    if args.record:
+        from .formats import SampleRecorder
+        recorder = SampleRecorder(args.record, args.interval, args.record_segment_hours * 3600, args.record_keep, platform=module.PLATFORM)
+        recorder.start(module.sample_fields)
+    try:
+        yield
+    finally:
+        if recorder is not None:
+            recorder.stop()
+        module.collector_scheduler.stop()
+        for func in close:
+            func()
+        if args.profile:
+            module.profiler.dump(args.profile, platform=module.PLATFORM, backend=args.backend, interval=args.interval)
+            report(console, f"Profile written to {args.profile}")
+
+def run_mode(module, args, draw):
+    """Run --format, --agent or --serve on the running collectors of `module`, or else draw()."""
+    if args.format:
+        from .formats import STREAM_BUFFER_SIZE, StreamWriter
+        stream = open(args.output, "a", buffering=STREAM_BUFFER_SIZE, newline="") if args.output else sys.stdout
+        # A CSV file that already has rows keeps its header
+        writer = StreamWriter(stream, args.format, args.fields, header=stream is sys.stdout or stream.tell() == 0)
+        try:
+            # Collector errors are printed; keep them out of the records
+            with contextlib.redirect_stdout(sys.stderr):
+                writer.run(lambda: module.sample_fields()[0], args.interval, args.count)
+        except BrokenPipeError:
+            # The reader went away (`| head`); Python would complain again when it flushes stdout at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+    elif args.agent:
+        from .formats import FLEET_PORT
+        host, _, port = args.agent.partition(":")
+        print(f"Streaming samples to {host}:{port or FLEET_PORT}")
+        import asyncio
+        from .servers import FleetAgent
+        try:
+            asyncio.run(FleetAgent(host, module.sample_fields, int(port or FLEET_PORT), args.interval, platform=module.PLATFORM).run())
+        except KeyboardInterrupt:
+            pass
+    elif args.serve is not None:
+        bind = args.bind or "127.0.0.1"
+        print(f"Serving metrics on http://{bind}:{args.serve}/metrics")
+        from .servers import MetricsExporter
+        MetricsExporter(lambda: _prometheus_metrics(module), bind, args.serve, args.interval).run()
+    else:
+        draw()
@@ -0,0 +1,193 @@
+"""The full-screen live display.
+
+This is the only module that imports rich at module level. The backends
+import it when they start drawing, so --format, --serve and --agent never
+pay for loading rich.
+"""
+
+import io
+import sys
+import threading
+from rich.console import Console
+from rich.live import Live
+from rich.text import Text
+import time
+
+# Lines printed while the display is up are shown below the frame for this
+# long, at most STATUS_LINES of them, newest last
+STATUS_SECONDS = 30.0
+STATUS_LINES = 3
+
+class StatusProxy(io.TextIOBase):
+    """Stands in for sys.stdout or sys.stderr while the display is up.
+
+    Collectors report errors with print(); written straight to the terminal
+    those lines would scroll the alternate screen under the renderer, which
+    only redraws the rows it believes changed. Whole lines are handed to
+    `add_line` instead. Like rich's FileProxy, it exposes the real file as
+    rich_proxied_file so the console keeps writing to the terminal.
+    """
+
+    def __init__(self, file, add_line):
+        self.__file = file
+        self.__add_line = add_line
+        self.__buffer = ""
+
+    @property
+    def rich_proxied_file(self):
+        return self.__file
+
+    def __getattr__(self, name):
+        return getattr(self.__file, name)
+
+    def write(self, text):
+        lines = (self.__buffer + text).split("\n")
+        self.__buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                self.__add_line(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def fileno(self):
+        return self.__file.fileno()
+
+    def isatty(self):
+        return self.__file.isatty()
+
+class FrameRenderer(Live):
+    """Full-screen rich Live display that only rewrites what changed.
+
+    Each frame is rendered off-screen and compared line by line with the
+    previous one; only the terminal lines that differ are sent, so a tick
+    where a few values moved costs a few rows instead of a full repaint.
+    Frames are capped at max_fps independently of how often samples arrive,
+    and the render time and bytes written of every frame are recorded.
+    While it runs, anything printed to stdout or stderr shows up as dim
+    status lines under it instead of being written over it.
+    """
+
+    def __init__(self, console, max_fps=4.0):
+        super().__init__(console=console, screen=True, auto_refresh=False,
+                         redirect_stdout=False, redirect_stderr=False)
+        self.min_frame_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.frames = 0
+        self.last_render_time = 0.0
+        self.last_bytes_written = 0
+        self.total_render_time = 0.0
+        self.total_bytes_written = 0
+        self._previous_lines = []
+        self._previous_size = None
+        self._next_frame_at = 0.0
+        self._dirty = False
+        self._status = {}
+        self._status_lock = threading.Lock()
+        self._streams = None
+
+    def start(self, refresh=False):
+        super().start(refresh)
+        if self._streams is None and self.console.is_terminal:
+            self._streams = sys.stdout, sys.stderr
+            sys.stdout = StatusProxy(sys.stdout, self.add_status)
+            sys.stderr = StatusProxy(sys.stderr, self.add_status)
+
+    def stop(self):
+        try:
+            super().stop()
+        finally:
+            if self._streams is not None:
+                sys.stdout, sys.stderr = self._streams
+                self._streams = None
+                # The alternate screen is gone; leave the last messages in the scrollback
+                for line in self.status_lines():
+                    print(line, file=sys.stderr)
+
+    def add_status(self, line):
+        """Show `line` under the frame; a repeated line just moves to the bottom."""
+        with self._status_lock:
+            self._status.pop(line, None)
+            self._status[line] = time.monotonic()
+        self._dirty = True
+
+    def status_lines(self):
+        expired = time.monotonic() - STATUS_SECONDS
+        with self._status_lock:
+            for line in [line for line, added in self._status.items() if added < expired]:
+                del self._status[line]
+            return list(self._status)[-STATUS_LINES:]
+
+    def update(self, renderable, *, refresh=False):
+        super().update(renderable, refresh=False)
+        self._dirty = True
+        if refresh:
+            self.flush()
+
+    def flush(self):
+        """Draw the pending frame if the frame budget allows it.
+
+        Returns the monotonic time at which a still-pending frame may be
+        drawn, or None when nothing is waiting.
+        """
+        now = time.monotonic()
+        if self._dirty and now >= self._next_frame_at:
+            self.refresh()
+            self._dirty = False
+            self._next_frame_at = now + self.min_frame_interval
+        return self._next_frame_at if self._dirty else None
+
+    def refresh(self):
+        console = self.console
+        if not self._started or not console.is_terminal or console.is_dumb_terminal or console.legacy_windows:
+            return super().refresh()
+        with self._lock:
+            started = time.perf_counter()
+            size = console.size
+            offscreen = Console(file=io.StringIO(), force_terminal=True, color_system=console.color_system,
+                                width=size.width, height=size.height, legacy_windows=False)
+            offscreen.print(self.get_renderable())
+            lines = offscreen.file.getvalue().split("\n")[:-1]
+            status = self.status_lines()
+            if status:
+                # Status lines take the bottom rows, even when the frame is taller than the screen
+                offscreen.file = io.StringIO()
+                offscreen.print(Text("\n".join(status), style="dim", no_wrap=True, overflow="ellipsis"))
+                status = offscreen.file.getvalue().split("\n")[:-1][-size.height:]
+            lines = lines[:size.height - len(status)] + status
+            if size != self._previous_size:
+                # Resized (or first frame): nothing on screen can be reused
+                self._previous_lines = []
+                output = ["\x1b[H\x1b[2J"]
+            else:
+                output = []
+            for y, line in enumerate(lines):
+                if y >= len(self._previous_lines) or self._previous_lines[y] != line:
+                    output.append(f"\x1b[{y + 1};1H{line}\x1b[K")
+            if len(lines) < len(self._previous_lines):
+                output.append(f"\x1b[{len(lines) + 1};1H\x1b[J")
+            data = "".join(output)
+            if data:
+                console.file.write(data)
+                console.file.flush()
+            self._previous_lines = lines
+            self._previous_size = size
+            self.frames += 1
+            self.last_render_time = time.perf_counter() - started
+            self.last_bytes_written = len(data.encode("utf-8"))
+            self.total_render_time += self.last_render_time
+            self.total_bytes_written += self.last_bytes_written
+
+    def invalidate(self):
+        # Whatever is on screen is unknown (e.g. the job was in the background): redraw in full
+        self._previous_size = None
+        self._dirty = True
+
+    def stats_line(self):
+        return f"frame {self.frames}: {self.last_render_time * 1000:.1f} ms, {self.last_bytes_written} bytes written"
+
+    def summary(self):
+        if not self.frames:
+            return "No frames rendered"
+        return (f"{self.frames} frames, avg {self.total_render_time / self.frames * 1000:.2f} ms render, "
+                f"avg {self.total_bytes_written / self.frames:.0f} bytes/frame, {self.total_bytes_written} bytes total")
@@ -0,0 +1,519 @@
+"""Sample formats shared by the Linux and Pi backends.
+
+The get_usage() tuple as numeric fields and as a Prometheus text
+exposition, the fleet protocol frames, the memory-mapped sample log and
+the NDJSON/CSV stream writer. None of them knows which platform it runs
+on: the backend hands each one its platform name and a callable that
+takes a sample (its sample_fields()). The servers that send these over
+the network live in servers.py.
+"""
+
+import csv
+import fnmatch
+import io
+import json
+import math
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+
+from .core import celsius_to_fahrenheit
+
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class PrometheusWriter:
+    """Builds a Prometheus text exposition, keeping each metric family together."""
+
+    def __init__(self, prefix="shadowteam_"):
+        self.prefix = prefix
+        self._families = {}
+
+    def add(self, metric, value, help_text, metric_type="gauge", **labels):
+        if value is None:
+            return
+        name = self.prefix + metric
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+        label_text = ",".join(f'{key}="{_escape_label_value(label)}"' for key, label in labels.items())
+        value_text = repr(value) if isinstance(value, int) else repr(float(value))
+        family.append(f"{name}{{{label_text}}} {value_text}" if label_text else f"{name} {value_text}")
+
+    def getvalue(self):
+        return "".join(line + "\n" for family in self._families.values() for line in family)
+
+def format_prometheus_metrics(usage, scheduler, total_ram):
+    """Return the Prometheus exposition of a get_usage() tuple.
+
+    Byte figures come straight from the collectors of `scheduler`, since
+    usage has them rounded to 0.01 GB or MB for display; `total_ram` is in
+    bytes.
+    """
+    cpu_percent, ram_percent, cpu_cores, cpu_threads, gpu_percent, _, cpu_temp_celsius, cpu_temp_fahrenheit, gpu_temperatures, total_storage_gb, used_storage_gb, free_storage_gb, used_storage_percent, sent_mb, recv_mb, active_users, gpu_models = usage
+    metrics = PrometheusWriter()
+    for i, cpu_percent_core in enumerate(cpu_percent):
+        metrics.add("cpu_usage_percent", cpu_percent_core, "CPU utilization of each logical core.", core=i)
+    if cpu_percent:
+        metrics.add("cpu_usage_overall_percent", sum(cpu_percent) / len(cpu_percent), "Mean CPU utilization over all cores.")
+    metrics.add("cpu_cores", cpu_cores, "Physical CPU cores.")
+    metrics.add("cpu_threads", cpu_threads, "Logical CPUs.")
+    metrics.add("cpu_temperature_celsius", cpu_temp_celsius, "CPU package temperature, the SoC temperature on a Raspberry Pi.")
+    for i, gpu_model in enumerate(gpu_models):
+        if i < len(gpu_percent):
+            metrics.add("gpu_usage_percent", gpu_percent[i], "GPU utilization.", gpu=i, name=gpu_model)
+        if i < len(gpu_temperatures):
+            metrics.add("gpu_temperature_celsius", gpu_temperatures[i], "GPU temperature.", gpu=i, name=gpu_model)
+    metrics.add("memory_usage_percent", ram_percent, "RAM in use.")
+    total_storage, used_storage, free_storage, _ = scheduler.get("storage")
+    bytes_sent, bytes_recv = scheduler.get("network")
+    metrics.add("memory_total_bytes", total_ram, "Installed RAM.")
+    if total_storage:
+        metrics.add("storage_usage_percent", used_storage_percent, "Filesystem space in use.", mountpoint="/")
+        metrics.add("storage_total_bytes", total_storage, "Filesystem size.", mountpoint="/")
+        metrics.add("storage_used_bytes", used_storage, "Filesystem space used.", mountpoint="/")
+        metrics.add("storage_free_bytes", free_storage, "Filesystem space available.", mountpoint="/")
+    metrics.add("network_sent_bytes_total", bytes_sent, "Bytes sent over all interfaces.", "counter")
+    metrics.add("network_received_bytes_total", bytes_recv, "Bytes received over all interfaces.", "counter")
+    metrics.add("active_users", len(active_users), "Logged-in user sessions.")
+    for cgroup in scheduler.get("cgroups") if "cgroups" in scheduler else []:
+        metrics.add("cgroup_cpu_usage_percent", cgroup.cpu_percent, "CPU time used by the cgroup, in percent of one CPU.", cgroup=cgroup.path)
+        metrics.add("cgroup_cpu_limit", cgroup.cpu_limit, "CPUs the cgroup may use (cpu.max).", cgroup=cgroup.path)
+        metrics.add("cgroup_cpu_throttled_percent", cgroup.throttled_percent, "Time the cgroup was throttled by its CPU limit.", cgroup=cgroup.path)
+        metrics.add("cgroup_memory_bytes", cgroup.memory_bytes, "Memory charged to the cgroup.", cgroup=cgroup.path)
+        metrics.add("cgroup_memory_limit_bytes", cgroup.memory_limit, "Memory limit of the cgroup (memory.max).", cgroup=cgroup.path)
+        metrics.add("cgroup_read_bytes_per_second", cgroup.read_rate, "Bytes read from block devices by the cgroup.", cgroup=cgroup.path)
+        metrics.add("cgroup_write_bytes_per_second", cgroup.write_rate, "Bytes written to block devices by the cgroup.", cgroup=cgroup.path)
+        for resource, stall in (("cpu", cgroup.cpu_pressure), ("memory", cgroup.memory_pressure), ("io", cgroup.io_pressure)):
+            metrics.add("cgroup_pressure_stall_percent", stall, "Time some tasks of the cgroup were stalled on a resource (PSI).", cgroup=cgroup.path, resource=resource)
+    for name in scheduler.stale():
+        metrics.add("collector_stale", 1, "Collectors whose last probe timed out or failed.", collector=name)
+    return metrics.getvalue()
+
+def usage_to_fields(usage, cpu_model):
+    """Split a get_usage() tuple into numeric fields and rarely-changing metadata."""
+    cpu_percent, ram_percent, cpu_cores, cpu_threads, gpu_percent, total_ram, cpu_temp_celsius, cpu_temp_fahrenheit, gpu_temperatures, total_storage_gb, used_storage_gb, free_storage_gb, used_storage_percent, sent_mb, recv_mb, active_users, gpu_models = usage
+    values = {f"cpu.{i}": value for i, value in enumerate(cpu_percent)}
+    values.update({f"gpu.{i}.usage": value for i, value in enumerate(gpu_percent)})
+    values.update({f"gpu.{i}.temperature": value for i, value in enumerate(gpu_temperatures) if value is not None})
+    values.update({
+        "ram": ram_percent, "total_ram": total_ram, "cpu_cores": cpu_cores, "cpu_threads": cpu_threads,
+        "cpu_temperature": cpu_temp_celsius, "storage.total": total_storage_gb, "storage.used": used_storage_gb,
+        "storage.free": free_storage_gb, "storage.percent": used_storage_percent,
+        # The byte counters, as the exporter has them: MB rounded for the table would hide a quiet tick's traffic
+        "network.sent": round(sent_mb * 1024 ** 2), "network.recv": round(recv_mb * 1024 ** 2),
+    })
+    values = {name: float(value) for name, value in values.items() if value is not None}
+    meta = {"cpu_model": cpu_model, "gpu_models": list(gpu_models), "active_users": list(active_users)}
+    return values, meta
+
+def fields_to_usage(values, meta):
+    """Rebuild a get_usage() tuple from fields sent by any agent platform."""
+    def indexed(prefix, suffix=""):
+        found = {}
+        for name, value in values.items():
+            if name.startswith(prefix) and name.endswith(suffix):
+                index = name[len(prefix):len(name) - len(suffix)]
+                if index.isdigit():
+                    found[int(index)] = value
+        return [found[index] for index in sorted(found)]
+
+    cpu_percent = indexed("cpu.")
+    gpu_models = meta.get("gpu_models", [])
+    gpu_temperatures = indexed("gpu.", ".temperature")
+    cpu_temp_celsius = values.get("cpu_temperature")
+    return (
+        cpu_percent, values.get("ram", 0), int(values.get("cpu_cores", len(cpu_percent))),
+        int(values.get("cpu_threads", len(cpu_percent))), indexed("gpu.", ".usage"), values.get("total_ram", 0),
+        cpu_temp_celsius, celsius_to_fahrenheit(cpu_temp_celsius) if cpu_temp_celsius is not None else None,
+        gpu_temperatures, values.get("storage.total", 0), values.get("storage.used", 0), values.get("storage.free", 0),
+        values.get("storage.percent", 0), values.get("network.sent", 0) / 1024 ** 2, values.get("network.recv", 0) / 1024 ** 2,
+        meta.get("active_users", []), gpu_models,
+    )
+
+# Fleet protocol: every frame is a little-endian (payload length, frame type)
+# header followed by the payload. HELLO, SCHEMA and META carry JSON and are
+# only sent when they change; DELTA carries (field index, value) pairs for
+# the numeric fields that changed since the previous frame.
+FLEET_PORT = 9200
+FLEET_HEADER = struct.Struct("<IB")
+FLEET_DELTA_HEADER = struct.Struct("<dH")
+FLEET_DELTA_FIELD = struct.Struct("<Hd")
+FLEET_HELLO, FLEET_SCHEMA, FLEET_META, FLEET_DELTA = 1, 2, 3, 4
+FLEET_MAX_FRAME = 1 << 20
+# Above this many unsent bytes the agent skips ticks instead of queueing them
+FLEET_HIGH_WATER = 64 * 1024
+
+def fleet_frame(frame_type, payload):
+    return FLEET_HEADER.pack(len(payload), frame_type) + payload
+
+class FleetEncoder:
+    """Turns successive samples of one connection into compact delta frames."""
+
+    def __init__(self):
+        self.fields = {}
+        self.sent = {}
+        self.meta = None
+
+    def encode(self, values, meta, timestamp):
+        frames = []
+        new_fields = [name for name in values if name not in self.fields]
+        if new_fields:
+            for name in new_fields:
+                self.fields[name] = len(self.fields)
+            frames.append(fleet_frame(FLEET_SCHEMA, json.dumps(list(self.fields)).encode()))
+        if meta != self.meta:
+            frames.append(fleet_frame(FLEET_META, json.dumps(meta).encode()))
+            self.meta = meta
+        changed = [(self.fields[name], value) for name, value in values.items() if self.sent.get(name) != value]
+        # Fields that disappeared (e.g. a GPU fell off the bus) are cleared with NaN
+        changed += [(self.fields[name], math.nan) for name in self.sent if name not in values]
+        self.sent = dict(values)
+        payload = FLEET_DELTA_HEADER.pack(timestamp, len(changed)) + b"".join(
+            FLEET_DELTA_FIELD.pack(index, value) for index, value in changed)
+        frames.append(fleet_frame(FLEET_DELTA, payload))
+        return b"".join(frames)
+
+class FleetHost:
+    """Latest state the aggregator holds for one agent."""
+
+    def __init__(self, key, hostname, platform, address):
+        self.key = key
+        self.hostname = hostname
+        self.platform = platform
+        self.address = address
+        self.values = {}
+        self.meta = {}
+        self.fields = []
+        self.connected = False
+        # The aggregator connection this host's frames are read from
+        self.connection = None
+        self.last_seen = 0.0
+        self.frames = 0
+        self.bytes = 0
+
+    def apply(self, frame_type, payload):
+        if frame_type == FLEET_SCHEMA:
+            self.fields = json.loads(payload)
+        elif frame_type == FLEET_META:
+            self.meta = json.loads(payload)
+        elif frame_type == FLEET_DELTA:
+            timestamp, count = FLEET_DELTA_HEADER.unpack_from(payload)
+            if FLEET_DELTA_HEADER.size + count * FLEET_DELTA_FIELD.size != len(payload):
+                raise ValueError("truncated delta frame")
+            for index, value in FLEET_DELTA_FIELD.iter_unpack(payload[FLEET_DELTA_HEADER.size:]):
+                name = self.fields[index]
+                if math.isnan(value):
+                    self.values.pop(name, None)
+                else:
+                    self.values[name] = value
+        self.frames += 1
+        self.bytes += FLEET_HEADER.size + len(payload)
+        self.last_seen = time.monotonic()
+
+# Sample log written by --record and read by --replay. Each segment file is a
+# 4 KiB header (fixed fields, then the JSON schema) followed by preallocated,
+# fixed-width records: a float64 timestamp and one value per field, NaN when
+# the field had no value in that sample.
+RECORD_MAGIC = b"SMSLOG01"
+RECORD_HEADER = struct.Struct("<8sIIQQ")  # magic, record size, schema length, capacity, records written
+RECORD_COUNT = struct.Struct("<Q")
+RECORD_COUNT_OFFSET = 24
+RECORD_HEADER_SIZE = 4096
+RECORD_TIMESTAMP = struct.Struct("<d")
+RECORD_SEGMENT_SECONDS = 86400
+RECORD_KEEP_SEGMENTS = 7
+
+def record_field_type(name):
+    # Byte counters keep growing, so they need float64 for exact per-tick deltas; the rest fit in float32
+    return "d" if name.startswith("network.") else "f"
+
+class SampleRecorder:
+    """Appends samples to a preallocated, memory-mapped log with rotation.
+
+    A segment holds `segment_seconds` of fixed-width records. When it is
+    full, or a sample brings a field the segment has no column for (a GPU
+    appeared), FILE is renamed to FILE.1, FILE.1 to FILE.2 and so on,
+    keeping `keep` old segments. An append is one struct.pack_into into the
+    mapping plus an update of the record count in the header; the kernel
+    writes the pages back, nothing is flushed per sample.
+    """
+
+    def __init__(self, path, interval=1.0, segment_seconds=RECORD_SEGMENT_SECONDS, keep=RECORD_KEEP_SEGMENTS, hostname=None, platform=None):
+        self.path = path
+        self.interval = interval
+        self.capacity = max(1, math.ceil(segment_seconds / interval))
+        self.keep = keep
+        self.hostname = hostname or socket.gethostname()
+        self.platform = platform
+        self.samples_written = 0
+        self.rotations = 0
+        self._map = None
+        self._indexes = {}
+        self._struct = None
+        self._count = 0
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def append(self, timestamp, values, meta):
+        if self._map is None or self._count >= self.capacity or not values.keys() <= self._indexes.keys():
+            self._open(sorted(self._indexes.keys() | values.keys()), meta)
+        record = [math.nan] * len(self._indexes)
+        for name, value in values.items():
+            record[self._indexes[name]] = value
+        self._struct.pack_into(self._map, RECORD_HEADER_SIZE + self._count * self._struct.size, timestamp, *record)
+        self._count += 1
+        # Written after the record, so a reader following the log never sees a half-written one
+        RECORD_COUNT.pack_into(self._map, RECORD_COUNT_OFFSET, self._count)
+        self.samples_written += 1
+
+    def start(self, sample):
+        self._thread = threading.Thread(target=self._run, args=(sample,), name="recorder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.close()
+
+    def close(self):
+        if self._map is None:
+            return
+        used = RECORD_HEADER_SIZE + self._count * self._struct.size
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        if self._count < self.capacity:
+            # Closed early (rotation on a new field, or exit): give back the unused preallocation
+            os.truncate(self.path, used)
+
+    def _run(self, sample):
+        next_sample_at = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                values, meta = sample()
+                self.append(time.time(), values, meta)
+            except (OSError, ValueError) as e:
+                print(f"Error recording sample: {e}")
+            next_sample_at += self.interval
+            self._stopping.wait(max(0.0, next_sample_at - time.monotonic()))
+
+    def _open(self, fields, meta):
+        resuming = self._map is None and self.samples_written == 0
+        self.close()
+        if resuming and self._resume(fields):
+            return
+        if os.path.exists(self.path):
+            self._rotate()
+        record_format = "<d" + "".join(record_field_type(name) for name in fields)
+        schema = json.dumps({
+            "hostname": self.hostname, "platform": self.platform, "interval": self.interval,
+            "fields": fields, "format": record_format, "meta": meta, "created_at": time.time(),
+        }).encode()
+        if RECORD_HEADER.size + len(schema) > RECORD_HEADER_SIZE:
+            raise ValueError(f"{len(fields)} fields do not fit in a sample log header")
+        record = struct.Struct(record_format)
+        size = RECORD_HEADER_SIZE + self.capacity * record.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            try:
+                # Reserve the blocks now so a full disk shows up at rotation, not as SIGBUS mid-write
+                os.posix_fallocate(fd, 0, size)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        RECORD_HEADER.pack_into(self._map, 0, RECORD_MAGIC, record.size, len(schema), self.capacity, 0)
+        self._map[RECORD_HEADER.size:RECORD_HEADER.size + len(schema)] = schema
+        self._struct, self._count = record, 0
+        self._indexes = {name: index for index, name in enumerate(fields)}
+
+    def _resume(self, fields):
+        # Keep appending to the log a previous run left behind, if it has the same columns and room to spare
+        try:
+            segment = SampleSegment(self.path)
+        except (OSError, ValueError):
+            return False
+        try:
+            if segment.fields != fields or segment.count >= segment.capacity:
+                return False
+            count, capacity, record = segment.count, segment.capacity, segment.struct
+        finally:
+            segment.close()
+        size = RECORD_HEADER_SIZE + capacity * record.size
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            # close() gave back the unused space; take it again
+            try:
+                os.posix_fallocate(fd, 0, size)
+            except (AttributeError, OSError):
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._struct, self._count, self.capacity = record, count, capacity
+        self._indexes = {name: index for index, name in enumerate(fields)}
+        return True
+
+    def _rotate(self):
+        for index in range(self.keep, 0, -1):
+            source = self.path if index == 1 else f"{self.path}.{index - 1}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index}")
+        self.rotations += 1
+
+class SampleSegment:
+    """One file of a sample log, mapped read-only."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self.size = os.fstat(file.fileno()).st_size
+            if self.size < RECORD_HEADER_SIZE:
+                raise ValueError(f"{path} is not a sample log")
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, record_size, schema_length, self.capacity, count = RECORD_HEADER.unpack_from(self._map, 0)
+        if magic != RECORD_MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a sample log")
+        schema = json.loads(self._map[RECORD_HEADER.size:RECORD_HEADER.size + schema_length])
+        self.hostname, self.platform, self.interval = schema["hostname"], schema["platform"], schema["interval"]
+        self.fields, self.meta = schema["fields"], schema["meta"]
+        self.struct = struct.Struct(schema["format"])
+        self._single = [code == "f" for code in schema["format"][2:]]
+        if self.struct.size != record_size:
+            raise ValueError(f"{path} has a corrupt header")
+
+    @property
+    def count(self):
+        # Re-read every time: the recorder may still be appending to this segment
+        count = RECORD_COUNT.unpack_from(self._map, RECORD_COUNT_OFFSET)[0]
+        return min(count, self.capacity, (self.size - RECORD_HEADER_SIZE) // self.struct.size)
+
+    def end_offset(self, count):
+        return RECORD_HEADER_SIZE + count * self.struct.size
+
+    def timestamp(self, index):
+        return RECORD_TIMESTAMP.unpack_from(self._map, self.end_offset(index))[0]
+
+    def record(self, index):
+        timestamp, *record = self.struct.unpack_from(self._map, self.end_offset(index))
+        # float32 fields come back as e.g. 5.860000133514404; 6 significant digits restore what was recorded
+        return timestamp, {name: float(f"{value:.6g}") if single else value
+                           for name, value, single in zip(self.fields, record, self._single) if not math.isnan(value)}
+
+    def seek(self, timestamp):
+        """Index of the first record at or after timestamp, by binary search over the mapping."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.timestamp(middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def close(self):
+        self._map.close()
+
+# Plain records for pipelines, written by --format: one line per sample, no table
+STREAM_FORMATS = ("ndjson", "csv")
+STREAM_FLUSH_INTERVAL = 1.0
+STREAM_BUFFER_SIZE = 65536
+
+def select_stream_fields(names, patterns=()):
+    """Return the field names a --fields selection keeps, in sample order.
+
+    Globs are matched against the fields of the first sample and a leading
+    "!" excludes, as with --nics. A name without wildcards is kept even if
+    the first sample lacks it (a GPU that is not up yet), so the columns
+    asked for by name are always there.
+    """
+    include = [pattern for pattern in patterns if not pattern.startswith("!")]
+    exclude = [pattern[1:] for pattern in patterns if pattern.startswith("!")]
+    selected = [name for name in names
+                if (not include or any(fnmatch.fnmatchcase(name, pattern) for pattern in include))
+                and not any(fnmatch.fnmatchcase(name, pattern) for pattern in exclude)]
+    selected += [pattern for pattern in include if pattern not in selected and not any(character in pattern for character in "*?[")]
+    return selected
+
+class StreamWriter:
+    """Writes samples as NDJSON or CSV records with a fixed set of columns.
+
+    The columns are timestamp and hostname, then the selected fields of the
+    first sample, in usage_to_fields order; they stay the same for the whole
+    run, so every NDJSON object has the same keys and the CSV header is
+    written once. A field missing from a later sample, or without a value
+    yet (NaN), is null (an empty cell), and one that only appears later is
+    not added. Records are built in memory and written in one call at most
+    every `flush_interval` seconds, so a short --interval costs one write
+    per second, not one per sample.
+    """
+
+    def __init__(self, stream, record_format="ndjson", patterns=(), flush_interval=STREAM_FLUSH_INTERVAL, hostname=None, header=True):
+        if record_format not in STREAM_FORMATS:
+            raise ValueError(f"unknown record format {record_format!r}")
+        self.stream = stream
+        self.format = record_format
+        self.patterns = patterns
+        self.flush_interval = flush_interval
+        self.hostname = hostname or socket.gethostname()
+        self.header = header
+        self.fields = None
+        self.records_written = 0
+        self._pending = io.StringIO()
+        self._csv = csv.writer(self._pending, lineterminator="\n")
+        # The first record goes out straight away, so a pipeline sees the schema at once
+        self._flushed_at = -math.inf
+
+    def write(self, timestamp, values):
+        if self.fields is None:
+            self.fields = select_stream_fields(list(values), self.patterns)
+            if self.format == "csv" and self.header:
+                self._csv.writerow(["timestamp", "hostname", *self.fields])
+        row = [None if value is None or math.isnan(value) else value for value in map(values.get, self.fields)]
+        if self.format == "csv":
+            # csv writes None as an empty cell
+            self._csv.writerow([round(timestamp, 3), self.hostname, *row])
+        else:
+            record = {"timestamp": round(timestamp, 3), "hostname": self.hostname}
+            record.update(zip(self.fields, row))
+            self._pending.write(json.dumps(record, separators=(",", ":")))
+            self._pending.write("\n")
+        self.records_written += 1
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        batch = self._pending.getvalue()
+        if batch:
+            self._pending.seek(0)
+            self._pending.truncate()
+            self.stream.write(batch)
+        self.stream.flush()
+        self._flushed_at = time.monotonic()
+
+    def run(self, sample, interval=1.0, count=None):
+        """Write a record of sample() every `interval` seconds until interrupted, or `count` records."""
+        next_sample_at = time.monotonic()
+        try:
+            while True:
+                self.write(time.time(), sample())
+                if count is not None and self.records_written >= count:
+                    break
+                next_sample_at += interval
+                delay = next_sample_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Fell behind (a slow collector); start counting again from now instead of bursting
+                    next_sample_at = time.monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.flush()
@@ -0,0 +1,138 @@
+"""GPU telemetry shared by the Linux and Windows backends."""
+
+import shutil
+import subprocess
+import threading
+
+GPU_QUERY_FIELDS = ("index", "name", "utilization.gpu", "temperature.gpu", "memory.used", "memory.total")
+
+def _parse_gpu_value(value):
+    try:
+        return float(value)
+    except ValueError:
+        # nvidia-smi reports unsupported fields as "[N/A]" or "[Not Supported]"
+        return None
+
+class GpuMonitor:
+    """Background GPU telemetry source.
+
+    Instead of forking nvidia-smi for every metric on every tick, a single
+    long-lived query (NVML when pynvml is installed, otherwise
+    ``nvidia-smi --loop-ms``) feeds a reader thread that keeps the latest
+    sample per GPU in memory. The get_gpu_* functions only read that sample.
+    """
+
+    def __init__(self, command="nvidia-smi", interval_ms=1000, max_backoff=30.0):
+        self.command = command
+        self.interval_ms = interval_ms
+        self.max_backoff = max_backoff
+        self.available = False
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._process = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        target = self._nvml_loop if self._nvml_available() else self._smi_loop
+        if target == self._smi_loop and shutil.which(self.command) is None:
+            # No driver tools installed: report no GPUs instead of erroring every tick
+            self._ready.set()
+            return
+        self.available = True
+        self._thread = threading.Thread(target=target, name="gpu-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def wait_ready(self, timeout=2.0):
+        return self._ready.wait(timeout)
+
+    def samples(self):
+        with self._lock:
+            return [self._samples[index] for index in sorted(self._samples)]
+
+    def _publish(self, samples):
+        with self._lock:
+            self._samples.update(samples)
+        self._ready.set()
+
+    def _nvml_available(self):
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            return True
+        except Exception:
+            return False
+
+    def _nvml_loop(self):
+        import pynvml
+        handles = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in range(pynvml.nvmlDeviceGetCount())]
+        names = [pynvml.nvmlDeviceGetName(handle) for handle in handles]
+        names = [name.decode() if isinstance(name, bytes) else name for name in names]
+        while not self._stopping.is_set():
+            samples = {}
+            for index, handle in enumerate(handles):
+                try:
+                    memory = pynvml.nvmlDeviceGetMemoryInfo(handle)
+                    samples[index] = {
+                        "index": index,
+                        "name": names[index],
+                        "utilization.gpu": float(pynvml.nvmlDeviceGetUtilizationRates(handle).gpu),
+                        "temperature.gpu": float(pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)),
+                        "memory.used": memory.used / (1024.0 ** 2),
+                        "memory.total": memory.total / (1024.0 ** 2),
+                    }
+                except Exception as e:
+                    print(f"Error reading GPU {index} through NVML: {e}")
+            self._publish(samples)
+            self._stopping.wait(self.interval_ms / 1000.0)
+        pynvml.nvmlShutdown()
+
+    def _smi_loop(self):
+        backoff = 1.0
+        while not self._stopping.is_set():
+            try:
+                self._process = subprocess.Popen(
+                    [self.command, f"--query-gpu={','.join(GPU_QUERY_FIELDS)}",
+                     "--format=csv,noheader,nounits", f"--loop-ms={self.interval_ms}"],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1)
+            except OSError as e:
+                print(f"Error starting {self.command}: {e}")
+                self._ready.set()
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            for line in self._process.stdout:
+                sample = self._parse_line(line)
+                if sample is not None:
+                    self._publish({sample["index"]: sample})
+                    backoff = 1.0
+            self._process.wait()
+            # The child died (driver reset, GPU lost, killed): forget stale values and restart it
+            with self._lock:
+                self._samples.clear()
+            self._ready.set()
+            self._stopping.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _parse_line(self, line):
+        try:
+            index, rest = line.strip().split(",", 1)
+            # GPU names may contain commas, so split the numeric fields off the right
+            name, *values = rest.rsplit(",", len(GPU_QUERY_FIELDS) - 2)
+            sample = {"index": int(index), "name": name.strip()}
+            for field, value in zip(GPU_QUERY_FIELDS[2:], values):
+                sample[field] = _parse_gpu_value(value.strip())
+            return sample
+        except ValueError:
+            return None
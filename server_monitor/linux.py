@@ -0,0 +1,1288 @@
+import fnmatch
+import glob
+import heapq
+import math
+import os
+import psutil
+import queue
+import random
+import select
+import shutil
+import sys
+import tempfile
+import termios
+import threading
+import tty
+from collections import Counter, namedtuple
+from datetime import datetime
+from operator import attrgetter, sub
+import time
+
+from . import procfs
+from .core import (
+    PROCESS_SCAN_INTERVAL, PROCESS_SORT_LABELS, SLOW_COLLECTOR_INTERVAL,
+    CollectorScheduler, HistoryStore, InventoryCache, ProcessTracker, Profiler,
+    add_export_arguments, build_parser, get_active_users, get_cpu_cores, get_cpu_threads, get_main_storage_usage,
+    get_total_ram, open_console, parse_monitor_args, read_usage, render_live_graph, run_mode, run_tool, running_collectors,
+)
+from .formats import FLEET_PORT, RECORD_HEADER_SIZE, SampleRecorder, SampleSegment, fields_to_usage, usage_to_fields
+from .gpu import GpuMonitor
+from .procfs import ProcfsReader, SensorMonitor, add_sensor_rows, collector_backends, get_cpu_info, get_cpu_sensor_paths
+
+PLATFORM = "linux"
+
+gpu_monitor = GpuMonitor()
+
+def get_gpu_info():
+    try:
+        return [sample["name"] for sample in gpu_monitor.samples()]
+    except Exception as e:
+        print(f"Error getting GPU information: {e}")
+        return ["N/A"]
+
+def get_gpu_usage():
+    try:
+        return [sample["utilization.gpu"] or 0.0 for sample in gpu_monitor.samples()]
+    except Exception as e:
+        print(f"Error getting GPU usage: {e}")
+        return []
+
+def parse_cpu_list(text):
+    # "0-3,8-11" -> [0, 1, 2, 3, 8, 9, 10, 11]
+    cpus = []
+    for part in text.strip().split(","):
+        if part:
+            first, _, last = part.partition("-")
+            cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+def get_cpu_groups():
+    """Return ((label, positions), ...) grouping the per-core list by NUMA node, or by socket on one-node machines.
+
+    Positions index the list get_cpu_usage returns, which skips offline CPUs.
+    An empty tuple means there is nothing to group by.
+    """
+    try:
+        cpu_ids = sorted(int(os.path.basename(os.path.dirname(path))[3:])
+                         for path in glob.glob(os.path.join(procfs.SYS_ROOT, "devices/system/cpu/cpu[0-9]*/topology")))
+        position = {cpu: index for index, cpu in enumerate(cpu_ids)}
+        groups = []
+        for node in sorted(glob.glob(os.path.join(procfs.SYS_ROOT, "devices/system/node/node[0-9]*")), key=lambda path: int(path.rsplit("node", 1)[1])):
+            with open(os.path.join(node, "cpulist"), 'r') as file:
+                cpus = tuple(position[cpu] for cpu in parse_cpu_list(file.read()) if cpu in position)
+            if cpus:
+                groups.append((f"Node {node.rsplit('node', 1)[1]}", cpus))
+        if len(groups) > 1:
+            return tuple(groups)
+        sockets = {}
+        for cpu in cpu_ids:
+            with open(os.path.join(procfs.SYS_ROOT, f"devices/system/cpu/cpu{cpu}/topology/physical_package_id"), 'r') as file:
+                sockets.setdefault(int(file.read()), []).append(position[cpu])
+        if len(sockets) > 1:
+            return tuple((f"Socket {socket}", tuple(cpus)) for socket, cpus in sorted(sockets.items()))
+    except Exception as e:
+        print(f"Error reading the CPU topology: {e}")
+    return ()
+
+def get_gpu_temperature():
+    try:
+        return [sample["temperature.gpu"] for sample in gpu_monitor.samples()]
+    except Exception as e:
+        print(f"Error getting GPU temperatures: {e}")
+        return []
+
+# Kernel interfaces, in-memory scratch space and read-only images; none of them hold data worth watching
+PSEUDO_FILESYSTEMS = frozenset({
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts", "devtmpfs",
+    "efivarfs", "fusectl", "hugetlbfs", "mqueue", "nsfs", "proc", "pstore", "ramfs", "rpc_pipefs",
+    "securityfs", "selinuxfs", "squashfs", "sysfs", "tmpfs", "tracefs",
+})
+MOUNT_PROBE_INTERVAL = 10.0
+MOUNT_PROBE_DEADLINE = 1.0
+MOUNT_PROBE_WORKERS = 4
+STORAGE_MAX_ROWS = 8
+
+def unescape_mount_path(path):
+    # mountinfo writes space, tab, newline and backslash as octal escapes
+    return path.replace("\\040", " ").replace("\\011", "\t").replace("\\012", "\n").replace("\\134", "\\")
+
+def parse_mountinfo(text):
+    """Return [(mountpoint, fstype)] for the real filesystems in a mountinfo table, one per device."""
+    mounts = []
+    devices = set()
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index("-", 6)
+            device, mountpoint, fstype = fields[2], unescape_mount_path(fields[4]), fields[separator + 1]
+        except (ValueError, IndexError):
+            continue
+        # Bind mounts share the device of the filesystem they expose; show it once
+        if fstype in PSEUDO_FILESYSTEMS or device in devices:
+            continue
+        devices.add(device)
+        mounts.append((mountpoint, fstype))
+    return mounts
+
+class MountMonitor:
+    """Capacity of every real mount, without one hung mount blocking the rest.
+
+    The mount list is parsed from /proc/self/mountinfo and only parsed
+    again when the kernel flags the mount table as changed (POLLPRI on the
+    open file). Probes run on a few daemon worker threads and sample()
+    waits at most `deadline` seconds for them; a mount whose probe has not
+    returned keeps its last figures and is reported stale. A mount is never
+    probed twice at once, so a dead NFS server ties up one worker, not all
+    of them, and it cannot hold up interpreter exit.
+    """
+
+    def __init__(self, deadline=MOUNT_PROBE_DEADLINE, workers=MOUNT_PROBE_WORKERS, probe=psutil.disk_usage):
+        self.deadline = deadline
+        self.workers = workers
+        self.probe = probe
+        self._mounts = None
+        self._file = None
+        self._poller = None
+        self._results = {}
+        self._pending = {}
+        self._failed = set()
+        self._queue = queue.SimpleQueue()
+        self._threads = []
+        self._done = threading.Condition()
+
+    def mounts(self):
+        """Return the cached [(mountpoint, fstype)], re-reading mountinfo only after a mount or unmount."""
+        if self._file is None:
+            self._file = open(f"{procfs.PROC_ROOT}/self/mountinfo", "rb", buffering=0)
+            self._poller = select.poll()
+            self._poller.register(self._file, select.POLLPRI)
+        elif self._mounts is not None and not self._poller.poll(0):
+            return self._mounts
+        self._file.seek(0)
+        self._mounts = parse_mountinfo(self._file.read().decode(errors="replace"))
+        current = {mountpoint for mountpoint, fstype in self._mounts}
+        with self._done:
+            self._results = {mountpoint: result for mountpoint, result in self._results.items() if mountpoint in current}
+            self._failed &= current
+        return self._mounts
+
+    def sample(self):
+        """Return [(mountpoint, fstype, total_gb, used_gb, free_gb, percent, stale_seconds)]."""
+        try:
+            mounts = self.mounts()
+        except OSError as e:
+            print(f"Error reading the mount table: {e}")
+            mounts = self._mounts or []
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name="mount-probe", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        now = time.monotonic()
+        submitted = []
+        with self._done:
+            for mountpoint, fstype in mounts:
+                if mountpoint not in self._pending:
+                    self._pending[mountpoint] = now
+                    self._queue.put(mountpoint)
+                    submitted.append(mountpoint)
+            deadline = now + self.deadline
+            while any(mountpoint in self._pending for mountpoint in submitted):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._done.wait(remaining)
+            return self._snapshot(mounts, time.monotonic())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._poller = None
+
+    def _snapshot(self, mounts, now):
+        rows = []
+        for mountpoint, fstype in mounts:
+            submitted_at = self._pending.get(mountpoint)
+            overdue = submitted_at is not None and now - submitted_at > self.deadline
+            result = self._results.get(mountpoint)
+            if result is None:
+                if overdue:
+                    rows.append((mountpoint, fstype, None, None, None, None, now - submitted_at))
+                continue
+            usage, updated_at = result
+            if not usage.total:
+                continue
+            stale = now - updated_at if overdue or mountpoint in self._failed else None
+            rows.append((mountpoint, fstype, round(usage.total / (1024.0 ** 3), 2), round(usage.used / (1024.0 ** 3), 2), round(usage.free / (1024.0 ** 3), 2), usage.percent, stale))
+        return rows
+
+    def _work(self):
+        while True:
+            mountpoint = self._queue.get()
+            try:
+                usage = self.probe(mountpoint)
+            except Exception:
+                # Unmounted under us or not readable by this user; keep the last figures
+                usage = None
+            with self._done:
+                self._pending.pop(mountpoint, None)
+                if usage is not None:
+                    self._results[mountpoint] = (usage, time.monotonic())
+                    self._failed.discard(mountpoint)
+                else:
+                    self._failed.add(mountpoint)
+                self._done.notify_all()
+
+mount_monitor = MountMonitor()
+
+# Counters read per device, in the order the rate tuples are returned
+NETWORK_RATE_FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv", "errin", "errout", "dropin", "dropout")
+DISK_RATE_FIELDS = ("read_count", "write_count", "read_bytes", "write_bytes", "read_time", "write_time", "busy_time")
+# Glob patterns; a leading "!" excludes
+NETWORK_DEVICE_FILTER = ("!lo",)
+DISK_DEVICE_FILTER = ("!loop*", "!ram*")
+DEVICE_MAX_ROWS = 6
+# A counter that went backwards is taken for a 32-bit wrap only if the corrected delta fits the device's
+# top rate over the elapsed time, with this much headroom for scheduling jitter; anything else is a reset
+COUNTER_WRAP_SLACK = 2.0
+# Mbit/s assumed for interfaces that report no link speed (loopback, veth, most virtual NICs)
+NETWORK_DEFAULT_SPEED = 10000
+# The smallest Ethernet frame on the wire, preamble and gap included: no link carries more packets than this allows
+ETHERNET_MIN_FRAME_BYTES = 84
+# Top per-second rates of a disk, in DISK_RATE_FIELDS order: far beyond any real device, far below a 32-bit jump
+DISK_MAX_RATES = (10 ** 7, 10 ** 7, 2 ** 35, 2 ** 35, 10 ** 6, 10 ** 6, 1000)
+
+class CounterRates:
+    """Per-second rates for every device from cumulative per-device counters.
+
+    update() takes a {device: counters} snapshot such as psutil's pernic or
+    perdisk dicts and returns {device: rates}, one rate per field, for each
+    device that was also in the previous snapshot. A device that appears
+    gets its baseline and shows up from the next call; one that disappears
+    is dropped. A counter that went backwards either wrapped at 32 bits,
+    which is corrected, or was reset with its driver, in which case the
+    device shows no rates for that call and starts again from a new
+    baseline. It only counts as a wrap when the corrected delta is within
+    what the device can do in the elapsed time: `max_rates(device)`
+    returns the top per-second rate of each field, and is only called when
+    a counter went backwards. Filter results (the glob
+    patterns and the optional `accept` check) are cached by name, so hosts
+    with hundreds of veth interfaces only pay for them once per interface.
+    """
+
+    def __init__(self, fields, patterns=(), accept=None, max_rates=None):
+        self.fields = fields
+        self.patterns = patterns
+        self.accept = accept
+        self.max_rates = max_rates
+        self._values = attrgetter(*fields)
+        self._previous = {}
+        self._previous_at = None
+        self._selected = {}
+
+    def selected(self, device):
+        selected = self._selected.get(device)
+        if selected is None:
+            include = [pattern for pattern in self.patterns if not pattern.startswith("!")]
+            selected = self._selected[device] = (
+                (not include or any(fnmatch.fnmatchcase(device, pattern) for pattern in include))
+                and not any(fnmatch.fnmatchcase(device, pattern[1:]) for pattern in self.patterns if pattern.startswith("!"))
+                and (self.accept is None or self.accept(device)))
+        return selected
+
+    def update(self, counters, now=None):
+        if now is None:
+            now = time.monotonic()
+        elapsed = now - self._previous_at if self._previous_at is not None else 0
+        if len(self._selected) > 2 * len(counters) + 64:
+            # Interfaces come and go (containers); forget the names that are gone
+            self._selected.clear()
+        scale = 1.0 / elapsed if elapsed > 0 else 0.0
+        current = {}
+        rates = {}
+        for device, counter in counters.items():
+            if not self.selected(device):
+                continue
+            values = current[device] = self._values(counter)
+            previous = self._previous.get(device)
+            if previous is None or elapsed <= 0:
+                continue
+            deltas = list(map(sub, values, previous))
+            if min(deltas) < 0:
+                limits = self.max_rates(device) if self.max_rates is not None else None
+                for index, delta in enumerate(deltas):
+                    if delta < 0:
+                        corrected = delta + 2 ** 32
+                        if previous[index] >= 2 ** 32 or (
+                                limits is not None and corrected > limits[index] * elapsed * COUNTER_WRAP_SLACK):
+                            break
+                        deltas[index] = corrected
+                else:
+                    rates[device] = tuple(map(scale.__mul__, deltas))
+                continue
+            rates[device] = tuple(map(scale.__mul__, deltas))
+        self._previous, self._previous_at = current, now
+        return rates
+
+def is_whole_disk(name):
+    # perdisk counters include partitions, which would count their I/O twice; only whole disks are in /sys/block
+    return os.path.exists(os.path.join(procfs.SYS_ROOT, "block", name.replace("/", "!")))
+
+def network_max_rates(nic):
+    # The link speed is per direction; errors and drops cannot outnumber the packets
+    try:
+        speed = psutil.net_if_stats()[nic].speed
+    except (KeyError, OSError):
+        speed = 0
+    link_bytes = (speed or NETWORK_DEFAULT_SPEED) * 1e6 / 8
+    packets = link_bytes / ETHERNET_MIN_FRAME_BYTES
+    return (link_bytes, link_bytes) + (packets,) * 6
+
+network_rates = CounterRates(NETWORK_RATE_FIELDS, NETWORK_DEVICE_FILTER, max_rates=network_max_rates)
+disk_rates = CounterRates(DISK_RATE_FIELDS, DISK_DEVICE_FILTER, is_whole_disk, max_rates=lambda disk: DISK_MAX_RATES)
+
+def get_network_rates():
+    try:
+        # nowrap=False: CounterRates handles wraps itself, without psutil's extra bookkeeping
+        return network_rates.update(psutil.net_io_counters(pernic=True, nowrap=False))
+    except Exception as e:
+        print(f"Error getting network rates: {e}")
+        return {}
+
+def get_disk_rates():
+    try:
+        return disk_rates.update(psutil.disk_io_counters(perdisk=True, nowrap=False) or {})
+    except Exception as e:
+        print(f"Error getting disk rates: {e}")
+        return {}
+
+# cgroup v2 accounting: the monitor's own cgroup, or --cgroup, and --cgroup-depth levels below it
+CGROUP_RESCAN_INTERVAL = 10.0
+CGROUP_READ_SIZE = 4096
+CGROUP_MAX_ROWS = 8
+# Read every tick through descriptors kept open; the limits are only read when the tree is rescanned
+CGROUP_FILES = ("cpu.stat", "memory.current", "io.stat", "cpu.pressure", "memory.pressure", "io.pressure")
+CGROUP_LIMIT_FILES = ("cpu.max", "memory.max")
+
+CgroupSample = namedtuple("CgroupSample", [
+    "path", "cpu_percent", "cpu_limit", "throttled_percent", "memory_bytes", "memory_limit",
+    "read_rate", "write_rate", "cpu_pressure", "memory_pressure", "io_pressure",
+])
+# The fields worked out from two reads, in the order of CgroupMonitor._read's counters
+CGROUP_RATE_FIELDS = ("cpu_percent", "throttled_percent", "read_rate", "write_rate", "cpu_pressure", "memory_pressure", "io_pressure")
+
+def find_cgroup2_mount(mountinfo_text):
+    """Return (mount point, root of the hierarchy it shows) for the cgroup2 mount, or None on cgroup v1 hosts."""
+    for line in mountinfo_text.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index("-", 6)
+        except ValueError:
+            continue
+        if fields[separator + 1] == "cgroup2":
+            return unescape_mount_path(fields[4]), unescape_mount_path(fields[3])
+    return None
+
+def _read_cgroup_file(fd):
+    data = os.pread(fd, CGROUP_READ_SIZE, 0)
+    while len(data) % CGROUP_READ_SIZE == 0 and data:
+        # io.stat on a host with many disks
+        more = os.pread(fd, CGROUP_READ_SIZE, len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+def _cgroup_keyed_value(data, key):
+    # A "key value" line of cpu.stat, or the total= of the first (some) line of a pressure file
+    start = data.find(key)
+    if start == -1:
+        return None
+    start += len(key)
+    end = data.find(b"\n", start)
+    # int() skips the trailing newline
+    return int(data[start:end] if end != -1 else data[start:])
+
+def _cgroup_limit(data):
+    # memory.max is "max" or bytes; cpu.max is "max PERIOD" or "QUOTA PERIOD", as a number of CPUs
+    fields = data.split()
+    if not fields or fields[0] == b"max":
+        return None
+    return int(fields[0]) / int(fields[1]) if len(fields) == 2 else int(fields[0])
+
+def _cgroup_io_bytes(data):
+    read_bytes = write_bytes = 0
+    for token in data.split():
+        if token.startswith(b"rbytes="):
+            read_bytes += int(token[7:])
+        elif token.startswith(b"wbytes="):
+            write_bytes += int(token[7:])
+    return read_bytes, write_bytes
+
+class CgroupMonitor:
+    """CPU, memory, I/O and pressure stall figures for a tree of cgroup v2 cgroups.
+
+    The cgroup2 mount and the monitor's own cgroup come from mountinfo and
+    /proc/self/cgroup, so inside a container the figures are the
+    container's own, measured against its limits. The files of every
+    cgroup are opened once and re-read with pread; CPU time, throttling,
+    I/O bytes and pressure stall totals are turned into per-second rates
+    from the previous read of the same cgroup, so a new cgroup shows its
+    rates from its second sample. The tree below the base cgroup is walked
+    again every `rescan_interval` seconds, which is also when cpu.max and
+    memory.max are read, and a cgroup that is removed
+    (its files start failing with ENODEV) is dropped at once. A file a
+    cgroup does not have (no memory controller enabled, the root cgroup)
+    is left out of its figures.
+    """
+
+    def __init__(self, base=None, depth=0, rescan_interval=CGROUP_RESCAN_INTERVAL):
+        self.base = base
+        self.depth = depth
+        self.rescan_interval = rescan_interval
+        self.available = None
+        self._mount = None
+        self._root = None
+        self._files = {}
+        self._paths = {}
+        self._limits = {}
+        self._previous = {}
+        self._scanned_at = None
+
+    def locate(self):
+        """Return the directory of the base cgroup, or None without a cgroup2 hierarchy."""
+        with open(f"{procfs.PROC_ROOT}/self/mountinfo", "r") as file:
+            mount = find_cgroup2_mount(file.read())
+        if mount is None:
+            return None
+        self._mount, hierarchy_root = mount
+        base = self.base
+        if base is None:
+            with open(f"{procfs.PROC_ROOT}/self/cgroup", "r") as file:
+                base = next((line[3:].strip() for line in file if line.startswith("0::")), "/")
+            # Without a cgroup namespace the mount shows a subtree and our path is relative to the real root
+            if hierarchy_root != "/" and (base == hierarchy_root or base.startswith(hierarchy_root + "/")):
+                base = base[len(hierarchy_root):] or "/"
+        self._root = os.path.normpath(os.path.join(self._mount, base.lstrip("/")))
+        return self._root
+
+    def cgroups(self):
+        """Return the base cgroup directory followed by its descendants down to `depth` levels."""
+        found = [self._root]
+        level = [self._root]
+        for _ in range(self.depth):
+            below = []
+            for directory in level:
+                try:
+                    with os.scandir(directory) as entries:
+                        below += sorted(entry.path for entry in entries if entry.is_dir(follow_symlinks=False))
+                except OSError:
+                    continue
+            found += below
+            level = below
+        return found
+
+    def rescan(self):
+        current = self.cgroups()
+        for directory in list(self._files):
+            if directory not in current:
+                self._forget(directory)
+        for directory in current:
+            if directory not in self._files:
+                path = os.path.relpath(directory, self._mount)
+                self._paths[directory] = "/" if path == "." else "/" + path
+                files = self._files[directory] = {}
+                for name in CGROUP_FILES:
+                    try:
+                        files[name] = os.open(os.path.join(directory, name), os.O_RDONLY)
+                    except OSError:
+                        pass
+            limits = []
+            for name in CGROUP_LIMIT_FILES:
+                try:
+                    with open(os.path.join(directory, name), "rb") as file:
+                        limits.append(_cgroup_limit(file.read()))
+                except OSError:
+                    limits.append(None)
+            self._limits[directory] = limits
+        self._scanned_at = time.monotonic()
+
+    def sample(self, now=None):
+        """Return a CgroupSample per cgroup, base first; rates are None until a cgroup's second sample."""
+        if self.available is None:
+            self.available = self.locate() is not None
+        if not self.available:
+            return []
+        if now is None:
+            now = time.monotonic()
+        if self._scanned_at is None or time.monotonic() - self._scanned_at >= self.rescan_interval:
+            self.rescan()
+        samples = []
+        for directory, files in list(self._files.items()):
+            try:
+                counters, memory_bytes = self._read(files)
+            except OSError:
+                # Removed between two scans
+                self._forget(directory)
+                continue
+            previous = self._previous.get(directory)
+            self._previous[directory] = (now, counters)
+            rates = [None] * len(counters)
+            if previous is not None and now > previous[0]:
+                scale = 1.0 / (now - previous[0])
+                rates = [(value - old) * scale if value is not None and old is not None else None
+                         for value, old in zip(counters, previous[1])]
+            usage_usec, throttled_usec, read_bytes, write_bytes, cpu_stall, memory_stall, io_stall = rates
+            cpu_limit, memory_limit = self._limits[directory]
+            samples.append(CgroupSample(
+                self._paths[directory], usage_usec / 1e4 if usage_usec is not None else None, cpu_limit,
+                throttled_usec / 1e4 if throttled_usec is not None else None, memory_bytes, memory_limit,
+                read_bytes, write_bytes,
+                *(stall / 1e4 if stall is not None else None for stall in (cpu_stall, memory_stall, io_stall)),
+            ))
+        return samples
+
+    def rate_fields(self):
+        """Return the rate fields the base cgroup has counters for, including those still waiting for a second read."""
+        previous = self._previous.get(self._root)
+        if previous is None:
+            return []
+        return [field for field, counter in zip(CGROUP_RATE_FIELDS, previous[1]) if counter is not None]
+
+    def close(self):
+        for directory in list(self._files):
+            self._forget(directory)
+
+    def _read(self, files):
+        # Cumulative counters (µs and bytes), and the memory in use
+        def read(name):
+            fd = files.get(name)
+            return _read_cgroup_file(fd) if fd is not None else None
+
+        cpu_stat, io_stat = read("cpu.stat"), read("io.stat")
+        read_bytes, write_bytes = _cgroup_io_bytes(io_stat) if io_stat is not None else (None, None)
+        counters = (
+            _cgroup_keyed_value(cpu_stat, b"usage_usec ") if cpu_stat is not None else None,
+            _cgroup_keyed_value(cpu_stat, b"throttled_usec ") if cpu_stat is not None else None,
+            read_bytes, write_bytes,
+            *(_cgroup_keyed_value(data, b"total=") if data is not None else None
+              for data in (read("cpu.pressure"), read("memory.pressure"), read("io.pressure"))),
+        )
+        memory_current = read("memory.current")
+        return counters, int(memory_current) if memory_current is not None else None
+
+    def _forget(self, directory):
+        for fd in self._files.pop(directory, {}).values():
+            os.close(fd)
+        self._paths.pop(directory, None)
+        self._limits.pop(directory, None)
+        self._previous.pop(directory, None)
+
+cgroup_monitor = CgroupMonitor()
+
+def get_cgroups():
+    try:
+        return cgroup_monitor.sample()
+    except Exception as e:
+        print(f"Error reading cgroups: {e}")
+        return []
+
+# Details that do not change while the machine is running. They are probed
+# once and only re-probed on SIGHUP or every --inventory-interval seconds.
+HardwareInventory = namedtuple("HardwareInventory", [
+    "cpu_model", "cpu_cores", "cpu_threads", "total_ram", "gpu_models", "sensor_paths", "cpu_groups", "collected_at",
+])
+
+def collect_hardware_inventory():
+    return HardwareInventory(
+        cpu_model=get_cpu_info(),
+        cpu_cores=get_cpu_cores(),
+        cpu_threads=get_cpu_threads(),
+        total_ram=get_total_ram(),
+        gpu_models=tuple(get_gpu_info()),
+        sensor_paths=get_cpu_sensor_paths(),
+        cpu_groups=get_cpu_groups(),
+        collected_at=time.monotonic(),
+    )
+
+hardware_inventory = InventoryCache(collect_hardware_inventory)
+get_hardware_inventory = hardware_inventory.get
+
+sensor_monitor = SensorMonitor(get_hardware_inventory)
+
+procfs_reader = ProcfsReader()
+
+COLLECTOR_BACKENDS = collector_backends(procfs_reader, get_hardware_inventory)
+
+process_tracker = ProcessTracker()
+
+collector_scheduler = CollectorScheduler()
+
+def register_collectors(interval=1.0, backend="psutil"):
+    collectors = COLLECTOR_BACKENDS[backend]
+    collector_scheduler.register("cpu", collectors["cpu"], interval, default=[])
+    collector_scheduler.register("ram", collectors["ram"], interval, default=0)
+    collector_scheduler.register("gpu_usage", get_gpu_usage, interval, default=[])
+    collector_scheduler.register("gpu_temperature", get_gpu_temperature, interval, default=[])
+    collector_scheduler.register("cpu_temperature", collectors["cpu_temperature"], max(interval, 2.0), default=None)
+    collector_scheduler.register("sensors", sensor_monitor.sample, max(interval, 2.0), default=[])
+    collector_scheduler.register("network", collectors["network"], interval, default=(0, 0))
+    collector_scheduler.register("network_rates", get_network_rates, interval, default={})
+    collector_scheduler.register("disk_rates", get_disk_rates, interval, default={})
+    collector_scheduler.register("cgroups", get_cgroups, interval, default=[])
+    collector_scheduler.register("storage", get_main_storage_usage, SLOW_COLLECTOR_INTERVAL, timeout=5.0, default=(0, 0, 0, 0))
+    collector_scheduler.register("mounts", mount_monitor.sample, MOUNT_PROBE_INTERVAL, timeout=MOUNT_PROBE_DEADLINE + 5.0, default=[])
+    collector_scheduler.register("users", get_active_users, SLOW_COLLECTOR_INTERVAL, default=[])
+    collector_scheduler.register("processes", process_tracker.sample, max(interval, PROCESS_SCAN_INTERVAL), default=[])
+
+register_collectors()
+
+def get_usage():
+    return read_usage(collector_scheduler, get_hardware_inventory())
+
+def sample_fields():
+    """Return this machine's latest sample as (values, meta), with the figures of the monitored cgroup."""
+    values, meta = usage_to_fields(get_usage(), get_hardware_inventory().cpu_model)
+    # The monitored cgroup only: the ones below it come and go, and every new field would rotate a --record log
+    cgroups = collector_scheduler.get("cgroups")
+    if cgroups:
+        base = cgroups[0]._asdict()
+        del base["path"]
+        # Rates have no value until the second read. NaN (no value yet) still puts their fields in the first
+        # sample, which fixes the --record schema and the --format columns
+        for field in cgroup_monitor.rate_fields():
+            if base[field] is None:
+                base[field] = math.nan
+        values.update({f"cgroup.{field}": float(value) for field, value in base.items() if value is not None})
+    return values, meta
+
+history = HistoryStore()
+
+profiler = Profiler()
+
+def build_system_info():
+    from rich.text import Text
+    lines = []
+    inventory = get_hardware_inventory()
+    cpu_model = inventory.cpu_model
+    gpu_models = inventory.gpu_models
+    lines.append(f"{'CPU Model':<25}: {cpu_model}")
+    for i, gpu_model in enumerate(gpu_models):
+        lines.append(f"{'GPU Model' if i == 0 else '':<25}: {gpu_model}")
+    return Text("\n".join(lines))
+
+def display_system_info(console):
+    console.print(build_system_info())
+
+# Dense per-core view for hosts with more cores than terminal lines: one colored
+# cell per core, HEATMAP_WIDTH cells per line, shaded in 10% steps
+CORE_VIEWS = ("auto", "rows", "heatmap")
+HEATMAP_WIDTH = 32
+HEATMAP_BUSIEST = 4
+HEATMAP_CELL = "█"
+HEATMAP_STYLES = ("grey35", "green4", "green3", "chartreuse3", "yellow3", "yellow", "orange3", "dark_orange", "red3", "red1")
+core_view = "auto"
+
+def use_heatmap(cores):
+    if core_view == "auto":
+        return cores > shutil.get_terminal_size().lines
+    return core_view == "heatmap"
+
+def build_heatmap(values, width=HEATMAP_WIDTH):
+    """Return a Text grid with one colored cell per value, `width` cells per line."""
+    from rich.text import Text
+    text = Text(no_wrap=True)
+    last = len(HEATMAP_STYLES) - 1
+    for start in range(0, len(values), width):
+        if start:
+            text.append("\n")
+        # Neighbouring cells of the same shade become one span, so a mostly idle or busy line is one append
+        run_style, run_length = None, 0
+        for value in values[start:start + width]:
+            style = HEATMAP_STYLES[min(last, max(0, int(value / 10)))]
+            if style == run_style:
+                run_length += 1
+                continue
+            if run_length:
+                text.append(HEATMAP_CELL * run_length, run_style)
+            run_style, run_length = style, 1
+        if run_length:
+            text.append(HEATMAP_CELL * run_length, run_style)
+    return text
+
+def build_heatmap_scale():
+    from rich.text import Text
+    text = Text("0% ", no_wrap=True)
+    for style in HEATMAP_STYLES:
+        text.append(HEATMAP_CELL, style)
+    text.append(" 100%")
+    return text
+
+def build_live_table(usage=None, metric_history=None, now=None):
+    # Without arguments the table shows this machine; the fleet view passes a remote host's sample
+    from rich.table import Table
+    if metric_history is None:
+        metric_history = history
+    local = usage is None
+    # Create a new table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Component", justify="left")
+    table.add_column("Info", justify="left")
+    table.add_column("Usage", justify="left")
+    table.add_column("Graph", justify="left")
+
+    # Add rows to the table dynamically based on live data
+    cpu_percent, ram_percent, cpu_cores, cpu_threads, gpu_percent, total_ram, cpu_temp_celsius, cpu_temp_fahrenheit, gpu_temperatures, total_storage_gb, used_storage_gb, free_storage_gb, used_storage_percent, sent_mb, recv_mb, active_users, gpu_models = usage if usage is not None else get_usage()
+
+    # Keep the history that the Graph column is drawn from; a replay passes the recorded time
+    if now is None:
+        now = time.monotonic()
+    for i, cpu_percent_core in enumerate(cpu_percent):
+        metric_history.record(f"cpu.{i}", cpu_percent_core, now)
+    if cpu_percent:
+        metric_history.record("cpu", sum(cpu_percent) / len(cpu_percent), now)
+    for i, gpu_percent_val in enumerate(gpu_percent):
+        metric_history.record(f"gpu.{i}.usage", gpu_percent_val, now)
+    for i, gpu_temperature_val in enumerate(gpu_temperatures):
+        metric_history.record(f"gpu.{i}.temperature", gpu_temperature_val, now)
+    metric_history.record("ram", ram_percent, now)
+    metric_history.record("cpu_temperature", cpu_temp_celsius, now)
+    metric_history.record("storage", used_storage_percent, now)
+    sent_rate = metric_history.record_rate("network.sent", sent_mb, now)
+    recv_rate = metric_history.record_rate("network.recv", recv_mb, now)
+
+    # Add CPU rows
+    if cpu_cores:
+        table.add_row("Cores", "", f"{cpu_cores} (Threads: {cpu_threads})", "")
+        if use_heatmap(len(cpu_percent)):
+            # One grid per NUMA node or socket, then the busiest cores in full
+            groups = get_hardware_inventory().cpu_groups if local else ()
+            if sum(len(positions) for label, positions in groups) != len(cpu_percent):
+                groups = (("All Cores", range(len(cpu_percent))),)
+            for label, positions in groups:
+                values = [cpu_percent[position] for position in positions]
+                table.add_row(f"{label} ({len(values)} CPUs)", f"{sum(values) / len(values):.2f}% avg", build_heatmap(values), "")
+            table.add_row("  Scale", "", build_heatmap_scale(), "")
+            shown_cores = heapq.nlargest(HEATMAP_BUSIEST, range(len(cpu_percent)), key=cpu_percent.__getitem__)
+        else:
+            shown_cores = range(len(cpu_percent))
+        for i in shown_cores:
+            cpu_percent_core = cpu_percent[i]
+            table.add_row(f"Core {i + 1}", f"{cpu_percent_core:.2f}%", f"[{'█' * int(cpu_percent_core / 5)}{' ' * (20 - int(cpu_percent_core / 5))}]", metric_history.sparkline(f"cpu.{i}", 100))
+        overall_cpu_percent = sum(cpu_percent) / len(cpu_percent)
+        table.add_row("Overall CPU Usage", f"{overall_cpu_percent:.2f}%", f"[{'█' * int(overall_cpu_percent / 5)}{' ' * (20 - int(overall_cpu_percent / 5))}]", metric_history.sparkline("cpu", 100))
+
+    # The busiest processes, next to the per-core rows
+    processes = collector_scheduler.get("processes") if local and process_tracker.limit else []
+    if processes:
+        table.add_row("Top Processes", f"by {PROCESS_SORT_LABELS[process_tracker.sort]}", "", "")
+        for pid, name, process_cpu_percent, rss, io_rate in processes:
+            table.add_row(f"  {(name or '?')[:24]} ({pid})", f"{process_cpu_percent:.1f}% CPU", f"{rss / (1024.0 ** 2):.1f} MB RSS", f"{io_rate / (1024.0 ** 2):.2f} MB/s I/O")
+
+    # Add GPU rows
+    for i, gpu_model in enumerate(gpu_models):
+        table.add_row(f"GPU {i + 1} Model", "", gpu_model, "")
+        gpu_percent_val = gpu_percent[i] if i < len(gpu_percent) else 0
+        gpu_temperature_val = gpu_temperatures[i] if i < len(gpu_temperatures) else None
+        table.add_row(f"GPU {i + 1} Usage", f"{gpu_percent_val:.2f}%", f"[{'█' * int(gpu_percent_val / 5)}{' ' * (20 - int(gpu_percent_val / 5))}]", metric_history.sparkline(f"gpu.{i}.usage", 100))
+        table.add_row(f"GPU {i + 1} Temperature", f"{gpu_temperature_val:.1f}°C" if gpu_temperature_val is not None else "N/A", f"{'█' * int(gpu_temperature_val / 5)}{' ' * (20 - int(gpu_temperature_val / 5))}" if gpu_temperature_val is not None else "", metric_history.sparkline(f"gpu.{i}.temperature", 100))
+
+    if ram_percent:
+        table.add_row("Total RAM", "", f"{total_ram} GB", "")
+        table.add_row("Used RAM", f"{ram_percent:.2f}%", f"[{'█' * int(ram_percent / 5)}{' ' * (20 - int(ram_percent / 5))}]", metric_history.sparkline("ram", 100))
+    if cpu_temp_celsius is not None:
+        table.add_row("CPU Temperature", f"{cpu_temp_celsius:.1f}°C / {cpu_temp_fahrenheit:.1f}°F", f"{'█' * int(cpu_temp_celsius / 5)}{' ' * (20 - int(cpu_temp_celsius / 5))}", metric_history.sparkline("cpu_temperature", 100))
+    else:
+        table.add_row("CPU Temperature", "N/A", "", "")
+
+    if local:
+        add_sensor_rows(table, collector_scheduler.get("sensors"))
+
+    # One row per mount; the fullest ones when there are more than fit
+    mounts = collector_scheduler.get("mounts") if local else []
+    if mounts:
+        shown = mounts if len(mounts) <= STORAGE_MAX_ROWS else heapq.nlargest(STORAGE_MAX_ROWS, mounts, key=lambda mount: -1 if mount[5] is None else mount[5])
+        table.add_row("Storage", f"{len(mounts)} filesystems" if len(shown) == len(mounts) else f"{len(shown)} fullest of {len(mounts)}", "", "")
+        for mountpoint, fstype, mount_total_gb, mount_used_gb, mount_free_gb, mount_percent, stale in shown:
+            # Deep mount points keep their last components, which tell them apart
+            mountpoint = mountpoint if len(mountpoint) <= 28 else "…" + mountpoint[-27:]
+            if mount_percent is None:
+                table.add_row(f"  {mountpoint}", "not responding", fstype, f"no answer for {stale:.0f}s", style="dim")
+                continue
+            table.add_row(
+                f"  {mountpoint}",
+                f"{mount_percent:.2f}%",
+                f"[{'█' * int(mount_percent / 5)}{' ' * (20 - int(mount_percent / 5))}]",
+                f"{mount_free_gb:.1f} of {mount_total_gb:.1f} GB free" + (f" ({stale:.0f}s old)" if stale is not None else ""),
+                style="dim" if stale is not None else None,
+            )
+    elif used_storage_percent:
+        table.add_row("Main Storage Usage", f"{used_storage_percent:.2f}%", f"[{'█' * int(used_storage_percent / 5)}{' ' * (20 - int(used_storage_percent / 5))}]", metric_history.sparkline("storage", 100))
+        table.add_row("Total Storage", "", f"{total_storage_gb} GB", "")
+        table.add_row("Used Storage", "", f"{used_storage_gb} GB", "")
+        table.add_row("Available Storage", "", f"{free_storage_gb} GB", "")
+
+    # Current rates per interface and per disk, busiest first; remote and replayed samples only carry the totals
+    interfaces = collector_scheduler.get("network_rates") if local else {}
+    if interfaces:
+        busiest = heapq.nlargest(DEVICE_MAX_ROWS, interfaces.items(), key=lambda item: item[1][0] + item[1][1])
+        total_sent = sum(rates[0] for rates in interfaces.values()) / (1024.0 ** 2)
+        total_recv = sum(rates[1] for rates in interfaces.values()) / (1024.0 ** 2)
+        table.add_row("Network", f"↑ {total_sent:.2f} ↓ {total_recv:.2f} MB/s", f"{len(interfaces)} interfaces" if len(busiest) == len(interfaces) else f"{len(busiest)} busiest of {len(interfaces)}", "")
+        for nic, (bytes_sent, bytes_recv, packets_sent, packets_recv, errin, errout, dropin, dropout) in busiest:
+            errors, drops = errin + errout, dropin + dropout
+            table.add_row(
+                f"  {nic}",
+                f"↑ {bytes_sent / (1024.0 ** 2):.2f} ↓ {bytes_recv / (1024.0 ** 2):.2f} MB/s",
+                f"{packets_sent:.0f} / {packets_recv:.0f} pkt/s",
+                f"[red]{errors:.0f} err/s, {drops:.0f} drop/s[/red]" if errors or drops else "",
+            )
+    elif sent_mb:
+        table.add_row("Network Sent", f"{sent_mb:.2f} MB", f"{sent_rate:.2f} MB/s" if sent_rate is not None else "", metric_history.sparkline("network.sent"))
+        table.add_row("Network Received", f"{recv_mb:.2f} MB", f"{recv_rate:.2f} MB/s" if recv_rate is not None else "", metric_history.sparkline("network.recv"))
+
+    disks = collector_scheduler.get("disk_rates") if local else {}
+    if disks:
+        busiest = heapq.nlargest(DEVICE_MAX_ROWS, disks.items(), key=lambda item: item[1][2] + item[1][3])
+        total_read = sum(rates[2] for rates in disks.values()) / (1024.0 ** 2)
+        total_write = sum(rates[3] for rates in disks.values()) / (1024.0 ** 2)
+        total_iops = sum(rates[0] + rates[1] for rates in disks.values())
+        table.add_row("Disk I/O", f"R {total_read:.2f} W {total_write:.2f} MB/s", f"{total_iops:.0f} IOPS", "" if len(busiest) == len(disks) else f"{len(busiest)} busiest of {len(disks)}")
+        for disk, (read_count, write_count, read_bytes, write_bytes, read_time, write_time, busy_time) in busiest:
+            iops = read_count + write_count
+            # read_time/write_time are milliseconds spent per second, so their ratio to IOPS is the average wait
+            latency = (read_time + write_time) / iops if iops else 0.0
+            table.add_row(
+                f"  {disk}",
+                f"R {read_bytes / (1024.0 ** 2):.2f} W {write_bytes / (1024.0 ** 2):.2f} MB/s",
+                f"{iops:.0f} IOPS",
+                f"{latency:.1f} ms wait, {min(busy_time / 10, 100.0):.0f}% busy",
+            )
+
+    # The cgroup the monitor runs in (a container's own limits) and the busiest cgroups below it
+    cgroups = collector_scheduler.get("cgroups") if local else []
+    if cgroups:
+        busiest = heapq.nlargest(CGROUP_MAX_ROWS, cgroups, key=lambda cgroup: cgroup.cpu_percent or 0.0)
+        table.add_row("Cgroups", f"{len(cgroups)} cgroups" if len(busiest) == len(cgroups) else f"{len(busiest)} busiest of {len(cgroups)}", "CPU, memory", "I/O, pressure stalls")
+        for cgroup in busiest:
+            path = cgroup.path if len(cgroup.path) <= 28 else "…" + cgroup.path[-27:]
+            cpu = f"{cgroup.cpu_percent:.1f}% CPU" if cgroup.cpu_percent is not None else "…"
+            if cgroup.cpu_limit is not None:
+                cpu += f" of {cgroup.cpu_limit:g}"
+            if cgroup.throttled_percent:
+                cpu += f" [red]({cgroup.throttled_percent:.0f}% throttled)[/red]"
+            memory = f"{cgroup.memory_bytes / (1024.0 ** 2):.0f} MB" if cgroup.memory_bytes is not None else ""
+            if cgroup.memory_bytes is not None and cgroup.memory_limit:
+                memory += f" of {cgroup.memory_limit / (1024.0 ** 2):.0f} ({cgroup.memory_bytes / cgroup.memory_limit * 100:.0f}%)"
+            io_text = f"R {cgroup.read_rate / (1024.0 ** 2):.2f} W {cgroup.write_rate / (1024.0 ** 2):.2f} MB/s" if cgroup.read_rate is not None else ""
+            stalls = [f"{name} {value:.1f}%" for name, value in (("cpu", cgroup.cpu_pressure), ("mem", cgroup.memory_pressure), ("io", cgroup.io_pressure)) if value]
+            table.add_row(f"  {path}", cpu, memory, ", ".join(([io_text] if io_text else []) + (["stall " + " ".join(stalls)] if stalls else [])))
+
+    if active_users:
+        table.add_row("Active Users", ", ".join(active_users), "", "")
+
+    stale = collector_scheduler.stale() if local else {}
+    if stale:
+        table.add_row("Stale Data", ", ".join(f"{name} ({age:.0f}s old)" if age is not None else f"{name} (no data)" for name, age in stale.items()), "", "", style="dim")
+
+    return table
+
+def display_live_graph(console):
+    console.print(build_live_table())
+
+def build_fleet_table(aggregator, interval=1.0, limit=None):
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Host", justify="left")
+    table.add_column("Platform", justify="left")
+    table.add_column("CPU", justify="right")
+    table.add_column("Cores", justify="right")
+    table.add_column("RAM", justify="right")
+    table.add_column("GPU", justify="right")
+    table.add_column("Temp", justify="right")
+    table.add_column("Storage", justify="right")
+    table.add_column("Last Seen", justify="right")
+    now = time.monotonic()
+    hosts = aggregator.snapshot()
+    # Hostnames are only labels: tell agents that share one apart by address
+    hostnames = Counter(host[1] for host in hosts)
+    rows = []
+    for key, hostname, platform, address, connected, last_seen, values, meta in hosts:
+        if hostnames[hostname] > 1:
+            hostname = f"{hostname} ({address})"
+        usage = fields_to_usage(values, meta)
+        cpu_percent, ram_percent, gpu_percent, cpu_temp_celsius, used_storage_percent = usage[0], usage[1], usage[4], usage[6], usage[12]
+        overall_cpu_percent = sum(cpu_percent) / len(cpu_percent) if cpu_percent else 0.0
+        rows.append((overall_cpu_percent, hostname, platform, connected, now - last_seen, len(cpu_percent), ram_percent,
+                     max(gpu_percent) if gpu_percent else None, cpu_temp_celsius, used_storage_percent))
+    # Busiest hosts first; when the fleet is taller than the screen only those fit
+    rows.sort(key=lambda row: row[0], reverse=True)
+    for overall_cpu_percent, hostname, platform, connected, age, cores, ram_percent, gpu_percent, cpu_temp_celsius, used_storage_percent in rows[:limit]:
+        late = not connected or age > 3 * interval
+        table.add_row(
+            hostname, platform, f"{overall_cpu_percent:.1f}%", str(cores), f"{ram_percent:.1f}%",
+            f"{gpu_percent:.1f}%" if gpu_percent is not None else "", f"{cpu_temp_celsius:.1f}°C" if cpu_temp_celsius is not None else "N/A",
+            f"{used_storage_percent:.1f}%", "disconnected" if not connected else f"{age:.1f}s ago",
+            style="dim" if late else None,
+        )
+    connected = sum(1 for host in hosts if host[4])
+    table.caption = f"{connected}/{len(hosts)} agents connected" + (f", showing top {limit} by CPU" if limit is not None and len(rows) > limit else "")
+    return table
+
+def build_fleet_host_view(aggregator, host, metric_history):
+    """Detail view of the agent `host`, an aggregator host key."""
+    from rich.console import Group
+    from rich.text import Text
+    for key, hostname, platform, address, connected, last_seen, values, meta in aggregator.snapshot():
+        if key == host:
+            usage = fields_to_usage(values, meta)
+            header = [f"{'Host':<25}: {hostname} at {address} ({platform}{'' if connected else ', disconnected'})",
+                      f"{'CPU Model':<25}: {meta.get('cpu_model', 'N/A')}"]
+            header += [f"{'GPU Model' if i == 0 else '':<25}: {gpu_model}" for i, gpu_model in enumerate(usage[-1])]
+            return Group(Text("\n".join(header)), build_live_table(usage, metric_history))
+    return Text(f"Unknown host {host[0]} ({host[1]})")
+
+def _read_keys():
+    keys = ""
+    while select.select([sys.stdin], [], [], 0)[0]:
+        key = sys.stdin.read(1)
+        if not key:
+            break
+        keys += key
+    return keys
+
+def render_fleet(console, aggregator, interval=1.0, max_fps=4.0):
+    """Fleet overview; n/p step through hosts, o returns to the overview, q quits."""
+    from .display import FrameRenderer
+    from rich.console import Group
+    from rich.text import Text
+    renderer = FrameRenderer(console, max_fps=max_fps)
+    selected = None
+    metric_history = None
+    terminal = None
+    if sys.stdin.isatty():
+        terminal = termios.tcgetattr(sys.stdin)
+        tty.setcbreak(sys.stdin)
+    try:
+        with renderer:
+            while True:
+                started = time.monotonic()
+                hosts = [host[0] for host in sorted(aggregator.snapshot(), key=lambda host: host[1:4])]
+                for key in (_read_keys() if terminal is not None else ""):
+                    if key == "q":
+                        return
+                    if key == "o":
+                        selected = None
+                    elif key in "np" and hosts:
+                        position = hosts.index(selected) if selected in hosts else -1
+                        selected = hosts[(position + (1 if key == "n" else -1)) % len(hosts)]
+                        # Only the host being inspected gets a history, so memory does not grow with the fleet
+                        metric_history = HistoryStore(interval, history.window, history.width)
+                help_line = Text("n/p: next/previous host   o: overview   q: quit", style="dim")
+                if selected is None:
+                    renderer.update(Group(build_fleet_table(aggregator, interval, max(1, console.size.height - 8)), help_line))
+                else:
+                    renderer.update(Group(build_fleet_host_view(aggregator, selected, metric_history), help_line))
+                renderer.flush()
+                # Poll the keyboard a few times per interval so drill-down feels responsive
+                deadline = started + interval
+                while time.monotonic() < deadline:
+                    if terminal is not None and select.select([sys.stdin], [], [], max(0.0, min(0.1, deadline - time.monotonic())))[0]:
+                        break
+                    if terminal is None:
+                        time.sleep(max(0.0, deadline - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if terminal is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, terminal)
+
+def simulate_fleet(console, agents=200, seconds=10.0, interval=1.0, cores=16):
+    """Run an aggregator and many synthetic agents on localhost and report its cost."""
+    import asyncio
+    from .servers import FleetAgent, FleetAggregator
+    aggregator = FleetAggregator("127.0.0.1", 0)
+    aggregator.start()
+
+    def synthetic_sample(seed):
+        generator = random.Random(seed)
+        hostname = f"sim-{seed:04d}"
+        counters = [0.0, 0.0]
+
+        def sample():
+            counters[0] += generator.random() * 10
+            counters[1] += generator.random() * 10
+            cpu_percent = [round(generator.random() * 100, 1) for _ in range(cores)]
+            usage = (cpu_percent, round(generator.random() * 100, 1), cores // 2, cores, [], 64.0,
+                     round(40 + generator.random() * 30, 1), None, [], 500.0, 200.0, 300.0, 40.0,
+                     round(counters[0], 2), round(counters[1], 2), ["ops"], [])
+            return usage_to_fields(usage, "Simulated CPU")
+        return hostname, sample
+
+    fleet = []
+    for seed in range(agents):
+        hostname, sample = synthetic_sample(seed)
+        fleet.append(FleetAgent("127.0.0.1", sample, aggregator.port, interval, hostname=hostname, platform=PLATFORM, agent_id=hostname))
+
+    async def run_agents():
+        tasks = [asyncio.create_task(agent.run()) for agent in fleet]
+        await asyncio.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    cpu_started, wall_started = aggregator.thread_time(), time.perf_counter()
+    asyncio.run(run_agents())
+    cpu_used, wall = aggregator.thread_time() - cpu_started, time.perf_counter() - wall_started
+    aggregator.stop()
+    with aggregator.lock:
+        frames = sum(host.frames for host in aggregator.hosts.values())
+        received = sum(host.bytes for host in aggregator.hosts.values())
+        connected = len(aggregator.hosts)
+    skipped = sum(agent.ticks_skipped for agent in fleet)
+    console.print(f"{connected}/{agents} agents seen, {frames} frames ({frames / wall:.0f}/s), "
+                  f"{received / max(frames, 1):.0f} bytes/frame, {skipped} ticks coalesced, "
+                  f"aggregator thread {cpu_used / wall * 100:.1f}% of one core")
+
+class SampleLog:
+    """Every segment of a --record log, oldest first, addressed by one record index."""
+
+    def __init__(self, path):
+        self.path = path
+        rotated = [candidate for candidate in glob.glob(f"{glob.escape(path)}.*") if candidate.rsplit(".", 1)[1].isdigit()]
+        paths = sorted(rotated, key=lambda candidate: int(candidate.rsplit(".", 1)[1]), reverse=True)
+        paths += [path] if os.path.exists(path) else []
+        self.segments = []
+        for segment_path in paths:
+            try:
+                self.segments.append(SampleSegment(segment_path))
+            except (OSError, ValueError) as e:
+                print(f"Skipping {segment_path}: {e}")
+        if not self.segments:
+            raise ValueError(f"no sample log found at {path}")
+
+    def __len__(self):
+        return sum(segment.count for segment in self.segments)
+
+    def _locate(self, index):
+        for segment in self.segments:
+            count = segment.count
+            if index < count:
+                return segment, index
+            index -= count
+        return None, None
+
+    def read(self, index):
+        """Return (timestamp, values, segment) for a record, or None past the end."""
+        segment, position = self._locate(index)
+        if segment is None:
+            return None
+        timestamp, values = segment.record(position)
+        return timestamp, values, segment
+
+    def seek(self, timestamp):
+        """Index of the first record at or after timestamp; only the matching segment is searched."""
+        skipped = 0
+        for segment in self.segments:
+            count = segment.count
+            if count and segment.timestamp(count - 1) >= timestamp:
+                return skipped + segment.seek(timestamp)
+            skipped += count
+        return skipped
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+
+# Seconds that b/f jump back and forward during --replay
+REPLAY_JUMP_SECONDS = 600
+
+def parse_replay_time(text):
+    """Epoch seconds or a local ISO date and time such as '2024-05-01 03:15'."""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+def replay_log(console, log, speed=1.0, start=None, max_fps=4.0):
+    """Play a recorded log through the live table; space pauses, +/- change speed, b/f jump, q quits."""
+    from .display import FrameRenderer
+    from rich.console import Group
+    from rich.text import Text
+    renderer = FrameRenderer(console, max_fps=max_fps)
+    metric_history = None
+    shown = None
+    paused = False
+    first = log.read(0)
+    log_time = start if start is not None else first[0]
+    wall_anchor, log_anchor = time.monotonic(), log_time
+    terminal = None
+    if sys.stdin.isatty():
+        terminal = termios.tcgetattr(sys.stdin)
+        tty.setcbreak(sys.stdin)
+    try:
+        with renderer:
+            while True:
+                now = time.monotonic()
+                if not paused:
+                    log_time = log_anchor + (now - wall_anchor) * speed
+                for key in (_read_keys() if terminal is not None else ""):
+                    if key == "q":
+                        return
+                    if key in " +-bf":
+                        if key == " ":
+                            paused = not paused
+                        elif key == "+":
+                            speed *= 2
+                        elif key == "-":
+                            speed /= 2
+                        else:
+                            log_time += REPLAY_JUMP_SECONDS if key == "f" else -REPLAY_JUMP_SECONDS
+                        wall_anchor, log_anchor = now, log_time
+                # Show the newest record at or before the replay clock
+                index = log.seek(log_time)
+                record = log.read(index)
+                if record is None or record[0] > log_time:
+                    index = max(0, index - 1)
+                    record = log.read(index)
+                timestamp, values, segment = record
+                if shown is None or index != shown:
+                    if shown is None or index < shown or index - shown > 1 and timestamp - log.read(shown)[0] > REPLAY_JUMP_SECONDS / 2:
+                        # Started, or jumped: the sparklines restart instead of joining unrelated stretches
+                        metric_history = HistoryStore(segment.interval, history.window, history.width)
+                    usage = fields_to_usage(values, segment.meta)
+                    state = "paused" if paused else f"{speed:g}x"
+                    header = [f"{'Replaying':<25}: {log.path}, {segment.hostname} ({segment.platform})",
+                              f"{'Recorded at':<25}: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))} ({state})",
+                              f"{'CPU Model':<25}: {segment.meta.get('cpu_model', 'N/A')}"]
+                    header += [f"{'GPU Model' if i == 0 else '':<25}: {gpu_model}" for i, gpu_model in enumerate(usage[-1])]
+                    help_line = Text("space: pause   +/-: faster/slower   b/f: back/forward 10 minutes   q: quit", style="dim")
+                    renderer.update(Group(Text("\n".join(header)), build_live_table(usage, metric_history, now=timestamp), help_line))
+                    shown = index
+                renderer.flush()
+                if terminal is not None:
+                    select.select([sys.stdin], [], [], 1.0 / max_fps if max_fps > 0 else 0.25)
+                else:
+                    time.sleep(1.0 / max_fps if max_fps > 0 else 0.25)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if terminal is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, terminal)
+
+def benchmark_record(console, samples=100000, interval=1.0):
+    """Measure append cost, bytes per record, size per day and seek time of the sample log."""
+    from rich.table import Table
+    generator = random.Random(1)
+    local_values, local_meta = sample_fields()
+    synthetic_values = {f"cpu.{i}": 0.0 for i in range(64)}
+    synthetic_values.update({f"gpu.{i}.{field}": 0.0 for i in range(4) for field in ("usage", "temperature")})
+    synthetic_values.update({name: 0.0 for name in local_values if not name.startswith(("cpu.", "gpu."))})
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Sample", justify="left")
+    table.add_column("Fields", justify="right")
+    table.add_column("Bytes / record", justify="right")
+    table.add_column("Append (wall)", justify="right")
+    table.add_column("Append (CPU)", justify="right")
+    table.add_column(f"Size / day at {interval:g}s", justify="right")
+    table.add_column("Seek", justify="right")
+    directory = tempfile.mkdtemp(prefix="server-monitor-record-")
+    try:
+        for label, values, meta in (("this host", local_values, local_meta),
+                                    ("64 cores, 4 GPUs", synthetic_values, local_meta)):
+            path = os.path.join(directory, "samples.log")
+            recorder = SampleRecorder(path, interval, segment_seconds=samples * interval, keep=0, platform=PLATFORM)
+            recorder.append(0.0, values, meta)  # creates and preallocates the segment
+            names = list(values)
+            updates = [{name: generator.uniform(0, 100) for name in names} for _ in range(64)]
+            cpu_started, wall_started = time.process_time(), time.perf_counter()
+            for i in range(1, samples):
+                recorder.append(i * interval, updates[i % len(updates)], meta)
+            wall_time = (time.perf_counter() - wall_started) / (samples - 1)
+            cpu_time = (time.process_time() - cpu_started) / (samples - 1)
+            record_size = recorder._struct.size
+            recorder.close()
+            log = SampleLog(path)
+            targets = [generator.uniform(0, samples * interval) for _ in range(1000)]
+            seek_started = time.perf_counter()
+            for target in targets:
+                log.seek(target)
+            seek_time = (time.perf_counter() - seek_started) / len(targets)
+            log.close()
+            day_size = RECORD_HEADER_SIZE + math.ceil(86400 / interval) * record_size
+            table.add_row(label, f"{len(values)}", f"{record_size}", f"{wall_time * 1e6:.2f} µs", f"{cpu_time * 1e6:.2f} µs",
+                          f"{day_size / 1024 ** 2:.1f} MiB", f"{seek_time * 1e6:.1f} µs")
+            os.remove(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    console.print(table)
+
+def parse_args():
+    parser = build_parser("Live system monitor for Linux", "re-probe CPU/GPU/RAM/sensor details every N seconds (default: only on SIGHUP)")
+    parser.add_argument("--core-view", choices=CORE_VIEWS, default="auto",
+                        help="one row per core, or a heatmap grouped by NUMA node or socket; auto uses the heatmap "
+                             "when there are more cores than terminal lines (default: auto)")
+    parser.add_argument("--nics", type=lambda value: tuple(value.split(",")), default=NETWORK_DEVICE_FILTER, metavar="GLOBS",
+                        help="comma-separated interface name patterns to show, '!' to exclude (default: !lo)")
+    parser.add_argument("--disks", type=lambda value: tuple(value.split(",")), default=DISK_DEVICE_FILTER, metavar="GLOBS",
+                        help="comma-separated disk name patterns to show, '!' to exclude (default: !loop*,!ram*)")
+    parser.add_argument("--cgroup", metavar="PATH",
+                        help="cgroup v2 path to account for, e.g. /system.slice (default: the monitor's own cgroup)")
+    parser.add_argument("--cgroup-depth", type=int, default=0, metavar="N",
+                        help="also show the cgroups up to N levels below --cgroup, e.g. 1 for each service or container (default: 0)")
+    add_export_arguments(parser, COLLECTOR_BACKENDS)
+    parser.add_argument("--aggregate", type=int, metavar="PORT", nargs="?", const=FLEET_PORT,
+                        help=f"collect samples from fleet agents and show the fleet overview, listening on --bind "
+                             f"(default: 0.0.0.0, port {FLEET_PORT})")
+    parser.add_argument("--fleet-simulate", type=int, metavar="AGENTS", nargs="?", const=200,
+                        help="run an aggregator with many simulated agents on localhost, report its cost and exit")
+    parser.add_argument("--fleet-seconds", type=float, default=10.0,
+                        help="how long --fleet-simulate runs (default: 10)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="play back a --record log in the live table instead of monitoring this machine")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="playback speed for --replay, e.g. 60 for a minute per second (default: 1)")
+    parser.add_argument("--replay-from", metavar="TIME", type=parse_replay_time,
+                        help="start --replay at TIME, in epoch seconds or a local date such as '2024-05-01 03:15'")
+    parser.add_argument("--benchmark-record", type=int, metavar="SAMPLES", nargs="?", const=100000,
+                        help="measure sample log write cost, size per day and seek time and exit")
+    return parse_monitor_args(parser)
+
+def main():
+    global core_view
+    args = parse_args()
+    console = open_console(args)
+    module = sys.modules[__name__]
+    if run_tool(module, args, console):
+        return
+    if args.fleet_simulate:
+        simulate_fleet(console, args.fleet_simulate, args.fleet_seconds, args.interval)
+        return
+    if args.benchmark_record:
+        benchmark_record(console, args.benchmark_record, args.interval)
+        return
+    if args.replay:
+        log = SampleLog(args.replay)
+        history.window = args.graph_window
+        try:
+            replay_log(console, log, args.replay_speed, args.replay_from, args.max_fps)
+        finally:
+            log.close()
+        return
+    if args.aggregate is not None:
+        from .servers import FleetAggregator
+        aggregator = FleetAggregator(args.bind or "0.0.0.0", args.aggregate)
+        aggregator.start()
+        history.window = args.graph_window
+        render_fleet(console, aggregator, args.interval, args.max_fps)
+        return
+    gpu_monitor.start()
+    gpu_monitor.wait_ready()
+    core_view = args.core_view
+    network_rates.patterns, disk_rates.patterns = args.nics, args.disks
+    cgroup_monitor.base, cgroup_monitor.depth = args.cgroup, args.cgroup_depth
+    close = (gpu_monitor.stop, procfs_reader.close, mount_monitor.close, sensor_monitor.close, cgroup_monitor.close)
+    with running_collectors(module, args, console, close):
+        run_mode(module, args, lambda: render_live_graph(module, console, args.interval, args.max_fps, args.frame_stats, args.profile is not None))
+
+if __name__ == "__main__":
+    main()
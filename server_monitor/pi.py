@@ -0,0 +1,311 @@
+import resource
+import sys
+from collections import namedtuple
+import time
+
+from .core import (
+    PROCESS_SCAN_INTERVAL, PROCESS_SORT_LABELS, SLOW_COLLECTOR_INTERVAL,
+    CollectorScheduler, HistoryStore, InventoryCache, ProcessTracker, Profiler,
+    add_export_arguments, build_parser, get_active_users, get_cpu_cores, get_cpu_threads, get_main_storage_usage,
+    get_total_ram, open_console, parse_monitor_args, read_usage, render_live_graph, report, run_mode, run_tool,
+    running_collectors,
+)
+from .formats import usage_to_fields
+from .procfs import ProcfsReader, SensorMonitor, add_sensor_rows, collector_backends, get_cpu_info, get_cpu_sensor_paths
+
+PLATFORM = "pi"
+
+# Details that do not change while the Pi is running. They are probed once
+# and only re-probed on SIGHUP or every --inventory-interval seconds.
+HardwareInventory = namedtuple("HardwareInventory", [
+    "cpu_model", "cpu_cores", "cpu_threads", "total_ram", "sensor_paths", "collected_at",
+])
+
+def collect_hardware_inventory():
+    return HardwareInventory(
+        cpu_model=get_cpu_info(),
+        cpu_cores=get_cpu_cores(),
+        cpu_threads=get_cpu_threads(),
+        total_ram=get_total_ram(),
+        sensor_paths=get_cpu_sensor_paths(),
+        collected_at=time.monotonic(),
+    )
+
+hardware_inventory = InventoryCache(collect_hardware_inventory)
+get_hardware_inventory = hardware_inventory.get
+
+sensor_monitor = SensorMonitor(get_hardware_inventory)
+
+procfs_reader = ProcfsReader()
+
+COLLECTOR_BACKENDS = collector_backends(procfs_reader, get_hardware_inventory)
+
+process_tracker = ProcessTracker()
+
+collector_scheduler = CollectorScheduler(max_workers=2)
+
+def register_collectors(interval=1.0, backend="psutil"):
+    collectors = COLLECTOR_BACKENDS[backend]
+    collector_scheduler.register("cpu", collectors["cpu"], interval, default=[])
+    collector_scheduler.register("ram", collectors["ram"], interval, default=0)
+    collector_scheduler.register("cpu_temperature", collectors["cpu_temperature"], max(interval, 2.0), default=None)
+    collector_scheduler.register("sensors", sensor_monitor.sample, max(interval, 2.0), default=[])
+    collector_scheduler.register("network", collectors["network"], interval, default=(0, 0))
+    collector_scheduler.register("storage", get_main_storage_usage, SLOW_COLLECTOR_INTERVAL, timeout=5.0, default=(0, 0, 0, 0))
+    collector_scheduler.register("users", get_active_users, SLOW_COLLECTOR_INTERVAL, default=[])
+    collector_scheduler.register("processes", process_tracker.sample, max(interval, PROCESS_SCAN_INTERVAL), default=[])
+
+register_collectors()
+
+def get_usage():
+    return read_usage(collector_scheduler, get_hardware_inventory())
+
+def sample_fields():
+    """Return the Pi's latest sample as (values, meta)."""
+    return usage_to_fields(get_usage(), get_hardware_inventory().cpu_model)
+
+history = HistoryStore()
+
+profiler = Profiler()
+
+# Adaptive sampling: per metric, the change between samples that counts as
+# stable, the change that counts as fast, and a level that always gets the
+# shortest interval. Percentages for cpu and ram, °C, MB/s for network.
+ADAPTIVE_METRICS = {
+    "cpu": (2.0, 10.0, 80.0),
+    "ram": (1.0, 5.0, 90.0),
+    "cpu_temperature": (0.5, 3.0, 75.0),
+    "network": (0.05, 1.0, None),
+}
+ADAPTIVE_COUNTERS = frozenset({"network"})
+ADAPTIVE_BACKOFF = 1.5
+ADAPTIVE_MAX_INTERVAL = 10.0
+LOW_POWER_INTERVAL = 2.0
+LOW_POWER_MAX_INTERVAL = 30.0
+LOW_POWER_MAX_FPS = 1.0
+
+class AdaptiveInterval:
+    """Sampling interval that stretches while the Pi is quiet.
+
+    observe() compares the watched metrics with the previous sample. While
+    all of them are stable the interval grows by ADAPTIVE_BACKOFF per
+    sample, up to `maximum`; a fast change or a metric above its threshold
+    drops it straight back to `minimum`, and anything in between eases it
+    down. With nobody watching, the interval goes to `maximum`.
+    """
+
+    def __init__(self, minimum=1.0, maximum=ADAPTIVE_MAX_INTERVAL):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.interval = minimum
+        self._previous = None
+        self._previous_at = None
+        self._counters = {}
+
+    def observe(self, metrics, now, watched=True):
+        metrics = dict(metrics)
+        for name in ADAPTIVE_COUNTERS & metrics.keys():
+            # Counters are judged by their rate, not their total
+            total, previous = metrics[name], self._counters.get(name)
+            self._counters[name] = total
+            metrics[name] = (total - previous) / (now - self._previous_at) if previous is not None and now > self._previous_at else None
+        previous, self._previous, self._previous_at = self._previous, metrics, now
+        if not watched:
+            self.interval = self.maximum
+            return self.interval
+        fast, stable = False, True
+        for name, value in metrics.items():
+            if value is None:
+                continue
+            stable_change, fast_change, threshold = ADAPTIVE_METRICS[name]
+            if threshold is not None and value >= threshold:
+                fast = True
+                break
+            last = previous.get(name) if previous is not None else None
+            if last is not None:
+                change = abs(value - last)
+                fast = fast or change >= fast_change
+                stable = stable and change <= stable_change
+        if fast:
+            self.interval = self.minimum
+        elif previous is None:
+            pass
+        elif stable:
+            self.interval = min(self.maximum, self.interval * ADAPTIVE_BACKOFF)
+        else:
+            self.interval = max(self.minimum, self.interval / ADAPTIVE_BACKOFF)
+        return self.interval
+
+def adaptive_metrics():
+    cpu_percent = collector_scheduler.get("cpu")
+    bytes_sent, bytes_recv = collector_scheduler.get("network")
+    return {
+        "cpu": sum(cpu_percent) / len(cpu_percent) if cpu_percent else None,
+        "ram": collector_scheduler.get("ram"),
+        "cpu_temperature": collector_scheduler.get("cpu_temperature"),
+        "network": (bytes_sent + bytes_recv) / (1024.0 ** 2),
+    }
+
+def set_sampling_interval(interval):
+    # Same proportions as register_collectors
+    for name in ("cpu", "ram", "network"):
+        collector_scheduler.set_interval(name, interval)
+    collector_scheduler.set_interval("cpu_temperature", max(interval, 2.0))
+    collector_scheduler.set_interval("sensors", max(interval, 2.0))
+    collector_scheduler.set_interval("processes", max(interval, PROCESS_SCAN_INTERVAL))
+
+class MonitorCost:
+    """The monitor's own average CPU% and wakeups per minute since start().
+
+    Both come from getrusage(), which covers every thread, including ones
+    that have exited. A wakeup is a voluntary context switch: a thread that
+    went to sleep and was woken again.
+    """
+
+    def __init__(self):
+        self.started_at = None
+        self.interval = None
+        self._started = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._started = resource.getrusage(resource.RUSAGE_SELF)
+
+    def sample(self):
+        """Return (average CPU%, wakeups per minute) since start()."""
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        elapsed = max(time.monotonic() - self.started_at, 1e-9)
+        cpu_seconds = usage.ru_utime + usage.ru_stime - self._started.ru_utime - self._started.ru_stime
+        return cpu_seconds / elapsed * 100, (usage.ru_nvcsw - self._started.ru_nvcsw) / elapsed * 60
+
+    def summary(self):
+        cpu_percent, wakeups = self.sample()
+        return (f"Monitor used {cpu_percent:.2f}% CPU on average and woke up {wakeups:.0f} times per minute "
+                f"over {time.monotonic() - self.started_at:.0f} s")
+
+monitor_cost = MonitorCost()
+
+def build_system_info():
+    from rich.text import Text
+    lines = []
+    cpu_model = get_hardware_inventory().cpu_model
+    lines.append(f"{'CPU Model':<25}: {cpu_model}")
+    return Text("\n".join(lines))
+
+def display_system_info(console):
+    console.print(build_system_info())
+
+def build_live_table():
+    # Create a new table
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Component", justify="left")
+    table.add_column("Info", justify="left")
+    table.add_column("Usage", justify="left")
+    table.add_column("Graph", justify="left")
+
+    # Add rows to the table dynamically based on live data
+    cpu_percent, ram_percent, cpu_cores, cpu_threads, gpu_percent, total_ram, cpu_temp_celsius, cpu_temp_fahrenheit, gpu_temperatures, total_storage_gb, used_storage_gb, free_storage_gb, used_storage_percent, sent_mb, recv_mb, active_users, gpu_models = get_usage()
+    overall_cpu_percent = sum(cpu_percent) / len(cpu_percent) if cpu_percent else 0.0
+
+    # Keep the history that the Graph column is drawn from
+    now = time.monotonic()
+    for i, cpu_percent_core in enumerate(cpu_percent):
+        history.record(f"cpu.{i}", cpu_percent_core, now)
+    history.record("cpu", overall_cpu_percent, now)
+    history.record("ram", ram_percent, now)
+    history.record("cpu_temperature", cpu_temp_celsius, now)
+    history.record("storage", used_storage_percent, now)
+    sent_rate = history.record_rate("network.sent", sent_mb, now)
+    recv_rate = history.record_rate("network.recv", recv_mb, now)
+
+    table.add_row("Cores", "", f"{cpu_threads}", "")
+    table.add_row("Overall CPU Usage", f"{overall_cpu_percent:.2f}%", f"[{'█' * int(overall_cpu_percent / 5)}{' ' * (20 - int(overall_cpu_percent / 5))}]", history.sparkline("cpu", 100))
+    for i in range(1, len(cpu_percent) + 1):
+        table.add_row(f"Core {i}", f"{cpu_percent[i-1]:.2f}%", f"[{'█' * int(cpu_percent[i-1] / 5)}{' ' * (20 - int(cpu_percent[i-1] / 5))}]", history.sparkline(f"cpu.{i-1}", 100))
+
+    # The busiest processes, next to the per-core rows
+    processes = collector_scheduler.get("processes") if process_tracker.limit else []
+    if processes:
+        table.add_row("Top Processes", f"by {PROCESS_SORT_LABELS[process_tracker.sort]}", "", "")
+        for pid, name, process_cpu_percent, rss, io_rate in processes:
+            table.add_row(f"  {(name or '?')[:24]} ({pid})", f"{process_cpu_percent:.1f}% CPU", f"{rss / (1024.0 ** 2):.1f} MB RSS", f"{io_rate / (1024.0 ** 2):.2f} MB/s I/O")
+
+    table.add_row("Total RAM", "", f"{total_ram} GB", "")
+    table.add_row("Used RAM", f"{ram_percent:.2f}%", f"[{'█' * int(ram_percent / 5)}{' ' * (20 - int(ram_percent / 5))}]", history.sparkline("ram", 100))
+
+    if cpu_temp_celsius is not None:
+        table.add_row("CPU Temperature", f"{cpu_temp_celsius:.1f}°C / {cpu_temp_fahrenheit:.1f}°F", f"{'█' * int(cpu_temp_celsius / 5)}{' ' * (20 - int(cpu_temp_celsius / 5))}", history.sparkline("cpu_temperature", 100))
+    else:
+        table.add_row("CPU Temperature", "N/A", "", "")
+
+    add_sensor_rows(table, collector_scheduler.get("sensors"))
+
+    table.add_row("Main Storage Usage", f"{used_storage_percent:.2f}%", f"[{'█' * int(used_storage_percent / 5)}{' ' * (20 - int(used_storage_percent / 5))}]", history.sparkline("storage", 100))
+    table.add_row("Total Storage", "", f"{total_storage_gb} GB", "")
+    table.add_row("Used Storage", "", f"{used_storage_gb} GB", "")
+    table.add_row("Available Storage", "", f"{free_storage_gb} GB", "")
+    table.add_row("Network Sent", f"{sent_mb:.2f} MB", f"{sent_rate:.2f} MB/s" if sent_rate is not None else "", history.sparkline("network.sent"))
+    table.add_row("Network Received", f"{recv_mb:.2f} MB", f"{recv_rate:.2f} MB/s" if recv_rate is not None else "", history.sparkline("network.recv"))
+    table.add_row("Active Users", ", ".join(active_users), "", "")
+
+    if monitor_cost.started_at is not None:
+        monitor_cpu_percent, wakeups = monitor_cost.sample()
+        table.add_row("Monitor", f"{monitor_cpu_percent:.2f}% CPU", f"{wakeups:.0f} wakeups/min", f"every {monitor_cost.interval:.1f}s", style="dim")
+
+    stale = collector_scheduler.stale()
+    if stale:
+        table.add_row("Stale Data", ", ".join(f"{name} ({age:.0f}s old)" if age is not None else f"{name} (no data)" for name, age in stale.items()), "", "", style="dim")
+
+    return table
+
+def display_live_graph(console):
+    console.print(build_live_table())
+
+def parse_args():
+    parser = build_parser("Live system monitor for the Raspberry Pi", "re-probe CPU/RAM/sensor details every N seconds (default: only on SIGHUP)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="sample less often while the metrics are stable, down to one sample per --max-interval, "
+                             "and every --interval while they change quickly or run hot")
+    parser.add_argument("--max-interval", type=float, default=ADAPTIVE_MAX_INTERVAL,
+                        help=f"longest --adaptive interval in seconds (default: {ADAPTIVE_MAX_INTERVAL:g})")
+    parser.add_argument("--low-power", action="store_true",
+                        help=f"adaptive sampling every {LOW_POWER_INTERVAL:g} to {LOW_POWER_MAX_INTERVAL:g} s, at most "
+                             f"{LOW_POWER_MAX_FPS:g} frame per second, the procfs backend and no process table")
+    add_export_arguments(parser, COLLECTOR_BACKENDS)
+    return parse_monitor_args(parser)
+
+def draw(console, args):
+    # The live table, with --adaptive stretching the sampling interval while the Pi is quiet or nobody watches
+    module = sys.modules[__name__]
+    monitor_cost.interval = args.interval
+    adaptive = AdaptiveInterval(args.interval, args.max_interval) if args.adaptive else None
+
+    def retune(now, visible):
+        interval = monitor_cost.interval = adaptive.observe(adaptive_metrics(), now, watched=visible)
+        set_sampling_interval(interval)
+        return interval
+    render_live_graph(module, console, args.interval, args.max_fps, args.frame_stats, args.profile is not None,
+                      retune if adaptive is not None else None)
+
+def main():
+    args = parse_args()
+    console = open_console(args)
+    module = sys.modules[__name__]
+    if run_tool(module, args, console):
+        return
+    if args.low_power:
+        args.adaptive = True
+        args.interval = max(args.interval, LOW_POWER_INTERVAL)
+        args.max_interval = max(args.max_interval, LOW_POWER_MAX_INTERVAL)
+        args.max_fps = min(args.max_fps, LOW_POWER_MAX_FPS)
+        args.backend, args.top_processes = "procfs", 0
+    with running_collectors(module, args, console, (procfs_reader.close, sensor_monitor.close)):
+        monitor_cost.start()
+        try:
+            run_mode(module, args, lambda: draw(console, args))
+        finally:
+            report(console, monitor_cost.summary())
+
+if __name__ == "__main__":
+    main()
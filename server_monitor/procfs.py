@@ -0,0 +1,411 @@
+"""Readers for the Linux kernel interfaces, shared by the Linux and Pi backends.
+
+Files under /proc and /sys are found once and then re-read through
+descriptors kept open between ticks. Everything is resolved against
+PROC_ROOT and SYS_ROOT at call time, so the backends and the benchmark
+suite only ever change them here. The --backend collector sets and the
+Sensors rows of the live table are built here as well.
+"""
+
+import errno
+import glob
+import heapq
+import os
+import threading
+import tracemalloc
+from collections import namedtuple
+import time
+
+from .core import get_cpu_usage, get_network_usage, get_ram_usage
+
+# Roots of the kernel interfaces read directly; the benchmark suite points them at fixture trees
+PROC_ROOT = "/proc"
+SYS_ROOT = "/sys"
+
+# hwmon chips that measure the CPU itself; Core/Tccd labels are per core or per CCD, the rest are package-wide.
+# bcm2835_thermal is the SoC's thermal zone on older Raspberry Pi kernels, which have no hwmon chip for it.
+CPU_SENSOR_CHIPS = frozenset({"coretemp", "k10temp", "zenpower", "cpu_thermal", "soc_thermal", "bcm2835_thermal"})
+CORE_SENSOR_LABELS = ("Core ", "Tccd")
+# Thermal zones that repeat an hwmon chip under another name
+THERMAL_ZONE_CHIPS = {"x86_pkg_temp": "coretemp", "cpu-thermal": "cpu_thermal", "soc-thermal": "soc_thermal"}
+SENSOR_RESCAN_INTERVAL = 30.0
+
+Sensor = namedtuple("Sensor", ["kind", "chip", "label", "path", "scale"])
+
+def _sysfs_index(path):
+    # hwmon10 after hwmon9, temp10_input after temp9_input
+    digits = "".join(character for character in os.path.basename(path) if character.isdigit())
+    return int(digits) if digits else -1
+
+def _read_sysfs_text(path):
+    try:
+        with open(path, 'r') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+def classify_sensor(chip, label, attribute):
+    """Return "package", "core", "nvme", "fan" or "other" for one hwmon input."""
+    if attribute.startswith("fan"):
+        return "fan"
+    if chip in CPU_SENSOR_CHIPS:
+        return "core" if label.startswith(CORE_SENSOR_LABELS) else "package"
+    if chip == "nvme":
+        return "nvme"
+    return "other"
+
+def discover_sensors():
+    """Return a Sensor for every hwmon temperature and fan input, then for each thermal zone hwmon does not cover."""
+    sensors = []
+    chips = set()
+    for hwmon in sorted(glob.glob(os.path.join(SYS_ROOT, "class/hwmon/hwmon*")), key=_sysfs_index):
+        name = _read_sysfs_text(os.path.join(hwmon, "name"))
+        if not name:
+            continue
+        chips.add(name)
+        # Every NVMe drive registers a chip called "nvme"; the controller name tells them apart
+        chip = os.path.basename(os.path.realpath(os.path.join(hwmon, "device"))) if name == "nvme" else name
+        for kind in ("temp", "fan"):
+            for path in sorted(glob.glob(os.path.join(hwmon, f"{kind}*_input")), key=_sysfs_index):
+                attribute = os.path.basename(path)[:-len("_input")]
+                label = _read_sysfs_text(os.path.join(hwmon, f"{attribute}_label")) or attribute
+                sensors.append(Sensor(classify_sensor(name, label, attribute), chip, label, path, 1.0 if kind == "fan" else 1000.0))
+    for zone in sorted(glob.glob(os.path.join(SYS_ROOT, "class/thermal/thermal_zone*")), key=_sysfs_index):
+        zone_type = _read_sysfs_text(os.path.join(zone, "type")) or os.path.basename(zone)
+        chip = THERMAL_ZONE_CHIPS.get(zone_type, zone_type)
+        if chip in chips or not os.path.exists(os.path.join(zone, "temp")):
+            continue
+        sensors.append(Sensor(classify_sensor(chip, zone_type, "temp"), zone_type, os.path.basename(zone), os.path.join(zone, "temp"), 1000.0))
+    return sensors
+
+def get_cpu_info():
+    try:
+        cpu_info = os.popen("lscpu | grep 'Model name'").read().strip().split(":")[1].strip()
+        return cpu_info
+    except Exception as e:
+        print(f"Error getting CPU information: {e}")
+        return "N/A"
+
+def get_cpu_sensor_paths():
+    # The CPU inputs, package sensors first: get_cpu_temperature reports the first one
+    try:
+        sensors = [sensor for sensor in discover_sensors() if sensor.kind in ("package", "core")]
+        return tuple(sensor.path for sensor in sorted(sensors, key=lambda sensor: sensor.kind != "package"))
+    except Exception as e:
+        print(f"Error discovering CPU temperature sensors: {e}")
+    return ()
+
+class SensorMonitor:
+    """Every temperature and fan sensor, found once and then read from cached paths.
+
+    discover_sensors() walks hwmon and the thermal zones with their labels;
+    after that, sample() only reads the resolved *_input files, through
+    descriptors kept open between ticks. The sensors are discovered again
+    when a file disappears (a hot-unplugged NVMe drive), when the hwmon or
+    thermal directory listing changes (checked every `rescan_interval`
+    seconds, which picks up a driver loaded later), and when the hardware
+    inventory returned by `inventory` is re-probed on SIGHUP or
+    --inventory-interval.
+    """
+
+    def __init__(self, inventory, rescan_interval=SENSOR_RESCAN_INTERVAL):
+        self.inventory = inventory
+        self.rescan_interval = rescan_interval
+        self.sensors = None
+        self._fds = {}
+        self._listing = None
+        self._checked_at = 0.0
+        self._inventory_at = None
+
+    def _list_devices(self):
+        listing = []
+        for directory in ("class/hwmon", "class/thermal"):
+            try:
+                listing.append(sorted(os.listdir(os.path.join(SYS_ROOT, directory))))
+            except OSError:
+                listing.append(None)
+        return listing
+
+    def discover(self):
+        self.close()
+        self._listing = self._list_devices()
+        self._checked_at = time.monotonic()
+        self.sensors = discover_sensors()
+        return self.sensors
+
+    def sample(self):
+        """Return [(kind, chip, label, value)]: °C for temperatures, RPM for fans, None if unreadable."""
+        try:
+            return self._sample()
+        except Exception as e:
+            print(f"Error reading sensors: {e}")
+            return []
+
+    def _sample(self):
+        now = time.monotonic()
+        inventory_at = self.inventory().collected_at
+        if self.sensors is None or inventory_at != self._inventory_at:
+            self._inventory_at = inventory_at
+            self.discover()
+        elif now - self._checked_at >= self.rescan_interval:
+            self._checked_at = now
+            if self._list_devices() != self._listing:
+                self.discover()
+        readings = []
+        vanished = False
+        for sensor in self.sensors:
+            try:
+                fd = self._fds.get(sensor.path)
+                if fd is None:
+                    fd = self._fds[sensor.path] = os.open(sensor.path, os.O_RDONLY)
+                value = int(os.pread(fd, 32, 0)) / sensor.scale
+            except FileNotFoundError:
+                vanished, value = True, None
+            except OSError as e:
+                # ENODEV: the device went away under an open descriptor; anything else (ENODATA, EIO) is a sensor with no reading right now
+                vanished, value = vanished or e.errno == errno.ENODEV, None
+            except ValueError:
+                value = None
+            readings.append((sensor.kind, sensor.chip, sensor.label, value))
+        if vanished:
+            self.sensors = None
+        return readings
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+# Temperatures that are neither CPU nor NVMe: only the hottest few get a row
+SENSOR_OTHER_ROWS = 4
+
+def add_sensor_rows(table, readings):
+    """Add the Sensors rows for SensorMonitor.sample() readings to a live table."""
+    # Every package and drive sensor, the cores summed up in one row, spinning fans and the hottest of the rest
+    sensors = [reading for reading in readings if reading[3] is not None]
+    if not sensors:
+        return
+    temperatures = [reading for reading in sensors if reading[0] != "fan"]
+    fans = [reading for reading in sensors if reading[0] == "fan"]
+    spinning = [reading for reading in fans if reading[3] > 0]
+    table.add_row("Sensors", f"{len(temperatures)} temperatures", f"{len(spinning)} of {len(fans)} fans spinning" if fans else "", "")
+    cores = [value for kind, chip, label, value in temperatures if kind == "core"]
+    others = heapq.nlargest(SENSOR_OTHER_ROWS, (reading for reading in temperatures if reading[0] == "other"), key=lambda reading: reading[3])
+    for kind, chip, label, value in temperatures:
+        if kind in ("package", "nvme"):
+            table.add_row(f"  {chip} {label}", f"{value:.1f}°C", f"{'█' * int(value / 5)}{' ' * (20 - int(value / 5))}", "")
+    if cores:
+        hottest = max(cores)
+        table.add_row(f"  CPU Cores ({len(cores)})", f"{hottest:.1f}°C max", f"{'█' * int(hottest / 5)}{' ' * (20 - int(hottest / 5))}", f"{sum(cores) / len(cores):.1f}°C avg")
+    for kind, chip, label, value in others:
+        table.add_row(f"  {chip} {label}", f"{value:.1f}°C", f"{'█' * int(value / 5)}{' ' * (20 - int(value / 5))}", "", style="dim")
+    for kind, chip, label, value in spinning:
+        table.add_row(f"  {chip} {label}", f"{value:.0f} RPM", "", "")
+
+PROCFS_BUFFER_SIZE = 16384
+
+class ProcfsReader:
+    """Low-overhead Linux backend that reads /proc and /sys directly.
+
+    Every file is opened once and re-read with os.preadv into a buffer that
+    is reused between ticks, and only the fields get_usage needs are parsed.
+    The values match what the psutil-based collectors return.
+    """
+
+    def __init__(self):
+        self._files = {}
+        self._open_lock = threading.Lock()
+        self._previous_cpu_times = None
+
+    def close(self):
+        for fd, buffer in self._files.values():
+            os.close(fd)
+        self._files.clear()
+
+    def read(self, path):
+        """Return (buffer, length) holding the current contents of path."""
+        entry = self._files.get(path)
+        if entry is None:
+            with self._open_lock:
+                entry = self._files.get(path)
+                if entry is None:
+                    entry = self._files[path] = [os.open(path, os.O_RDONLY), bytearray(PROCFS_BUFFER_SIZE)]
+        fd, buffer = entry
+        length = os.preadv(fd, [buffer], 0)
+        while length == len(buffer):
+            # Did not fit (e.g. /proc/stat on a very large host): grow once and keep the bigger buffer
+            buffer = entry[1] = bytearray(len(buffer) * 2)
+            length = os.preadv(fd, [buffer], 0)
+        return buffer, length
+
+    def cpu_times(self):
+        # Per-CPU (busy, total) jiffies, computed the way psutil.cpu_percent does
+        buffer, length = self.read(f"{PROC_ROOT}/stat")
+        end = buffer.find(b"\nintr", 0, length)
+        times = []
+        for line in buffer[:end if end != -1 else length].split(b"\n")[1:]:
+            if not line.startswith(b"cpu"):
+                break
+            fields = [int(field) for field in line.split()[1:]]
+            # guest time is already included in user/nice
+            total = sum(fields) - sum(fields[8:10])
+            times.append((total - fields[3] - fields[4], total))
+        return times
+
+    def cpu_percent(self):
+        times = self.cpu_times()
+        previous, self._previous_cpu_times = self._previous_cpu_times, times
+        if previous is None or len(previous) != len(times):
+            return [0.0] * len(times)
+        percent = []
+        for (busy, total), (previous_busy, previous_total) in zip(times, previous):
+            total_delta = total - previous_total
+            value = (busy - previous_busy) / total_delta * 100 if total_delta > 0 else 0.0
+            percent.append(round(min(100.0, max(0.0, value)), 1))
+        return percent
+
+    def memory_percent(self):
+        buffer, length = self.read(f"{PROC_ROOT}/meminfo")
+        total = self._meminfo_field(buffer, length, b"MemTotal:")
+        available = self._meminfo_field(buffer, length, b"MemAvailable:")
+        return round((total - available) / total * 100, 1)
+
+    def _meminfo_field(self, buffer, length, name):
+        start = buffer.find(name, 0, length) + len(name)
+        return int(buffer[start:buffer.find(b"kB", start, length)]) * 1024
+
+    def network_bytes(self):
+        # (bytes_sent, bytes_recv) summed over every interface, like psutil.net_io_counters()
+        buffer, length = self.read(f"{PROC_ROOT}/net/dev")
+        sent = recv = 0
+        for line in buffer[:length].split(b"\n")[2:]:
+            if not line:
+                continue
+            fields = line.split(b":", 1)[1].split()
+            recv += int(fields[0])
+            sent += int(fields[8])
+        return sent, recv
+
+    def temperature(self, path):
+        buffer, length = self.read(path)
+        return int(buffer[:length]) / 1000.0
+
+def collector_backends(reader, inventory):
+    """Return the collectors that have an alternative implementation, per --backend.
+
+    The procfs set reads through `reader`, a ProcfsReader; both read the
+    CPU temperature, in °C, from the first sensor in the hardware
+    inventory returned by `inventory`.
+    """
+    def get_cpu_temperature():
+        sensor_paths = inventory().sensor_paths
+        if not sensor_paths:
+            return None
+        try:
+            with open(sensor_paths[0], 'r') as file:
+                return int(file.read()) / 1000.0
+        except (OSError, ValueError) as e:
+            # Gone (ENODEV), no reading right now (EIO, ENODATA) or garbled: no value this tick, like the other collectors
+            print(f"Error getting CPU temperature: {e}")
+            return None
+
+    def get_cpu_usage_procfs():
+        try:
+            return reader.cpu_percent()
+        except Exception as e:
+            print(f"Error getting CPU usage: {e}")
+            return []
+
+    def get_ram_usage_procfs():
+        try:
+            return reader.memory_percent()
+        except Exception as e:
+            print(f"Error getting RAM usage: {e}")
+            return 0
+
+    def get_cpu_temperature_procfs():
+        sensor_paths = inventory().sensor_paths
+        if not sensor_paths:
+            return None
+        try:
+            return reader.temperature(sensor_paths[0])
+        except (OSError, ValueError) as e:
+            print(f"Error getting CPU temperature: {e}")
+            return None
+
+    def get_network_usage_procfs():
+        try:
+            return reader.network_bytes()
+        except Exception as e:
+            print(f"Error getting network usage: {e}")
+            return 0, 0
+
+    return {
+        "psutil": {"cpu": get_cpu_usage, "ram": get_ram_usage, "cpu_temperature": get_cpu_temperature, "network": get_network_usage},
+        "procfs": {"cpu": get_cpu_usage_procfs, "ram": get_ram_usage_procfs, "cpu_temperature": get_cpu_temperature_procfs, "network": get_network_usage_procfs},
+    }
+
+def _flatten(value):
+    if isinstance(value, (list, tuple)):
+        return [item for element in value for item in _flatten(element)]
+    return [value]
+
+def check_backends(console, backends, delay=1.0):
+    """Cross-check the procfs backend against psutil. Returns True when they agree."""
+    from rich.table import Table
+    # Network counters are in bytes: traffic between the two reads may differ by up to 100 KiB
+    tolerances = {"cpu": 5.0, "ram": 0.5, "cpu_temperature": 1.0, "network": 100 * 1024}
+    psutil_backend, procfs_backend = backends["psutil"], backends["procfs"]
+    # cpu_percent is a delta: prime both backends, then sample them over the same interval
+    psutil_backend["cpu"]()
+    procfs_backend["cpu"]()
+    time.sleep(delay)
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Metric", justify="left")
+    table.add_column("psutil", justify="left")
+    table.add_column("procfs", justify="left")
+    table.add_column("Result", justify="left")
+    all_match = True
+    for name, tolerance in tolerances.items():
+        expected, actual = psutil_backend[name](), procfs_backend[name]()
+        expected_values, actual_values = _flatten(expected), _flatten(actual)
+        matches = len(expected_values) == len(actual_values) and all(
+            a == b if a is None or b is None else abs(a - b) <= tolerance
+            for a, b in zip(expected_values, actual_values))
+        all_match = all_match and matches
+        table.add_row(name, str(expected), str(actual), "[green]OK[/green]" if matches else f"[red]differs by more than {tolerance}[/red]")
+    console.print(table)
+    return all_match
+
+def benchmark_backends(console, backends, ticks=1000):
+    """Time one tick of every collector that has a procfs implementation, for each backend."""
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Backend", justify="left")
+    table.add_column("CPU time / tick", justify="right")
+    table.add_column("Wall time / tick", justify="right")
+    table.add_column("Peak allocated / tick", justify="right")
+    for backend, collectors in backends.items():
+        collectors = list(collectors.values())
+        for collector in collectors:
+            collector()  # warm up: open files, prime the CPU deltas
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for _ in range(ticks):
+            for collector in collectors:
+                collector()
+        cpu_time = (time.process_time() - cpu_started) / ticks
+        wall_time = (time.perf_counter() - wall_started) / ticks
+        # tracemalloc slows everything down, so allocations are measured in a separate pass
+        traced_ticks = min(ticks, 200)
+        peak_total = 0
+        tracemalloc.start()
+        for _ in range(traced_ticks):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            for collector in collectors:
+                collector()
+            peak_total += tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        table.add_row(backend, f"{cpu_time * 1e6:.1f} µs", f"{wall_time * 1e6:.1f} µs",
+                      f"{peak_total / traced_ticks / 1024:.1f} KiB")
+    console.print(table)
@@ -0,0 +1,312 @@
+"""The network modes: the Prometheus exporter and the fleet agent and aggregator.
+
+asyncio and http.server are slow to import, so the backends only import
+this module when --serve, --agent or --aggregate asks for it.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import socket
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+import uuid
+
+from .formats import (
+    FLEET_HEADER, FLEET_HELLO, FLEET_HIGH_WATER, FLEET_MAX_FRAME, FLEET_PORT, FleetEncoder, FleetHost, fleet_frame,
+)
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment instead of waiting on delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.exporter.payload()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # One line per scrape would flood the terminal
+        pass
+
+class MetricsExporter:
+    """Headless HTTP endpoint serving the latest sample in Prometheus format.
+
+    A single publisher calls `render` (the backend's get_usage() in text
+    format) once per interval; every scrape only writes out those cached
+    bytes, so adding scrapers does not add probes.
+    """
+
+    def __init__(self, render, host="127.0.0.1", port=9100, interval=1.0):
+        self.render = render
+        self.interval = interval
+        self.publish_count = 0
+        self._payload = b""
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        self._thread = None
+
+    def payload(self):
+        with self._lock:
+            return self._payload
+
+    def publish(self):
+        payload = self.render().encode("utf-8")
+        with self._lock:
+            self._payload = payload
+        self.publish_count += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run(self):
+        """Publish a fresh snapshot every interval until interrupted."""
+        self.start()
+        try:
+            while True:
+                started = time.monotonic()
+                self.publish()
+                time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+def benchmark_scrapes(console, render, scrapes=5000, clients=8):
+    """Measure how many scrapes per second the exporter serves on localhost."""
+    exporter = MetricsExporter(render, "127.0.0.1", 0)
+    exporter.publish()
+    exporter.start()
+    host, port = exporter.server.server_address[:2]
+    per_client = max(1, scrapes // clients)
+
+    def scrape():
+        connection = http.client.HTTPConnection(host, port)
+        for _ in range(per_client):
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+        connection.close()
+
+    threads = [threading.Thread(target=scrape) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    exporter.stop()
+    total = per_client * clients
+    console.print(f"{total} scrapes from {clients} keep-alive clients in {elapsed:.2f} s: "
+                  f"{total / elapsed:.0f} scrapes/s, {len(exporter.payload())} bytes each, "
+                  f"{exporter.publish_count} snapshot(s) serialized")
+
+# Where an agent keeps its id when the host has no machine-id
+AGENT_ID_PATH = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "server-monitor", "agent-id")
+
+def get_agent_id(path=AGENT_ID_PATH):
+    """Stable id of this host for the fleet aggregator, or None.
+
+    Derived from the systemd machine-id, hashed so the id itself is not sent
+    (see machine-id(5)); otherwise a random UUID saved to `path` on first
+    run. None when neither can be had, and the aggregator uses the address.
+    """
+    for machine_id_path in ("/etc/machine-id", "/var/lib/dbus/machine-id"):
+        try:
+            with open(machine_id_path) as f:
+                machine_id = f.read().strip()
+        except OSError:
+            continue
+        if machine_id:
+            return hmac.new(machine_id.encode(), b"server-monitor fleet agent", hashlib.sha256).hexdigest()[:32]
+    try:
+        with open(path) as f:
+            agent_id = f.read().strip()
+        if agent_id:
+            return agent_id
+    except OSError:
+        pass
+    agent_id = uuid.uuid4().hex
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(agent_id + "\n")
+    except OSError:
+        return None
+    return agent_id
+
+class FleetAgent:
+    """Pushes this host's samples to a fleet aggregator over TCP.
+
+    Only the fields that changed since the last frame are sent. When the link
+    or the aggregator falls behind, ticks are coalesced into the next delta
+    instead of being queued, and a dropped connection is retried with backoff.
+    """
+
+    def __init__(self, host, sample, port=FLEET_PORT, interval=1.0, hostname=None, platform=None, max_backoff=30.0, agent_id=None):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.hostname = hostname or socket.gethostname()
+        self.agent_id = agent_id or get_agent_id()
+        self.platform = platform
+        self.sample = sample
+        self.max_backoff = max_backoff
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.ticks_skipped = 0
+        self.connections = 0
+
+    async def run(self):
+        backoff = 1.0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+            backoff = 1.0
+            self.connections += 1
+            try:
+                await self._stream(writer)
+            except (OSError, asyncio.TimeoutError):
+                pass
+            finally:
+                writer.close()
+
+    async def _stream(self, writer):
+        encoder = FleetEncoder()
+        writer.write(fleet_frame(FLEET_HELLO, json.dumps({"agent_id": self.agent_id, "hostname": self.hostname, "platform": self.platform}).encode()))
+        while True:
+            started = time.monotonic()
+            if writer.transport.is_closing():
+                raise ConnectionResetError("aggregator closed the connection")
+            if writer.transport.get_write_buffer_size() < FLEET_HIGH_WATER:
+                values, meta = self.sample()
+                data = encoder.encode(values, meta, time.time())
+                writer.write(data)
+                self.frames_sent += 1
+                self.bytes_sent += len(data)
+                await asyncio.wait_for(writer.drain(), timeout=max(10.0, 5 * self.interval))
+            else:
+                self.ticks_skipped += 1
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+class FleetAggregator:
+    """asyncio TCP server collecting the latest state of every fleet agent.
+
+    The event loop runs in a background thread so the renderer can keep its
+    own pace; host state is only mutated under the lock. A slow aggregator
+    simply stops reading, and TCP flow control makes agents coalesce ticks.
+    Hosts are keyed by the agent id sent in HELLO, or the agent's address
+    when it sent none, and by platform, so a Linux and a Pi agent on one
+    machine are two hosts; the hostname is only a label, since many Pis are
+    all called raspberrypi. A second connection for the same key takes
+    the host over and the first is closed: it is usually the same agent
+    reconnecting before its old connection was noticed to be dead.
+    """
+
+    def __init__(self, host="0.0.0.0", port=FLEET_PORT):
+        self.host = host
+        self.port = port
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.loop = None
+        self.server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    async def _handle(self, reader, writer):
+        host = None
+        try:
+            while True:
+                length, frame_type = FLEET_HEADER.unpack(await reader.readexactly(FLEET_HEADER.size))
+                if length > FLEET_MAX_FRAME:
+                    raise ValueError(f"frame of {length} bytes is too large")
+                payload = await reader.readexactly(length)
+                if host is None:
+                    if frame_type != FLEET_HELLO:
+                        raise ValueError("agent did not start with HELLO")
+                    hello = json.loads(payload)
+                    peer = writer.get_extra_info("peername")
+                    address = peer[0] if peer else "?"
+                    key = (hello.get("agent_id") or address, hello.get("platform", "?"))
+                    with self.lock:
+                        host = self.hosts.get(key)
+                        if host is None:
+                            host = self.hosts[key] = FleetHost(key, hello["hostname"], key[1], address)
+                        elif host.connection is not None:
+                            host.connection.close()
+                        host.hostname, host.address = hello["hostname"], address
+                        host.connection = writer
+                        host.connected = True
+                        # A reconnecting agent sends a fresh schema and then every value, so forget the old ones
+                        host.fields = []
+                        host.values = {}
+                    continue
+                with self.lock:
+                    if host.connection is not writer:
+                        # Taken over by a newer connection; its field indexes are not ours
+                        break
+                    host.apply(frame_type, payload)
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError, ValueError, IndexError, KeyError, struct.error):
+            pass
+        finally:
+            if host is not None:
+                with self.lock:
+                    if host.connection is writer:
+                        host.connection = None
+                        host.connected = False
+            writer.close()
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def start(self):
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), name="fleet-aggregator", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    def thread_time(self):
+        """CPU seconds used by the aggregator's event loop thread."""
+        return asyncio.run_coroutine_threadsafe(self._thread_time(), self.loop).result(timeout=5)
+
+    async def _thread_time(self):
+        return time.thread_time()
+
+    def snapshot(self):
+        with self.lock:
+            return [(host.key, host.hostname, host.platform, host.address, host.connected, host.last_seen, dict(host.values), dict(host.meta))
+                    for host in self.hosts.values()]
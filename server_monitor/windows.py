@@ -0,0 +1,275 @@
+import os
+import psutil
+import sys
+import threading
+from collections import namedtuple
+import time
+
+from .core import (
+    PROCESS_SCAN_INTERVAL, PROCESS_SORT_LABELS, SLOW_COLLECTOR_INTERVAL,
+    CollectorScheduler, HistoryStore, InventoryCache, ProcessTracker, Profiler,
+    build_parser, get_active_users, get_cpu_usage, get_network_usage, get_ram_usage, get_total_ram, render_live_graph,
+)
+from .gpu import GpuMonitor
+
+PLATFORM = "windows"
+
+OHM_NAMESPACE = r"root\OpenHardwareMonitor"
+
+def get_cpu_info():
+    try:
+        cpu_info = os.popen("wmic cpu get caption").read().strip().split("\n")[1].strip()
+        core_count = psutil.cpu_count(logical=False)
+        return f"{cpu_info} (Cores: {core_count})"
+    except Exception as e:
+        print(f"Error getting CPU information: {e}")
+        return "N/A"
+
+gpu_monitor = GpuMonitor()
+
+def get_gpu_info():
+    try:
+        return ", ".join(sample["name"] for sample in gpu_monitor.samples()) or "N/A"
+    except Exception as e:
+        print(f"Error getting GPU information: {e}")
+        return "N/A"
+
+def get_gpu_usage():
+    # The first GPU, as the display has a single GPU row
+    try:
+        samples = gpu_monitor.samples()
+        return (samples[0]["utilization.gpu"] or 0.0) if samples else 0.0
+    except Exception as e:
+        print(f"Error getting GPU usage: {e}")
+        return 0.0
+
+# COM objects belong to the thread that created them, so every collector
+# thread keeps its own connection instead of sharing one
+_wmi_connections = threading.local()
+
+def get_ohm_connection():
+    """Return this thread's WMI connection to OpenHardwareMonitor, made on first use."""
+    connection = getattr(_wmi_connections, "ohm", None)
+    if connection is None:
+        import wmi
+        connection = _wmi_connections.ohm = wmi.WMI(namespace=OHM_NAMESPACE)
+    return connection
+
+def get_cpu_temperature():
+    try:
+        # Filtered by WMI, so only the temperature sensors are marshalled over COM
+        for sensor in get_ohm_connection().Sensor(SensorType="Temperature"):
+            if "cpu" in sensor.Name.lower():
+                return float(sensor.Value)
+        return None  # temperature not found
+    except Exception as e:
+        # OpenHardwareMonitor may have been restarted: connect again on the next call
+        _wmi_connections.ohm = None
+        print(f"Error getting CPU temperature: {e}")
+        return None
+
+def get_gpu_temperature():
+    try:
+        samples = gpu_monitor.samples()
+        return samples[0]["temperature.gpu"] if samples else None
+    except Exception as e:
+        print(f"Error getting GPU temperature: {e}")
+        return None
+
+def get_storage_info():
+    try:
+        partitions = psutil.disk_partitions(all=True)  # Include all partitions including network drives
+        storage_info = []
+        for partition in partitions:
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+                total_gb = round(usage.total / (1024.0 ** 3), 2)
+                used_gb = round(usage.used / (1024.0 ** 3), 2)
+                free_gb = round(usage.free / (1024.0 ** 3), 2)
+                used_percent = usage.percent
+                storage_info.append((partition.device, partition.device.split(":")[0], total_gb, used_gb, free_gb, used_percent))
+            except Exception as e:
+                print(f"Error getting usage information for partition {partition.device}: {e}")
+        return storage_info
+    except Exception as e:
+        print(f"Error getting storage information: {e}")
+        return []
+
+# Details that do not change while the machine is running. They are probed
+# once and only re-probed every --inventory-interval seconds.
+HardwareInventory = namedtuple("HardwareInventory", [
+    "cpu_model", "total_ram", "gpu_model", "collected_at",
+])
+
+def collect_hardware_inventory():
+    return HardwareInventory(
+        cpu_model=get_cpu_info(),
+        total_ram=get_total_ram(),
+        gpu_model=get_gpu_info(),
+        collected_at=time.monotonic(),
+    )
+
+hardware_inventory = InventoryCache(collect_hardware_inventory)
+get_hardware_inventory = hardware_inventory.get
+
+process_tracker = ProcessTracker()
+
+def init_collector_thread():
+    # WMI is COM based, and every thread that uses it has to initialise COM first
+    import pythoncom
+    pythoncom.CoInitialize()
+
+collector_scheduler = CollectorScheduler(initializer=init_collector_thread)
+
+def register_collectors(interval=1.0):
+    collector_scheduler.register("cpu", get_cpu_usage, interval, default=[])
+    collector_scheduler.register("ram", get_ram_usage, interval, default=0)
+    collector_scheduler.register("gpu_usage", get_gpu_usage, interval, default=0.0)
+    collector_scheduler.register("gpu_temperature", get_gpu_temperature, max(interval, 2.0), default=None)
+    collector_scheduler.register("cpu_temperature", get_cpu_temperature, max(interval, 2.0), default=None)
+    collector_scheduler.register("network", get_network_usage, interval, default=(0, 0))
+    collector_scheduler.register("storage", get_storage_info, SLOW_COLLECTOR_INTERVAL, timeout=10.0, default=[])
+    collector_scheduler.register("users", get_active_users, SLOW_COLLECTOR_INTERVAL, default=[])
+    collector_scheduler.register("processes", process_tracker.sample, max(interval, PROCESS_SCAN_INTERVAL), default=[])
+
+register_collectors()
+
+def get_usage():
+    try:
+        cpu_percent = collector_scheduler.get("cpu")
+        ram_percent = collector_scheduler.get("ram")
+        gpu_percent = collector_scheduler.get("gpu_usage")
+        total_ram = round(get_hardware_inventory().total_ram / (1024.0 ** 3), 2)
+        cpu_temp_celsius = collector_scheduler.get("cpu_temperature")
+        gpu_temp_celsius = collector_scheduler.get("gpu_temperature")
+        storage_info = collector_scheduler.get("storage")
+        bytes_sent, bytes_recv = collector_scheduler.get("network")
+        sent_mb, recv_mb = round(bytes_sent / (1024.0 ** 2), 2), round(bytes_recv / (1024.0 ** 2), 2)
+        active_users = collector_scheduler.get("users")
+        return cpu_percent, ram_percent, gpu_percent, total_ram, cpu_temp_celsius, gpu_temp_celsius, storage_info, sent_mb, recv_mb, active_users
+    except Exception as e:
+        print(f"Error getting system usage: {e}")
+        return [], 0, 0, 0, None, None, [], 0, 0, []
+
+history = HistoryStore()
+
+profiler = Profiler()
+
+def build_system_info():
+    from rich.text import Text
+    lines = []
+    inventory = get_hardware_inventory()
+    cpu_model = inventory.cpu_model
+    gpu_model = inventory.gpu_model
+    lines.append(f"{'CPU Model':<25}: {cpu_model}")
+    lines.append(f"{'GPU Model':<25}: {gpu_model}")
+    return Text("\n".join(lines))
+
+def display_system_info(console):
+    console.print(build_system_info())
+
+def build_live_table():
+    # Create a new table
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta")
+    table.add_column("Component", justify="left")
+    table.add_column("Info", justify="left")
+    table.add_column("Usage", justify="left")
+    table.add_column("Graph", justify="left")
+
+    # Add rows to the table dynamically based on live data
+    cpu_percent, ram_percent, gpu_percent, total_ram, cpu_temp_celsius, gpu_temp_celsius, storage_info, sent_mb, recv_mb, active_users = get_usage()
+    overall_cpu_percent = sum(cpu_percent) / len(cpu_percent) if cpu_percent else 0.0
+
+    # Keep the history that the Graph column is drawn from
+    now = time.monotonic()
+    for i, cpu_percent_core in enumerate(cpu_percent):
+        history.record(f"cpu.{i}", cpu_percent_core, now)
+    history.record("cpu", overall_cpu_percent, now)
+    history.record("gpu.usage", gpu_percent, now)
+    history.record("ram", ram_percent, now)
+    history.record("cpu_temperature", cpu_temp_celsius, now)
+    history.record("gpu_temperature", gpu_temp_celsius, now)
+    for device, partition_name, total, used, free, percent in storage_info:
+        history.record(f"storage.{device}", percent, now)
+    sent_rate = history.record_rate("network.sent", sent_mb, now)
+    recv_rate = history.record_rate("network.recv", recv_mb, now)
+
+    table.add_row("Cores", "", f"{len(cpu_percent)}", "")
+    table.add_row("Overall CPU Usage", f"{overall_cpu_percent:.2f}%", f"[{'█' * int(overall_cpu_percent / 5)}{' ' * (20 - int(overall_cpu_percent / 5))}]", history.sparkline("cpu", 100))
+    for i in range(1, len(cpu_percent) + 1):
+        table.add_row(f"Core {i}", f"{cpu_percent[i-1]:.2f}%", f"[{'█' * int(cpu_percent[i-1] / 5)}{' ' * (20 - int(cpu_percent[i-1] / 5))}]", history.sparkline(f"cpu.{i-1}", 100))
+
+    # The busiest processes, next to the per-core rows
+    processes = collector_scheduler.get("processes") if process_tracker.limit else []
+    if processes:
+        table.add_row("Top Processes", f"by {PROCESS_SORT_LABELS[process_tracker.sort]}", "", "")
+        for pid, name, process_cpu_percent, rss, io_rate in processes:
+            table.add_row(f"  {(name or '?')[:24]} ({pid})", f"{process_cpu_percent:.1f}% CPU", f"{rss / (1024.0 ** 2):.1f} MB RSS", f"{io_rate / (1024.0 ** 2):.2f} MB/s I/O")
+    
+    table.add_row("GPU Model", "", get_hardware_inventory().gpu_model, "")
+    table.add_row("GPU Usage", f"{gpu_percent:.2f}%", f"[{'█' * int(gpu_percent / 5)}{' ' * (20 - int(gpu_percent / 5))}]", history.sparkline("gpu.usage", 100))
+    table.add_row("Total RAM", "", f"{total_ram} GB", "")
+    table.add_row("Used RAM", f"{ram_percent:.2f}%", f"[{'█' * int(ram_percent / 5)}{' ' * (20 - int(ram_percent / 5))}]", history.sparkline("ram", 100))
+
+    if cpu_temp_celsius is not None:
+        table.add_row("CPU Temperature", f"{cpu_temp_celsius:.1f}°C", f"{'█' * int(cpu_temp_celsius / 5)}{' ' * (20 - int(cpu_temp_celsius / 5))}", history.sparkline("cpu_temperature", 100))
+    else:
+        table.add_row("CPU Temperature", "N/A", "", "")
+
+    if gpu_temp_celsius is not None:
+        table.add_row("GPU Temperature", f"{gpu_temp_celsius:.1f}°C", f"{'█' * int(gpu_temp_celsius / 5)}{' ' * (20 - int(gpu_temp_celsius / 5))}", history.sparkline("gpu_temperature", 100))
+    else:
+        table.add_row("GPU Temperature", "N/A", "", "")
+
+    for storage in storage_info:
+        device, partition_name, total, used, free, percent = storage
+        table.add_row(f"{device} ({partition_name}) Storage Usage", f"{percent:.2f}%", f"[{'█' * int(percent / 5)}{' ' * (20 - int(percent / 5))}]", history.sparkline(f"storage.{device}", 100))
+        table.add_row(f"{device} ({partition_name}) Total Storage", "", f"{total} GB", "")
+        table.add_row(f"{device} ({partition_name}) Used Storage", "", f"{used} GB", "")
+        table.add_row(f"{device} ({partition_name}) Available Storage", "", f"{free} GB", "")
+
+    table.add_row("Network Sent", f"{sent_mb:.2f} MB", f"{sent_rate:.2f} MB/s" if sent_rate is not None else "", history.sparkline("network.sent"))
+    table.add_row("Network Received", f"{recv_mb:.2f} MB", f"{recv_rate:.2f} MB/s" if recv_rate is not None else "", history.sparkline("network.recv"))
+    table.add_row("Active Users", ", ".join(active_users), "", "")
+
+    stale = collector_scheduler.stale()
+    if stale:
+        table.add_row("Stale Data", ", ".join(f"{name} ({age:.0f}s old)" if age is not None else f"{name} (no data)" for name, age in stale.items()), "", "", style="dim")
+
+    return table
+
+def display_live_graph(console):
+    console.print(build_live_table())
+
+def parse_args():
+    parser = build_parser("Live system monitor for Windows", "re-probe CPU/GPU/RAM details every N seconds (default: only at startup)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    hardware_inventory.refresh_interval = args.inventory_interval
+    from rich.console import Console
+    console = Console()
+    gpu_monitor.start()
+    gpu_monitor.wait_ready()
+    get_hardware_inventory()
+    process_tracker.limit, process_tracker.sort = args.top_processes, args.top_sort
+    register_collectors(args.interval)
+    if args.profile:
+        profiler.start()
+        collector_scheduler.instrument(profiler.wrap)
+    history.interval, history.window = args.interval, args.graph_window
+    collector_scheduler.start()
+    collector_scheduler.wait_ready()
+    try:
+        render_live_graph(sys.modules[__name__], console, args.interval, args.max_fps, args.frame_stats, args.profile is not None)
+    finally:
+        collector_scheduler.stop()
+        gpu_monitor.stop()
+        if args.profile:
+            profiler.dump(args.profile, platform=PLATFORM, interval=args.interval)
+            console.print(f"Profile written to {args.profile}")
+
+if __name__ == "__main__":
+    main()